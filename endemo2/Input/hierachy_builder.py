@@ -27,22 +27,24 @@ def initialize_hierarchy_and_load_input(input_manager):
     """
     # Central container for loaded data and hierarchy objects.
     data = DataManager(input_manager)
+    plan = data.output_plan
+    plan.log_pruned()
 
     # Read active settings once.
     active_sectors = input_manager.general_settings.active_sectors
     active_regions = input_manager.general_settings.active_regions
     region_code_map = input_manager.general_settings.region_code_map
     sectors_settings = input_manager.general_settings.sectors_settings
-    timeseries_forecast = input_manager.general_settings.timeseries_forecast
 
     ue_type_list = input_manager.general_settings.useful_energy_types
     heat_levels_list = input_manager.general_settings.heat_levels
 
     # Load input tables first.
     data.read_all_demand_drivers(active_regions)
-    data.read_subregions(active_regions)
-    data.read_subregion_timeseries(active_regions)
-    data.read_subregion_scenario(active_regions)
+    if plan.subregional:
+        data.read_subregions(active_regions)
+        data.read_subregion_timeseries(active_regions)
+        data.read_subregion_scenario(active_regions)
     data.read_ecu_ddet_data(
         active_regions=active_regions,
         active_sectors=active_sectors,
@@ -50,8 +52,8 @@ def initialize_hierarchy_and_load_input(input_manager):
         heat_levels_list=heat_levels_list,
     )
 
-    # Optional: load hourly profiles.
-    if timeseries_forecast == 1:
+    # Optional: load hourly profiles (only if a timeseries channel consumes them).
+    if plan.timeseries:
         timeseries = pd.read_excel(input_manager.timeseries_file, sheet_name=SHEET_HOURLY, header=None).set_index(0)
         data.read_and_filter_load_profiles(timeseries)
 
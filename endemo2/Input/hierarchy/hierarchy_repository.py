@@ -13,6 +13,7 @@ from endemo2.Input.loaders.ddr_loader import DdrLoader
 from endemo2.Input.loaders.ddet_ecu_loader import DDetEcuLoader
 from endemo2.Input.loaders.subregion_loader import SubregionLoader
 from endemo2.Input.loaders.timeseries_loader import TimeseriesLoader
+from endemo2.Input.output_plan import OutputPlan
 from endemo2.Input.hierarchy.hierachy_classes import Region, Sector, Subsector, Technology, Variable, DemandDriverData, LoadProfile
 
 
@@ -27,6 +28,7 @@ class DataManager:
 
     def __init__(self, input_manager):
         self.input_manager = input_manager
+        self.output_plan = OutputPlan(input_manager.general_settings)
         self.regions = []
         self.demand_drivers = {}
         self.dependent_demand_drivers = {}
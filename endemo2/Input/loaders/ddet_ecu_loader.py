@@ -127,7 +127,7 @@ class DDetEcuLoader:
                         tech_name=tech_name,
                         subsector_name=subsector.name,
                     )
-                    if self.data.input_manager.general_settings.timeseries_forecast == 1:
+                    if self.data.output_plan.timeseries:
                         # Load profile lookup also uses default fallback per hierarchy level.
                         technology.load_profile = self.data.get_load_profiles(
                             region_name, sector_name, subsector.name, tech_name
@@ -4,6 +4,7 @@ and builds the unified forecast/full-year timeline used by the rest of the model
 """
 from __future__ import annotations
 
+from importlib.util import find_spec
 import os
 from pathlib import Path
 from typing import Optional
@@ -30,6 +31,20 @@ META_COLUMNS = {
 DEFAULT_FULL_YEAR_START = 1960
 DEFAULT_FULL_YEAR_END = 2100
 
+# Budget for materialized hourly arrays kept in memory (MB)
+DEFAULT_TIMESERIES_CACHE_MB = 256
+
+# Budget for output frames queued for the parallel workbook writers (MB)
+DEFAULT_OUTPUT_WRITER_MEMORY_MB = 2048
+
+# Output backends ("Output format ..." settings) and the aliases accepted for them
+OUTPUT_FORMATS = ("xlsx", "parquet", "feather", "csv")
+_FORMAT_ALIASES = {"excel": "xlsx", "xls": "xlsx", "cvs": "csv", "pq": "parquet", "arrow": "feather"}
+
+# Rough peak memory of writing a frame relative to its in-memory size
+# (openpyxl/xlsxwriter keep one object per cell; columnar writers copy once).
+WRITE_MEMORY_FACTOR = {"xlsx": 20, "parquet": 2, "feather": 2, "csv": 2}
+
 # Sheet names 
 SHEET_DEMAND_DRIVERS = "Demand_Drivers"
 SHEET_SUBREGIONAL_DIVISION = "Subregional_division"
@@ -91,6 +106,33 @@ class GeneralSettings:
         self.timeseries_forecast = self._get_param("Timeseries forecast")
         self.timeseries_per_region = self._get_param("Timeseries output per sector")
         self.timeseries_csv = self._get_param("Output hourly in .cvs format")
+        self.timeseries_cache_mb = self._get_param("Timeseries cache (MB)", DEFAULT_TIMESERIES_CACHE_MB)
+        self.timeseries_float32 = is_truthy(self._get_param("Timeseries hourly float32", 0))
+        self.timeseries_memory_budget_mb = self._get_param("Timeseries memory budget (MB)")
+        self.timeseries_spill = is_truthy(self._get_param("Timeseries spill to disk", 0))
+        self.timeseries_streaming = is_truthy(self._get_param("Timeseries streaming export", 0))
+        self.timeseries_typical_periods = self._get_param("Timeseries typical periods", 0)
+        self.timeseries_typical_period_hours = self._get_param("Timeseries typical period length (h)", 24)
+        # Distinct load profiles once plus (header, year, profile, annual energy) weights instead of hourly workbooks
+        self.timeseries_factorized = is_truthy(self._get_param("Timeseries factorized output", 0))
+        self.output_writer_memory_mb = self._get_param(
+            "Output writer memory budget (MB)", DEFAULT_OUTPUT_WRITER_MEMORY_MB
+        )
+        # Row-streaming (constant memory) xlsx writing and flat aggregate sheets instead of merged cells
+        self.output_xlsx_streaming = is_truthy(self._get_param("Output xlsx streaming", 1))
+        self.output_flat_aggregates = is_truthy(self._get_param("Output aggregate sheets flat", 0))
+        # Fingerprint workbooks (output_manifest.json) and reuse unchanged ones from a previous run directory
+        self.output_skip_unchanged = is_truthy(self._get_param("Output skip unchanged", 0))
+        self.output_previous_run = self._get_param("Output previous run directory")
+        # Indexed SQLite store (results.sqlite) of all yearly outputs
+        self.output_sqlite = is_truthy(self._get_param("Output SQLite results store", 1))
+        # Output backend per output family (xlsx, parquet, feather or csv)
+        self.output_format_forecasts = self._get_param("Output format sector forecasts", "xlsx")
+        self.output_format_energy = self._get_param("Output format UE/FE tables", "xlsx")
+        self.output_format_subregional = self._get_param("Output format subregional", "xlsx")
+        self.output_format_timeseries = self._get_param(
+            "Output format timeseries", "csv" if is_truthy(self.timeseries_csv) else "xlsx"
+        )
         self.graphical_out = self._get_param("Graphical output")
         self.trace_output = self._get_param("Trace")
         self.scenario = self._get_param("Scenario")
@@ -340,6 +382,34 @@ def is_truthy(val) -> bool:
     return False
 
 
+def normalize_output_format(value, default: str = "xlsx") -> str:
+    """Parse a GeneralSet output format entry; empty entries select `default`."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return default
+    fmt = str(value).strip().lower().lstrip(".")
+    if not fmt:
+        return default
+    fmt = _FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{value}'. Supported: {', '.join(OUTPUT_FORMATS)}.")
+    return fmt
+
+
+def output_format_available(fmt: str) -> bool:
+    if fmt in ("parquet", "feather"):
+        return find_spec("pyarrow") is not None
+    return True
+
+
+def stream_xlsx_available() -> bool:
+    return find_spec("xlsxwriter") is not None
+
+
+def write_memory_factor(fmt: str, stream: bool = False) -> int:
+    """Peak write memory of a workbook relative to its frames; row-streaming xlsx only holds the frames."""
+    return 1 if stream else WRITE_MEMORY_FACTOR.get(fmt, 1)
+
+
 def select_first_available_column(df: pd.DataFrame, candidates: list[str]) -> str | None:
     """Return first existing candidate column name (preferring non-empty columns)."""
     if df is None or df.empty:
@@ -0,0 +1,49 @@
+"""
+Output-driven stage planning.
+
+The plan is derived once from GeneralSettings and states which inputs and model
+stages feed an enabled writer. Loaders and the pipeline consult it to skip work
+whose results would never be written, and the skipped items are logged.
+"""
+
+from endemo2.Input.model_config import is_truthy
+
+
+class OutputPlan:
+    """
+    Which inputs/stages reach an enabled output.
+
+    - subregional: subregional input tables, division forecast and subregional writers
+    - ue: useful energy (UE workbooks, FE, subregional UE tables, UE timeseries/diagrams)
+    - fe: final energy and the FE_SHARE_FOR_UE helper forecast
+    - timeseries: hourly load profiles and the timeseries stage
+    - timeseries_channels: the UE/FE channels of the timeseries stage
+
+    All markers are read with is_truthy, like the writers do.
+    """
+
+    def __init__(self, general_settings):
+        ue_out = is_truthy(general_settings.UE_marker)
+        self.fe = is_truthy(general_settings.FE_marker)
+        self.subregional = is_truthy(general_settings.subregional_resolution)
+        # FE is derived from UE and the subregional writers always export the UE channel.
+        self.ue = ue_out or self.fe or self.subregional
+        # Hourly profiles are only consumed by the UE/FE timeseries channels.
+        timeseries_on = is_truthy(general_settings.timeseries_forecast)
+        self.timeseries_channels = [channel for channel, on in (("UE", ue_out), ("FE", self.fe)) if on]
+        self.timeseries = timeseries_on and bool(self.timeseries_channels)
+
+        self.pruned = []
+        if not self.subregional:
+            self.pruned.append("subregional input tables and division forecast (subregional resolution off)")
+        if not self.ue:
+            self.pruned.append("useful energy (no UE, FE or subregional output enabled)")
+        if not self.fe:
+            self.pruned.append("final energy and FE_SHARE_FOR_UE forecast (final energy off)")
+        if timeseries_on and not self.timeseries:
+            self.pruned.append("hourly load profiles and timeseries (no UE/FE channel enabled)")
+
+    def log_pruned(self) -> None:
+        """Print the inputs/stages skipped because no enabled output consumes them."""
+        for item in self.pruned:
+            print(f"[Plan] Skipping {item}.")
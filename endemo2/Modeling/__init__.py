@@ -4,10 +4,12 @@ from endemo2.Modeling.model_ECU_DDet import calc_ECU_DDet
 from endemo2.Modeling.model_useful_energy import calculate_useful_energy
 from endemo2.Modeling.model_final_energy import calculate_final_energy
 from endemo2.Modeling.model_timeseries import calculate_timeseries
+from endemo2.Modeling.region_shards import calculate_region_stages
 
 __all__ = [
     "calc_ECU_DDet",
     "calculate_useful_energy",
     "calculate_final_energy",
     "calculate_timeseries",
+    "calculate_region_stages",
 ]
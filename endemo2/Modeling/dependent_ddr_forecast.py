@@ -100,6 +100,7 @@ from endemo2.Modeling.model_ECU_DDet import (
     reset_driver_mapping_caches,
 )
 from endemo2.Modeling.Methods import prediction_methods as pm
+from endemo2.provenance import Provenance
 from endemo2.Modeling.Methods.prediction_methods import ForecastMethod
 from endemo2.Input.model_config import META_COLUMNS
 from endemo2.Input.loaders.common import is_default_value
@@ -533,7 +534,7 @@ def compute_dependent_series(
     variable = variable_obj or _ForecastVariableStub(variable_name, region_name, hierarchy=hierarchy)
     base_row = _build_base_row(base_row, region_name, variable_name)
     if "Trace" not in base_row or pd.isna(base_row.get("Trace")):
-        base_row["Trace"] = _build_spec_trace(spec, context_label, region_name, variable_name)
+        base_row["Trace"] = Provenance(_build_spec_trace, spec, context_label, region_name, variable_name)
 
     # -------------------------------------------------------------------------
     # Case A) Forecast data == "Historical"
@@ -10,6 +10,7 @@ from endemo2.Modeling.Methods.prediction_methods import (
     map_forecast_method_to_string,
 )
 from endemo2.Input.loaders.common import is_default_value, select_rows_with_default
+from endemo2.provenance import Provenance
 
 # Set up logger
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +34,12 @@ CONTEXT_DETAIL_COLUMNS = [
 _DDR_RESOLVE_CACHE = {}
 _DDR_YEAR_SERIES_CACHE = {}
 
+# Forecast evaluations keyed by a fingerprint of everything a prediction function
+# reads (method, coefficients/points, limits, factor and the driver values per year).
+# Regions that resolve to the same inputs reuse one evaluation.
+_FORECAST_EVAL_CACHE = {}
+_FORECAST_EVAL_STATS = {"evaluated": 0, "deduplicated": 0}
+
 
 def reset_driver_mapping_caches():
     """
@@ -42,6 +49,14 @@ def reset_driver_mapping_caches():
     _DDR_YEAR_SERIES_CACHE.clear()
 
 
+def reset_forecast_evaluation_cache():
+    """
+    Clear the forecast evaluation cache and its counters.
+    """
+    _FORECAST_EVAL_CACHE.clear()
+    _FORECAST_EVAL_STATS.update(evaluated=0, deduplicated=0)
+
+
 def _get_last_non_nan_year_value(row_df: pd.DataFrame, year_keys):
     ordered_years = sorted((str(year) for year in year_keys), key=int)
     for year in reversed(ordered_years):
@@ -77,6 +92,7 @@ def calc_ECU_DDet(data):
     Forecast all ECU/DDet variables, plus FE helper inputs if enabled.
     """
     reset_driver_mapping_caches()
+    reset_forecast_evaluation_cache()
     for region in data.regions:
         for sector in region.sectors:
             for subsector in sector.subsectors:
@@ -85,12 +101,17 @@ def calc_ECU_DDet(data):
                     for variable in technology.ddets:
                         forecast_data(variable, data)
 
-    if data.input_manager.general_settings.FE_marker == 1:
+    if data.output_plan.fe:
         for variable in data.efficiency_data:
             forecast_data(variable, data)  # TODO entry building should be changed
     else:
         forecast_data(data.efficiency_data[0], data)
 
+    print(
+        f"[Forecast] {_FORECAST_EVAL_STATS['evaluated']} method evaluations, "
+        f"{_FORECAST_EVAL_STATS['deduplicated']} deduplicated (identical inputs)."
+    )
+
 
 def forecast_data(variable, data):
     """
@@ -437,26 +458,13 @@ def do_predictions(predictions_method: list, variable, data, forecast_year_range
         if not predict_function:
             raise ValueError(f"Prediction function not defined for forecast method: {method.name}")
 
-        predictions = {}
-        for year in forecast_year_range:
-            try:
-                x_values = map_x_values(demand_drivers, region_name, year, data, context=driver_context)
-                predicted_value = predict_function(method, x_values)
-                lower_limit = getattr(method, "lower_limit", -np.inf)
-                upper_limit = getattr(method, "upper_limit", np.inf)
-                if pd.notna(predicted_value) and pd.notna(lower_limit) and predicted_value < lower_limit:
-                    predicted_value = lower_limit
-                if pd.notna(predicted_value) and pd.notna(upper_limit) and predicted_value > upper_limit:
-                    predicted_value = upper_limit
-                predictions[year] = predicted_value
-            except Exception as e:
-                logging.error(f"Error predicting for {region_name}, year {year}: {e}")
-                predictions[year] = pd.NaT
-
-        scaled_predictions = {}
-        for year, value in predictions.items():
-            scaled_value = value * method.factor
-            scaled_predictions[year] = scaled_value
+        x_by_year = _map_forecast_x_values(demand_drivers, region_name, data, driver_context, forecast_year_range)
+        scaled_predictions, errors = _evaluate_forecast_cached(
+            method, method, predict_function, x_by_year, pd.NaT
+        )
+        for year, error in errors:
+            logging.error(f"Error predicting for {region_name}, year {year}: {error}")
+
         region_data = _build_region_output_row(
             hierarchy=hierarchy,
             variable_name=variable.name,
@@ -486,33 +494,15 @@ def do_interpolation(interpolations, variable, data, forecast_year_range) -> pd.
         if not predict_function:
             raise ValueError(f"Prediction function not defined for forecast method: {method.name}")
 
-        predictions = {}
-        interp_points = method.interp_points
-        for year in forecast_year_range:
-            try:
-                x_values = map_x_values(
-                    method.demand_drivers_names,
-                    region_name,
-                    year,
-                    data,
-                    context=driver_context,
-                )
-                predicted_value = predict_function(interp_points, x_values)
-                lower_limit = getattr(method, "lower_limit", -np.inf)
-                upper_limit = getattr(method, "upper_limit", np.inf)
-                if pd.notna(predicted_value) and pd.notna(lower_limit) and predicted_value < lower_limit:
-                    predicted_value = lower_limit
-                if pd.notna(predicted_value) and pd.notna(upper_limit) and predicted_value > upper_limit:
-                    predicted_value = upper_limit
-                predictions[year] = predicted_value
-            except Exception as e:
-                logging.error(f"Error interpolating for {region_name}, {variable.settings} , year {year}: {e}")
-                predictions[year] = np.nan
-
-        scaled_predictions = {}
-        for year, value in predictions.items():
-            scaled_value = value * method.factor
-            scaled_predictions[year] = scaled_value
+        x_by_year = _map_forecast_x_values(
+            method.demand_drivers_names, region_name, data, driver_context, forecast_year_range
+        )
+        scaled_predictions, errors = _evaluate_forecast_cached(
+            method, method.interp_points, predict_function, x_by_year, np.nan
+        )
+        for year, error in errors:
+            logging.error(f"Error interpolating for {region_name}, {variable.settings} , year {year}: {error}")
+
         region_data = _build_region_output_row(
             hierarchy=hierarchy,
             variable_name=variable.name,
@@ -526,6 +516,105 @@ def do_interpolation(interpolations, variable, data, forecast_year_range) -> pd.
     return pd.concat(region_interpolations_df_list, ignore_index=False)
 
 
+def _map_forecast_x_values(demand_drivers, region_name, data, driver_context, forecast_year_range) -> dict:
+    """
+    Map the demand drivers for every forecast year.
+    A failed mapping is kept as the exception for that year.
+    """
+    x_by_year = {}
+    for year in forecast_year_range:
+        try:
+            x_by_year[year] = map_x_values(demand_drivers, region_name, year, data, context=driver_context)
+        except Exception as e:
+            x_by_year[year] = e
+    return x_by_year
+
+
+def _fingerprint_value(value):
+    """
+    Convert a value into a hashable, NaN-safe key component.
+    """
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, dict):
+        return tuple((_fingerprint_value(k), _fingerprint_value(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_fingerprint_value(v) for v in value)
+    if isinstance(value, (float, np.floating)):
+        return float(value).hex()
+    if isinstance(value, np.integer):
+        return int(value)
+    return repr(value)
+
+
+def _forecast_fingerprint(method, x_by_year: dict) -> tuple:
+    """
+    Fingerprint of all inputs that determine the scaled forecast values of one method.
+    """
+    return (
+        _fingerprint_value(method.name),
+        _fingerprint_value(method.coefficients),
+        _fingerprint_value(method.interp_points),
+        _fingerprint_value(getattr(method, "equation", None)),
+        _fingerprint_value(method.demand_drivers_names),
+        _fingerprint_value(method.factor),
+        _fingerprint_value(getattr(method, "lower_limit", -np.inf)),
+        _fingerprint_value(getattr(method, "upper_limit", np.inf)),
+        tuple((year, _fingerprint_value(x_values)) for year, x_values in x_by_year.items()),
+    )
+
+
+def _evaluate_forecast_years(method, coef, predict_function, x_by_year: dict, error_value):
+    """
+    Evaluate one method for all forecast years, apply limits and the unit factor.
+
+    :return: (scaled values per year, [(year, error message), ...])
+    """
+    predictions = {}
+    errors = []
+    lower_limit = getattr(method, "lower_limit", -np.inf)
+    upper_limit = getattr(method, "upper_limit", np.inf)
+    for year, x_values in x_by_year.items():
+        try:
+            if isinstance(x_values, Exception):
+                raise x_values
+            predicted_value = predict_function(coef, x_values)
+            if pd.notna(predicted_value) and pd.notna(lower_limit) and predicted_value < lower_limit:
+                predicted_value = lower_limit
+            if pd.notna(predicted_value) and pd.notna(upper_limit) and predicted_value > upper_limit:
+                predicted_value = upper_limit
+            predictions[year] = predicted_value
+        except Exception as e:
+            errors.append((year, e))
+            predictions[year] = error_value
+
+    scaled_predictions = {year: value * method.factor for year, value in predictions.items()}
+    return scaled_predictions, errors
+
+
+def _evaluate_forecast_cached(method, coef, predict_function, x_by_year: dict, error_value):
+    """
+    Evaluate one method, reusing the result of an earlier evaluation with the same fingerprint.
+    """
+    try:
+        key = (_fingerprint_value(error_value), _forecast_fingerprint(method, x_by_year))
+        hash(key)
+    except TypeError:
+        key = None
+
+    cached = _FORECAST_EVAL_CACHE.get(key) if key is not None else None
+    if cached is not None:
+        _FORECAST_EVAL_STATS["deduplicated"] += 1
+        scaled_predictions, errors = cached
+        return dict(scaled_predictions), list(errors)
+
+    _FORECAST_EVAL_STATS["evaluated"] += 1
+    scaled_predictions, errors = _evaluate_forecast_years(method, coef, predict_function, x_by_year, error_value)
+    if key is not None:
+        _FORECAST_EVAL_CACHE[key] = (dict(scaled_predictions), list(errors))
+    return scaled_predictions, errors
+
+
 def map_x_values(demand_drivers, region_name, year, data, context=None):
     """
     Map demand drivers to their values for one region-year point.
@@ -819,11 +908,15 @@ def _build_method_trace(hierarchy, variable_name, method, region_name, coeff_or_
     return " | ".join(parts)
 
 
+def _build_efficiency_variable_trace(trace):
+    return _trace_text(trace + " | EfficiencyVariable=1")
+
+
 def _build_region_output_row(hierarchy, variable_name, method, region_name, year_values, coeff_or_points):
     """
     Build one output row payload for prediction/interpolation exports.
     """
-    trace = _build_method_trace(hierarchy, variable_name, method, region_name, coeff_or_points)
+    trace = Provenance(_build_method_trace, hierarchy, variable_name, method, region_name, coeff_or_points)
     function_name = _method_to_output_string(getattr(method, "name", None))
     equation_text = _equation_to_output_string(method)
 
@@ -854,7 +947,7 @@ def _build_region_output_row(hierarchy, variable_name, method, region_name, year
                 "Subsector": [method.subsector],
                 "Technology": [method.tech],
                 "FE_Type": [method.fe_type],
-                "Trace": [_trace_text(trace + " | EfficiencyVariable=1")],
+                "Trace": [Provenance(_build_efficiency_variable_trace, trace)],
             }
         )
 
@@ -1,7 +1,12 @@
 import pandas as pd
 import numpy as np
 import logging
-from endemo2.Input.loaders.common import select_rows_with_default
+from endemo2.Input.loaders.common import (
+    select_rows_with_default,
+    is_default_value,
+    _normalize_match_value,
+)
+from endemo2.provenance import Provenance
 
 logger = logging.getLogger(__name__)
 
@@ -26,84 +31,234 @@ def _norm_value(value):
     return str(value).strip().casefold()
 
 
-def _rank_matches(matches: pd.DataFrame, row, ordered_keys: list[str]) -> pd.DataFrame:
-    """Rank candidate rows by specificity against row context (exact > default)."""
-    if matches is None or matches.empty:
-        return matches
+_SIGNATURE_COLUMNS = [
+    "Region",
+    "Subregion",
+    "Sector",
+    "Subsector",
+    "Variable",
+    "Technology",
+    "UE_Type",
+    "FE_Type",
+    "Temp_level",
+    "Subtech",
+    "Drive",
+]
 
-    ranked = matches.copy()
-
-    def _score_one(candidate):
-        score = 0
-        for key in ordered_keys:
-            if key not in ranked.columns:
-                continue
-            cand = candidate.get(key)
-            target = row.get(key)
-            if _is_default_like(cand):
-                continue
-            if _norm_value(cand) == _norm_value(target):
-                score += 1
-        return score
-
-    ranked["__spec_score"] = ranked.apply(_score_one, axis=1)
-    ranked = ranked.sort_values(["__spec_score"], ascending=False).drop(columns=["__spec_score"])
-    return ranked
-
-
-def _best_match(matches: pd.DataFrame, row, ordered_keys: list[str]) -> pd.DataFrame:
-    """Return exactly one best-ranked row (or empty DataFrame)."""
-    if matches is None or matches.empty:
-        return pd.DataFrame()
-    ranked = _rank_matches(matches, row=row, ordered_keys=ordered_keys)
-    return ranked.head(1).copy()
 
+def _signature_value(value):
+    """Normalize signature values like select_rows_with_default does."""
+    if value is None:
+        return "__none__"
+    if isinstance(value, float) and value != value:  # NaN
+        return "__nan__"
+    text = str(value).strip()
+    if text == "":
+        return "__blank__"
+    return text.casefold()
 
-def _best_share_matches_per_fe(share_matches: pd.DataFrame, ue_row, rank_keys: list[str]) -> pd.DataFrame:
-    """Keep one best share row per FE_Type after ranking."""
-    if share_matches is None or share_matches.empty:
-        return pd.DataFrame()
-    if "FE_Type" not in share_matches.columns:
-        return _best_match(share_matches, row=ue_row, ordered_keys=rank_keys)
 
-    out = []
-    for _, grp in share_matches.groupby("FE_Type", dropna=False):
-        best = _best_match(grp, row=ue_row, ordered_keys=rank_keys)
-        if not best.empty:
-            out.append(best)
-    return pd.concat(out, ignore_index=True) if out else pd.DataFrame()
+class ForecastLookup:
+    """
+    Pre-indexed view of a share/efficiency forecast table.
 
-def _calc_fe_tech(tech, eff_forecast, share_forecast, forecast_year_range):
-    tech.energy_fe = calc_fe_types(tech.energy_ue, eff_forecast, share_forecast, forecast_year_range)
+    Key columns are normalized once, year columns are converted to one float
+    matrix, and default-aware resolutions are cached per normalized criteria.
+    Resolution follows select_rows_with_default (exact before default) and the
+    specificity ranking used for FE matching, but works on row positions only.
+    """
 
+    def __init__(self, forecast_df: pd.DataFrame, year_cols: list[str]):
+        df = forecast_df if forecast_df is not None else pd.DataFrame()
+        self.df = df.reset_index(drop=True)
+        self.year_cols = list(year_cols)
+        self.values = (
+            self.df.reindex(columns=self.year_cols)
+            .apply(pd.to_numeric, errors="coerce")
+            .to_numpy(dtype=float)
+        )
+        self._norm = {}
+        self._is_default = {}
+        self._rank_norm = {}
+        self._signature_cols = [c for c in _SIGNATURE_COLUMNS if c in self.df.columns]
+        self._signature_rows = None
+        self._signatures = {}
+        self._fe_codes = None
+        self._cache = {}
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def column(self, key: str) -> np.ndarray:
+        return self.df[key].to_numpy(dtype=object)
+
+    def _norm_col(self, key: str) -> np.ndarray:
+        """Normalized match values of one key column (None for default-like cells)."""
+        if key not in self._norm:
+            values = self.df[key].tolist()
+            self._norm[key] = np.array([_normalize_match_value(v) for v in values], dtype=object)
+            self._is_default[key] = np.array([is_default_value(v) for v in values], dtype=bool)
+        return self._norm[key]
+
+    def _rank_col(self, key: str) -> np.ndarray:
+        """Normalized ranking values of one key column (None for default-like cells)."""
+        if key not in self._rank_norm:
+            values = self.df[key].tolist()
+            self._rank_norm[key] = np.array([_norm_value(v) for v in values], dtype=object)
+        return self._rank_norm[key]
+
+    def _signature(self, exclude: str) -> np.ndarray:
+        """Row signatures over all signature columns except `exclude`."""
+        if exclude not in self._signatures:
+            if self._signature_rows is None:
+                self._signature_rows = [
+                    tuple(_signature_value(v) for v in row)
+                    for row in self.df[self._signature_cols].itertuples(index=False, name=None)
+                ] if self._signature_cols else [() for _ in range(len(self.df))]
+            if exclude in self._signature_cols:
+                pos = self._signature_cols.index(exclude)
+                sigs = [row[:pos] + row[pos + 1:] for row in self._signature_rows]
+            else:
+                sigs = self._signature_rows
+            arr = np.empty(len(sigs), dtype=object)
+            arr[:] = sigs
+            self._signatures[exclude] = arr
+        return self._signatures[exclude]
+
+    def _fe_type_codes(self) -> np.ndarray:
+        """Sorted group codes of FE_Type (NaN last), as groupby(dropna=False) orders them."""
+        if self._fe_codes is None:
+            fe = self.df["FE_Type"]
+            self._fe_codes = fe.groupby(fe, dropna=False, sort=True).ngroup().to_numpy()
+        return self._fe_codes
+
+    def _select(self, criteria: tuple, ordered_columns: list[str]) -> np.ndarray:
+        """Positional equivalent of select_rows_with_default."""
+        current = np.arange(len(self.df))
+        for column, target in zip(ordered_columns, criteria):
+            norm = self._norm_col(column)
+            is_default = self._is_default[column]
+            if target is None:
+                current = current[is_default[current]]
+                if current.size == 0:
+                    return current
+                continue
 
-def _calc_fe_subsector(subsector, eff_forecast, share_forecast, forecast_year_range):
+            exact = current[norm[current] == target]
+            default = current[is_default[current]]
+            if exact.size == 0 and default.size == 0:
+                return current[:0]
+            if exact.size == 0:
+                current = default
+                continue
+            if default.size == 0:
+                current = exact
+                continue
+            if not any(c != column for c in self._signature_cols):
+                current = exact
+                continue
+            signatures = self._signature(column)
+            exact_sigs = set(signatures[exact])
+            keep = np.fromiter((sig not in exact_sigs for sig in signatures[default]), dtype=bool, count=default.size)
+            current = np.concatenate([exact, default[keep]])
+        return current
+
+    def _scores(self, positions: np.ndarray, criteria: tuple, rank_columns: list[str]) -> np.ndarray:
+        """Specificity score: number of non-default key columns matching the criteria exactly."""
+        scores = np.zeros(positions.size, dtype=int)
+        for column, target in zip(rank_columns, criteria):
+            if target is None:
+                continue
+            # Default-like cells normalize to None and never equal a concrete target.
+            scores += self._rank_col(column)[positions] == target
+        return scores
+
+    def resolve(self, row, keys: list[str], rank_keys: list[str], per_fe_type: bool = False) -> np.ndarray:
+        """
+        Return row positions of the best match for `row`.
+
+        With per_fe_type=True one best row per FE_Type is returned (ordered by
+        FE_Type), otherwise at most one row.
+        """
+        if self.df.empty:
+            return np.empty(0, dtype=int)
+        ordered_columns = [k for k in keys if k in self.df.columns]
+        rank_columns = [k for k in rank_keys if k in self.df.columns]
+        criteria = tuple(_normalize_match_value(row.get(k)) for k in ordered_columns)
+        rank_criteria = tuple(_norm_value(row.get(k)) for k in rank_columns)
+        cache_key = (criteria, rank_criteria, tuple(ordered_columns), tuple(rank_columns), per_fe_type)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if ordered_columns:
+            matches = self._select(criteria, ordered_columns)
+        else:
+            matches = np.arange(len(self.df))
+        if matches.size == 0:
+            best = matches
+        else:
+            scores = self._scores(matches, rank_criteria, rank_columns)
+            # Stable descending order: ties keep their resolution order.
+            order = np.argsort(-scores, kind="stable")
+            ranked = matches[order]
+            if per_fe_type and "FE_Type" in self.df.columns:
+                codes = self._fe_type_codes()[ranked]
+                _, first = np.unique(codes, return_index=True)
+                best = ranked[first]
+            else:
+                best = ranked[:1]
+        self._cache[cache_key] = best
+        return best
+
+
+def _calc_fe_tech(tech, eff_lookup, share_lookup, forecast_year_range):
+    tech.energy_fe = calc_fe_types(tech.energy_ue, eff_lookup, share_lookup, forecast_year_range)
+
+
+def _calc_fe_subsector(subsector, eff_lookup, share_lookup, forecast_year_range):
     fe_energy = []
     for tech in subsector.technologies:
-        _calc_fe_tech(tech, eff_forecast, share_forecast, forecast_year_range)
+        _calc_fe_tech(tech, eff_lookup, share_lookup, forecast_year_range)
         if tech.energy_fe is not None and not tech.energy_fe.empty:
             fe_energy.append(tech.energy_fe)
     subsector.energy_fe = pd.concat(fe_energy, axis=0, ignore_index=True) if fe_energy else pd.DataFrame()
 
 
-def _calc_fe_sector(sector, eff_forecast, share_forecast, forecast_year_range):
+def _calc_fe_sector(sector, eff_lookup, share_lookup, forecast_year_range):
     fe_energy = []
     for subsector in sector.subsectors:
-        _calc_fe_subsector(subsector, eff_forecast, share_forecast, forecast_year_range)
+        _calc_fe_subsector(subsector, eff_lookup, share_lookup, forecast_year_range)
         if subsector.energy_fe is not None and not subsector.energy_fe.empty:
             fe_energy.append(subsector.energy_fe)
     sector.energy_fe = pd.concat(fe_energy, axis=0, ignore_index=True) if fe_energy else pd.DataFrame()
 
 
-def _calc_fe_region(region, eff_forecast, share_forecast, forecast_year_range):
+def calculate_region_final_energy(region, eff_lookup, share_lookup, forecast_year_range):
+    """Calculate final energy for all technologies of one region and roll it up the hierarchy."""
     fe_energy = []
     for sector in region.sectors:
-        _calc_fe_sector(sector, eff_forecast, share_forecast, forecast_year_range)
+        _calc_fe_sector(sector, eff_lookup, share_lookup, forecast_year_range)
         if sector.energy_fe is not None and not sector.energy_fe.empty:
             fe_energy.append(sector.energy_fe)
     region.energy_fe = pd.concat(fe_energy, axis=0, ignore_index=True) if fe_energy else pd.DataFrame()
 
 
+def build_fe_lookups(data, forecast_year_range):
+    """Return indexed (efficiency, share) lookups built from data.efficiency_data."""
+    var_ef, var_share = data.efficiency_data
+    eff_forecast = var_ef.forecast
+    eff_forecast.columns = eff_forecast.columns.astype(str)
+    share_forecast = var_share.forecast
+    share_forecast.columns = share_forecast.columns.astype(str)
+    # Index share/efficiency tables once; resolutions are cached across all regions.
+    return (
+        ForecastLookup(eff_forecast, forecast_year_range),
+        ForecastLookup(share_forecast, forecast_year_range),
+    )
+
+
 def calculate_final_energy(data):
     """
     Calculate final energy for all regions, if FE calculation is enabled.
@@ -111,27 +266,42 @@ def calculate_final_energy(data):
     This is part of the forecast/modeling pipeline and should be called
     after useful energy has been computed.
     """
-    if data.input_manager.general_settings.FE_marker == 0:
+    if not data.output_plan.fe:
         print("Calculation Final energy is not activated")
         return None
     forecast_year_range = [str(year) for year in data.input_manager.general_settings.forecast_year_range]
-    var_ef, var_share = data.efficiency_data
-    eff_forecast = var_ef.forecast
-    eff_forecast.columns = eff_forecast.columns.astype(str)
-    share_forecast = var_share.forecast
-    share_forecast.columns = share_forecast.columns.astype(str)
+    eff_lookup, share_lookup = build_fe_lookups(data, forecast_year_range)
     for region in data.regions:
-        _calc_fe_region(region, eff_forecast, share_forecast, forecast_year_range)
+        calculate_region_final_energy(region, eff_lookup, share_lookup, forecast_year_range)
 
 
-def _build_fe_trace(ue_row, share_row, ef_row):
+def _build_fe_trace(ue_trace, share_fe_type, eff_fe_type):
     """Build compact per-row trace text for final-energy rows."""
-    base = str(ue_row.get("Trace", "")).strip()
-    share_info = f"ShareFE={share_row.get('FE_Type')}"
-    eff_info = f"EfficiencyFE={ef_row.get('FE_Type')}"
+    base = str(ue_trace).strip()
+    share_info = f"ShareFE={share_fe_type}"
+    eff_info = f"EfficiencyFE={eff_fe_type}"
     parts = [p for p in [base, share_info, eff_info] if p]
     return " | ".join(parts)
 
+
+def _build_fe_heat_total_trace(region, sector, subsector, technology, subtech, drive):
+    """Build trace text for synthetic FE HEAT/TOTAL rows."""
+    return (
+        f"Region={region} | Sector={sector} | Subsector={subsector} | Technology={technology} | "
+        f"UE_Type=HEAT | Temp_level=TOTAL | Subtech={subtech} | Drive={drive} | "
+        f"DerivedFrom=SumHeatLevelsFE"
+    )
+
+
+def _is_heat_total_mask(ue_type: pd.Series, temp_level: pd.Series) -> pd.Series:
+    """Return True for HEAT rows whose temperature level is TOTAL/default/empty."""
+    ue_col = ue_type.fillna('').astype(str).str.strip().str.upper()
+    tl_col = temp_level.fillna('').astype(str).str.strip()
+    return (ue_col == 'HEAT') & (
+        (tl_col.str.upper() == 'TOTAL') | (tl_col == '') | (tl_col.str.lower() == 'default')
+    )
+
+
 def calc_fe_types(energy_ue, eff_forecast, share_forecast, forecast_year_range):
 
     """
@@ -140,6 +310,10 @@ def calc_fe_types(energy_ue, eff_forecast, share_forecast, forecast_year_range):
     2. Finding matching efficiency records for each FE_Type
     3. For HEAT: build TOTAL strictly as sum of FE heat levels (Q-levels).
        If no heat levels exist for a group, emit HEAT/TOTAL as zeros.
+
+    eff_forecast/share_forecast may be DataFrames or prebuilt ForecastLookup
+    objects. Matching only assigns row positions (UE -> share -> efficiency);
+    FE values are then computed as one array expression.
     """
     keys = ['Region', 'Sector', 'Subsector', 'Technology', 'UE_Type',
             'Temp_level', 'Subtech', 'Drive']
@@ -147,7 +321,18 @@ def calc_fe_types(energy_ue, eff_forecast, share_forecast, forecast_year_range):
     rank_keys_eff = ['Region', 'Sector', 'Subsector', 'Technology', 'UE_Type', 'Temp_level', 'Subtech', 'Drive', 'FE_Type']
     year_cols = [str(y) for y in forecast_year_range]
 
-    results = []
+    if not isinstance(share_forecast, ForecastLookup):
+        share_forecast = ForecastLookup(share_forecast, year_cols)
+    if not isinstance(eff_forecast, ForecastLookup):
+        eff_forecast = ForecastLookup(eff_forecast, year_cols)
+    if energy_ue is None or energy_ue.empty or share_forecast.empty:
+        return pd.DataFrame()
+
+    ue_df = energy_ue.reset_index(drop=True)
+    share_fe = share_forecast.column('FE_Type') if 'FE_Type' in share_forecast.df.columns else None
+    ue_is_heat = (ue_df['UE_Type'].map(lambda v: str(v).strip().upper()) == 'HEAT').to_numpy()
+    ue_is_heat_total = _is_heat_total_mask(ue_df['UE_Type'], ue_df['Temp_level']).to_numpy()
+
     # Target map for synthetic HEAT/TOTAL rows: one per group and FE_Type.
     # key=(Region,Sector,Subsector,Technology,Subtech,Drive) -> set(FE_Type)
     heat_total_targets = {}
@@ -162,144 +347,128 @@ def calc_fe_types(energy_ue, eff_forecast, share_forecast, forecast_year_range):
             row.get('Drive') if not pd.isna(row.get('Drive')) else 'default',
         )
 
-    def _is_heat_total_like(row):
-        ue_type = str(row.get('UE_Type', '')).strip().upper()
-        if ue_type != 'HEAT':
-            return False
-        temp = row.get('Temp_level')
-        if _is_default_like(temp):
-            return True
-        return str(temp).strip().upper() == 'TOTAL'
-
-    for _, ue_row in energy_ue.iterrows():
-        share_matches = get_matches(share_forecast, ue_row, keys)
-        share_matches = _best_share_matches_per_fe(share_matches, ue_row=ue_row, rank_keys=rank_keys_share)
-        if len(share_matches) == 0:
+    # Assignment table: UE row -> (share row, efficiency row) positions.
+    ue_idx, share_idx, eff_idx = [], [], []
+    for pos, ue_row in enumerate(ue_df.to_dict('records')):
+        share_matches = share_forecast.resolve(ue_row, keys, rank_keys_share, per_fe_type=True)
+        if share_matches.size == 0:
             continue
 
         # Record FE targets for HEAT groups so TOTAL can always be created.
-        if str(ue_row.get('UE_Type', '')).strip().upper() == 'HEAT':
-            gk = _heat_group_key(ue_row)
-            fe_set = heat_total_targets.setdefault(gk, set())
-            for _, sr in share_matches.iterrows():
-                fe_t = sr.get('FE_Type')
-                if not pd.isna(fe_t):
-                    fe_set.add(fe_t)
+        if ue_is_heat[pos]:
+            fe_set = heat_total_targets.setdefault(_heat_group_key(ue_row), set())
+            if share_fe is not None:
+                fe_set.update(fe_t for fe_t in share_fe[share_matches] if not pd.isna(fe_t))
 
         # HEAT/TOTAL is synthetic later (sum of FE heat levels) -> skip direct calculation here.
-        if _is_heat_total_like(ue_row):
+        if ue_is_heat_total[pos]:
             continue
 
-        for _, share_row in share_matches.iterrows():
-            search_row = ue_row.copy()
-            search_row['FE_Type'] = share_row['FE_Type']
-            ef_match = get_matches(eff_forecast, search_row, keys + ['FE_Type'])
-            ef_match = _best_match(ef_match, row=search_row, ordered_keys=rank_keys_eff)
-            if len(ef_match) == 0:
+        for share_pos in share_matches:
+            search_row = dict(ue_row)
+            search_row['FE_Type'] = share_fe[share_pos] if share_fe is not None else None
+            ef_match = eff_forecast.resolve(search_row, keys + ['FE_Type'], rank_keys_eff)
+            if ef_match.size == 0:
                 continue
-            ef_row = ef_match.iloc[0]
-
-            ue_years = pd.to_numeric(ue_row[year_cols], errors='coerce').astype(float)
-            share_years = pd.to_numeric(share_row[year_cols], errors='coerce').astype(float).fillna(0.0)
-            ef_years = pd.to_numeric(ef_row[year_cols], errors='coerce').astype(float)
-
-            invalid_eff = ef_years.isna() | (ef_years <= 0)
-            if invalid_eff.any():
-                logger.warning(
-                    "Invalid efficiency (<=0 or NaN) for %s/%s/%s/%s UE=%s FE=%s; setting FE to NaN for affected years.",
-                    ue_row.get('Region'),
-                    ue_row.get('Sector'),
-                    ue_row.get('Subsector'),
-                    ue_row.get('Technology'),
-                    ue_row.get('UE_Type'),
-                    share_row.get('FE_Type'),
-                )
-                ef_years = ef_years.mask(invalid_eff, np.nan)
-
-            fe_values = ue_years.mul(share_years).div(ef_years)
-            result = {
-                **ue_row[keys].to_dict(),
-                'FE_Type': share_row['FE_Type'],
-                'Trace': _build_fe_trace(ue_row, share_row, ef_row),
-                **fe_values.to_dict(),
-            }
-            results.append(result)
-
-    base_df = pd.DataFrame(results)
+            ue_idx.append(pos)
+            share_idx.append(share_pos)
+            eff_idx.append(ef_match[0])
+
+    base_df = pd.DataFrame()
+    if ue_idx:
+        ue_idx = np.asarray(ue_idx, dtype=int)
+        share_idx = np.asarray(share_idx, dtype=int)
+        eff_idx = np.asarray(eff_idx, dtype=int)
+
+        ue_values = ue_df.reindex(columns=year_cols).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        ue_years = ue_values[ue_idx]
+        share_years = np.nan_to_num(share_forecast.values[share_idx], nan=0.0)
+        ef_years = eff_forecast.values[eff_idx]
+
+        invalid_eff = np.isnan(ef_years) | (ef_years <= 0)
+        for row_pos in np.flatnonzero(invalid_eff.any(axis=1)):
+            ue_row = ue_df.iloc[ue_idx[row_pos]]
+            logger.warning(
+                "Invalid efficiency (<=0 or NaN) for %s/%s/%s/%s UE=%s FE=%s; setting FE to NaN for affected years.",
+                ue_row.get('Region'),
+                ue_row.get('Sector'),
+                ue_row.get('Subsector'),
+                ue_row.get('Technology'),
+                ue_row.get('UE_Type'),
+                share_fe[share_idx[row_pos]] if share_fe is not None else None,
+            )
+        ef_years = np.where(invalid_eff, np.nan, ef_years)
+
+        fe_values = ue_years * share_years / ef_years
+
+        share_types = share_fe[share_idx] if share_fe is not None else np.full(share_idx.size, None, dtype=object)
+        eff_types = (
+            eff_forecast.column('FE_Type')[eff_idx]
+            if 'FE_Type' in eff_forecast.df.columns else np.full(eff_idx.size, None, dtype=object)
+        )
+        ue_traces = ue_df['Trace'].to_numpy(dtype=object)[ue_idx] if 'Trace' in ue_df.columns else [''] * ue_idx.size
+
+        base_df = ue_df[keys].iloc[ue_idx].reset_index(drop=True)
+        base_df['FE_Type'] = share_types
+        base_df['Trace'] = [
+            Provenance(_build_fe_trace, trace, share_type, eff_type)
+            for trace, share_type, eff_type in zip(ue_traces, share_types, eff_types)
+        ]
+        base_df = pd.concat(
+            [base_df, pd.DataFrame(fe_values, columns=year_cols)],
+            axis=1,
+        )
+
     if base_df.empty and not heat_total_targets:
         return base_df
 
     # Keep only non-total rows from direct computation.
     if not base_df.empty:
-        ue_col = base_df['UE_Type'].fillna('').astype(str).str.strip().str.upper()
-        tl_col = base_df['Temp_level'].fillna('').astype(str).str.strip()
-        total_like = (ue_col == 'HEAT') & (
-            (tl_col.str.upper() == 'TOTAL') | (tl_col == '') | (tl_col.str.lower() == 'default')
-        )
-        base_df = base_df[~total_like].copy()
+        base_df = base_df[~_is_heat_total_mask(base_df['UE_Type'], base_df['Temp_level'])].copy()
 
-    # Aggregate FE heat levels to FE HEAT/TOTAL.
-    heat_totals_df = pd.DataFrame()
+    # Build synthetic HEAT/TOTAL rows for all target groups. If no level exists -> zeros.
+    group_keys = ['Region', 'Sector', 'Subsector', 'Technology', 'Subtech', 'Drive']
+    agg_keys = group_keys + ['FE_Type']
+    targets = pd.DataFrame(
+        [
+            (*gk, fe_type)
+            for gk, fe_types in heat_total_targets.items()
+            for fe_type in sorted(fe_types, key=lambda x: str(x))
+        ],
+        columns=agg_keys,
+    )
+    if targets.empty:
+        return base_df
+
+    # Aggregate FE heat levels to FE HEAT/TOTAL in one groupby.
     if not base_df.empty:
-        ue_col = base_df['UE_Type'].fillna('').astype(str).str.strip().str.upper()
-        tl_col = base_df['Temp_level'].fillna('').astype(str).str.strip()
-        is_heat_level = (ue_col == 'HEAT') & (~(
-            (tl_col.str.upper() == 'TOTAL') | (tl_col == '') | (tl_col.str.lower() == 'default')
-        ))
-        heat_levels_df = base_df[is_heat_level].copy()
-
-        if not heat_levels_df.empty:
-            agg_keys = ['Region', 'Sector', 'Subsector', 'Technology', 'Subtech', 'Drive', 'FE_Type']
-            heat_totals_df = (
-                heat_levels_df.groupby(agg_keys, dropna=False)[year_cols]
-                .sum(min_count=1)
-                .reset_index()
-            )
-            heat_totals_df[year_cols] = heat_totals_df[year_cols].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+        is_heat_level = (
+            (base_df['UE_Type'].fillna('').astype(str).str.strip().str.upper() == 'HEAT')
+            & ~_is_heat_total_mask(base_df['UE_Type'], base_df['Temp_level'])
+        )
+        heat_totals_df = (
+            base_df[is_heat_level].groupby(agg_keys, dropna=False)[year_cols]
+            .sum(min_count=1)
+            .reset_index()
+        )
+        # Missing group keys never match a target (NaN != NaN), as in the former mask scan.
+        heat_totals_df = heat_totals_df.dropna(subset=agg_keys)
+        totals_df = targets.merge(heat_totals_df, on=agg_keys, how='left')
+        totals_df[year_cols] = totals_df[year_cols].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+    else:
+        totals_df = targets.copy()
+        for year in year_cols:
+            totals_df[year] = 0.0
+
+    totals_df.insert(4, 'UE_Type', 'HEAT')
+    totals_df.insert(5, 'Temp_level', 'TOTAL')
+    totals_df.insert(9, 'Trace', [
+        Provenance(_build_fe_heat_total_trace, *group)
+        for group in targets[group_keys].itertuples(index=False, name=None)
+    ])
 
-    # Build synthetic HEAT/TOTAL rows for all target groups. If no level exists -> zeros.
-    total_rows = []
-    for gk, fe_types in heat_total_targets.items():
-        region, sector, subsector, technology, subtech, drive = gk
-        for fe_type in sorted(fe_types, key=lambda x: str(x)):
-            vals = pd.Series(0.0, index=year_cols, dtype=float)
-            if not heat_totals_df.empty:
-                mask = (
-                    (heat_totals_df['Region'] == region)
-                    & (heat_totals_df['Sector'] == sector)
-                    & (heat_totals_df['Subsector'] == subsector)
-                    & (heat_totals_df['Technology'] == technology)
-                    & (heat_totals_df['Subtech'] == subtech)
-                    & (heat_totals_df['Drive'] == drive)
-                    & (heat_totals_df['FE_Type'] == fe_type)
-                )
-                m = heat_totals_df[mask]
-                if not m.empty:
-                    vals = pd.to_numeric(m.iloc[0][year_cols], errors='coerce').fillna(0.0)
-
-            total_rows.append({
-                'Region': region,
-                'Sector': sector,
-                'Subsector': subsector,
-                'Technology': technology,
-                'UE_Type': 'HEAT',
-                'Temp_level': 'TOTAL',
-                'Subtech': subtech,
-                'Drive': drive,
-                'FE_Type': fe_type,
-                'Trace': (
-                    f"Region={region} | Sector={sector} | Subsector={subsector} | Technology={technology} | "
-                    f"UE_Type=HEAT | Temp_level=TOTAL | Subtech={subtech} | Drive={drive} | "
-                    f"DerivedFrom=SumHeatLevelsFE"
-                ),
-                **vals.to_dict(),
-            })
-
-    totals_df = pd.DataFrame(total_rows)
     if base_df.empty:
         return totals_df
-    if totals_df.empty:
-        return base_df
     return pd.concat([base_df, totals_df], ignore_index=True)
 
 
@@ -1,7 +1,24 @@
 import numpy as np
 import pandas as pd
 import os
-from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+from endemo2.Input.model_config import (
+    DEFAULT_TIMESERIES_CACHE_MB,
+    is_truthy,
+    normalize_output_format,
+    output_format_available,
+    stream_xlsx_available,
+    write_memory_factor,
+)
+from endemo2.Modeling.typical_periods import cluster_typical_periods
 
 
 def _channel_attr(channel: str) -> str:
@@ -9,13 +26,7 @@ def _channel_attr(channel: str) -> str:
 
 
 def _enabled_channels(data) -> list[str]:
-    channels = []
-    settings = data.input_manager.general_settings
-    if settings.UE_marker == 1:
-        channels.append("UE")
-    if settings.FE_marker == 1:
-        channels.append("FE")
-    return channels
+    return list(data.output_plan.timeseries_channels)
 
 
 
@@ -50,286 +61,836 @@ def _unique_load_profiles(profiles):
     return unique
 
 
-def _calc_timeseries_tech_channel(tech, forecast_year_range, channel: str, allowed_heat_levels: list[str]):
-    if tech.load_profile is None:
-        return {}
+def _tok(value):
+    if value is None:
+        return "default"
+    try:
+        if pd.isna(value):
+            return "default"
+    except Exception:
+        pass
+    s = str(value).strip()
+    return s if s else "default"
+
+
+def _timeseries_profile_id(comp: dict, channel: str) -> str:
+    if channel == "FE":
+        return (
+            f"{_tok(comp.get('Sector'))}_{_tok(comp.get('Subsector'))}_{_tok(comp.get('Technology'))}_"
+            f"{_tok(comp.get('Subtech'))}_{_tok(comp.get('Drive'))}_{_tok(comp.get('FE_Type'))}_"
+            f"{_tok(comp.get('Temp_level'))}_{_tok(comp.get('UE_Type'))}"
+        )
+    return (
+        f"{_tok(comp.get('Sector'))}_{_tok(comp.get('Subsector'))}_{_tok(comp.get('Technology'))}_"
+        f"{_tok(comp.get('Subtech'))}_{_tok(comp.get('Drive'))}_{_tok(comp.get('Temp_level'))}_"
+        f"{_tok(comp.get('UE_Type'))}"
+    )
+
+
+def _filter_energy_for_profile(energy_source: pd.DataFrame, l_profile, allowed_heat_set: set) -> pd.DataFrame:
+    """Return the energy rows one load profile applies to (UE type / temperature level filters)."""
+    calc_data = energy_source.copy()
+    if calc_data.empty:
+        return calc_data
+
+    ue_col = calc_data['UE_Type'].fillna("").astype(str).str.strip().str.upper()
+    tl_col = calc_data['Temp_level'].fillna("").astype(str).str.strip().str.upper()
+
+    # Never use HEAT/TOTAL in hourly allocation.
+    calc_data = calc_data[~((ue_col == "HEAT") & (tl_col == "TOTAL"))]
+    if calc_data.empty:
+        return calc_data
+
+    ue_col = calc_data['UE_Type'].fillna("").astype(str).str.strip().str.upper()
+    tl_col = calc_data['Temp_level'].fillna("").astype(str).str.strip().str.upper()
+
+    profile_ue = _normalize_token_list(getattr(l_profile, 'ue_types', []))
+    if profile_ue and 'DEFAULT' not in profile_ue:
+        calc_data = calc_data[ue_col.isin(profile_ue)]
+        if calc_data.empty:
+            return calc_data
+        ue_col = calc_data['UE_Type'].fillna("").astype(str).str.strip().str.upper()
+        tl_col = calc_data['Temp_level'].fillna("").astype(str).str.strip().str.upper()
 
-    energy_source = tech.energy_ue if channel == "UE" else tech.energy_fe
-    if energy_source is None or energy_source.empty:
-        return {}
+    profile_tl = _normalize_token_list(getattr(l_profile, 'temp_levels', []))
+    if profile_tl and 'DEFAULT' not in profile_tl:
+        calc_data = calc_data[tl_col.isin(profile_tl)]
+    else:
+        # temp_level=default -> use configured heat levels (without TOTAL) for HEAT rows.
+        if allowed_heat_set:
+            is_heat = ue_col == 'HEAT'
+            keep_heat = tl_col.isin(allowed_heat_set)
+            calc_data = calc_data[(~is_heat) | keep_heat]
+    return calc_data
 
-    profiles = {}
 
-    def _tok(value):
-        if value is None:
-            return "default"
-        try:
-            if pd.isna(value):
-                return "default"
-        except Exception:
-            pass
-        s = str(value).strip()
-        return s if s else "default"
+class HourlyComponents:
+    """
+    Side table and annual-energy coefficients of one technology channel.
 
-    allowed_heat_set = {str(x).strip().upper() for x in (allowed_heat_levels or []) if str(x).strip()}
+    coefficients[i, y, k] is the annual energy of component i in year y that is
+    allocated with load profile k; present[i, y] marks years with numeric energy.
+    Hourly values are coefficients @ (profiles x hours).
+    """
 
-    for l_profile in _unique_load_profiles(tech.load_profile):
-        calc_data = energy_source.copy()
-        if calc_data.empty:
-            continue
+    def __init__(self, channel: str, year_columns: list[str], load_profiles: list):
+        self.channel = channel
+        self.year_columns = year_columns
+        self.load_profiles = load_profiles
+        self.profile_ids = []
+        self.components = []
+        self.contributors = []
+        self._rows = {}
+        self._entries = []
+
+    def add(self, comp: dict, profile_idx: int, energies: np.ndarray) -> None:
+        profile_id = _timeseries_profile_id(comp, self.channel)
+        row = self._rows.get(profile_id)
+        if row is None:
+            row = len(self.profile_ids)
+            self._rows[profile_id] = row
+            self.profile_ids.append(profile_id)
+            self.components.append({
+                'Channel': self.channel,
+                'UE_Type': comp.get('UE_Type'),
+                'FE_Type': comp.get('FE_Type'),
+                'Temp_level': comp.get('Temp_level'),
+                'Region': comp.get('Region'),
+                'Sector': comp.get('Sector'),
+                'Subsector': comp.get('Subsector'),
+                'Technology': comp.get('Technology'),
+                'Subtech': comp.get('Subtech'),
+                'Drive': comp.get('Drive')
+            })
+            self.contributors.append({'technologies': set(), 'subtechs': set(), 'drives': set()})
+        contributors = self.contributors[row]
+        contributors['technologies'].add(_tok(comp.get('Technology')))
+        contributors['subtechs'].add(_tok(comp.get('Subtech')))
+        contributors['drives'].add(_tok(comp.get('Drive')))
+        self._entries.append((row, profile_idx, energies))
+
+    def tensors(self):
+        """Return (coefficients[N, Y, K], present[N, Y])."""
+        shape = (len(self.profile_ids), len(self.year_columns))
+        coefficients = np.zeros(shape + (len(self.load_profiles),), dtype=np.float64)
+        present = np.zeros(shape, dtype=bool)
+        for row, profile_idx, energies in self._entries:
+            valid = ~np.isnan(energies)
+            coefficients[row, valid, profile_idx] += energies[valid]
+            present[row] |= valid
+        return coefficients, present
+
+
+def _collect_tech_channel_components(tech, forecast_year_range, channel: str, allowed_heat_levels: list[str],
+                                     load_profiles=None):
+    if tech.load_profile is None:
+        return None
 
-        ue_col = calc_data['UE_Type'].fillna("").astype(str).str.strip().str.upper()
-        tl_col = calc_data['Temp_level'].fillna("").astype(str).str.strip().str.upper()
+    energy_source = tech.energy_ue if channel == "UE" else tech.energy_fe
+    if energy_source is None or energy_source.empty:
+        return None
 
-        # Never use HEAT/TOTAL in hourly allocation.
-        calc_data = calc_data[~((ue_col == "HEAT") & (tl_col == "TOTAL"))]
+    allowed_heat_set = {str(x).strip().upper() for x in (allowed_heat_levels or []) if str(x).strip()}
+    group_cols = ['Region', 'Sector', 'Subsector', 'Technology', 'Subtech', 'Drive', 'Temp_level', 'UE_Type']
+    if channel == "FE":
+        group_cols.append('FE_Type')
+    year_columns = [str(y) for y in forecast_year_range]
+
+    if load_profiles is None:
+        load_profiles = _unique_load_profiles(tech.load_profile)
+    table = HourlyComponents(channel, year_columns, load_profiles)
+    for profile_idx, l_profile in enumerate(load_profiles):
+        calc_data = _filter_energy_for_profile(energy_source, l_profile, allowed_heat_set)
         if calc_data.empty:
             continue
 
-        ue_col = calc_data['UE_Type'].fillna("").astype(str).str.strip().str.upper()
-        tl_col = calc_data['Temp_level'].fillna("").astype(str).str.strip().str.upper()
-
-        profile_ue = _normalize_token_list(getattr(l_profile, 'ue_types', []))
-        if profile_ue and 'DEFAULT' not in profile_ue:
-            calc_data = calc_data[ue_col.isin(profile_ue)]
-            if calc_data.empty:
-                continue
-            ue_col = calc_data['UE_Type'].fillna("").astype(str).str.strip().str.upper()
-            tl_col = calc_data['Temp_level'].fillna("").astype(str).str.strip().str.upper()
-
-        profile_tl = _normalize_token_list(getattr(l_profile, 'temp_levels', []))
-        if profile_tl and 'DEFAULT' not in profile_tl:
-            calc_data = calc_data[tl_col.isin(profile_tl)]
-            if calc_data.empty:
-                continue
-        else:
-            # temp_level=default -> use configured heat levels (without TOTAL) for HEAT rows.
-            if allowed_heat_set:
-                is_heat = ue_col == 'HEAT'
-                keep_heat = tl_col.isin(allowed_heat_set)
-                calc_data = calc_data[(~is_heat) | keep_heat]
-                if calc_data.empty:
-                    continue
-
-        group_cols = ['Region', 'Sector', 'Subsector', 'Technology', 'Subtech', 'Drive', 'Temp_level', 'UE_Type']
-        if channel == "FE":
-            group_cols.append('FE_Type')
-        year_columns = [str(y) for y in forecast_year_range]
         calc_data[year_columns] = calc_data[year_columns].apply(pd.to_numeric, errors="coerce")
         grouped = calc_data.groupby(group_cols, as_index=False)[year_columns].sum()
         if grouped.empty:
             continue
 
-        components = grouped[group_cols].to_dict("records")
         energy_matrix = grouped[year_columns].to_numpy(dtype=float)
+        for comp, energies in zip(grouped[group_cols].to_dict("records"), energy_matrix):
+            table.add(comp, profile_idx, energies)
+    return table if table.profile_ids else None
 
-        for idx, comp in enumerate(components):
-            if channel == "FE":
-                profile_id = (
-                    f"{_tok(comp.get('Sector'))}_{_tok(comp.get('Subsector'))}_{_tok(comp.get('Technology'))}_"
-                    f"{_tok(comp.get('Subtech'))}_{_tok(comp.get('Drive'))}_{_tok(comp.get('FE_Type'))}_"
-                    f"{_tok(comp.get('Temp_level'))}_{_tok(comp.get('UE_Type'))}"
-                )
-            else:
-                profile_id = (
-                    f"{_tok(comp.get('Sector'))}_{_tok(comp.get('Subsector'))}_{_tok(comp.get('Technology'))}_"
-                    f"{_tok(comp.get('Subtech'))}_{_tok(comp.get('Drive'))}_{_tok(comp.get('Temp_level'))}_"
-                    f"{_tok(comp.get('UE_Type'))}"
+
+class HourlyCache:
+    """Thread-safe LRU cache of materialized hourly arrays, bounded by a byte budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def get(self, key, compute):
+        with self._lock:
+            values = self._items.get(key)
+            if values is not None:
+                self._items.move_to_end(key)
+                return values
+        values = compute()
+        values.flags.writeable = False
+        with self._lock:
+            if key not in self._items and values.nbytes <= self.max_bytes:
+                self._items[key] = values
+                self.nbytes += values.nbytes
+                self._evict()
+        return values
+
+    def _evict(self) -> None:
+        while self.nbytes > self.max_bytes and self._items:
+            _, values = self._items.popitem(last=False)
+            self.nbytes -= values.nbytes
+
+
+HOURLY_CACHE = HourlyCache(DEFAULT_TIMESERIES_CACHE_MB * 1024 * 1024)
+_FACTOR_KEYS = count()
+
+
+class _ProfileRef:
+    """Load profile metadata plus its column in a shared ProfileLibrary (no hourly values)."""
+
+    __slots__ = ("column", "ue_types", "temp_levels", "all_subsectors")
+
+    def __init__(self, column: int, profile):
+        self.column = column
+        self.ue_types = list(getattr(profile, "ue_types", []) or [])
+        self.temp_levels = list(getattr(profile, "temp_levels", []) or [])
+        self.all_subsectors = bool(getattr(profile, "all_subsectors", False))
+
+
+class ProfileLibrary:
+    """
+    Distinct load profiles of one region as a (profiles x hours) matrix, zero-padded
+    to the longest profile. The matrix (and thus materialized hourly values) is
+    stored in `dtype`; annual energies stay float64 coefficients.
+    """
+
+    def __init__(self, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self._columns = {}
+        self._profiles = []
+        self._shm = None
+        self._window_sums = {}
+        self.matrix = None
+
+    def column(self, profile) -> int:
+        if isinstance(profile, _ProfileRef):
+            return profile.column
+        values = np.asarray(profile.values, dtype=np.float64)
+        key = (values.size, values.tobytes())
+        col = self._columns.get(key)
+        if col is None:
+            col = len(self._profiles)
+            self._columns[key] = col
+            self._profiles.append(values)
+        return col
+
+    def __len__(self) -> int:
+        return len(self._columns) if self.matrix is None else self.matrix.shape[0]
+
+    def freeze(self) -> None:
+        if self.matrix is not None:
+            return
+        hours = max((values.size for values in self._profiles), default=0)
+        self.matrix = np.zeros((len(self._profiles), hours), dtype=self.dtype)
+        for col, values in enumerate(self._profiles):
+            self.matrix[col, :values.size] = values
+        self._profiles = []
+
+    def share(self) -> tuple:
+        """Place the frozen matrix in a shared memory segment and return its handle (name, shape, dtype)."""
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.matrix.nbytes))
+        shared = np.ndarray(self.matrix.shape, dtype=self.dtype, buffer=self._shm.buf)
+        shared[...] = self.matrix
+        self.matrix = shared
+        return self._shm.name, self.matrix.shape, self.dtype.str
+
+    def unshare(self) -> None:
+        """Copy the matrix back to private memory and release the shared segment."""
+        if self._shm is None:
+            return
+        self.matrix = np.array(self.matrix)
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    @classmethod
+    def attach(cls, handle: tuple) -> "ProfileLibrary":
+        """Library view on a matrix shared by the parent process (read-only use)."""
+        name, shape, dtype = handle
+        library = cls(dtype)
+        # The segment is owned (and unlinked) by the parent process.
+        library._shm = shared_memory.SharedMemory(name=name)
+        library.matrix = np.ndarray(shape, dtype=dtype, buffer=library._shm.buf)
+        return library
+
+    def window_sums(self, stop: int) -> np.ndarray:
+        """Sum of every profile over its first `stop` hours."""
+        sums = self._window_sums.get(stop)
+        if sums is None:
+            sums = self.matrix[:, :stop].sum(axis=1, dtype=np.float64)
+            self._window_sums[stop] = sums
+        return sums
+
+    def materialize(self, coefficients: np.ndarray) -> np.ndarray:
+        """Hourly values of one coefficient vector (one entry per profile)."""
+        used = np.flatnonzero(coefficients)
+        if used.size == 0:
+            return np.zeros(self.matrix.shape[1], dtype=self.dtype)
+        return coefficients[used].astype(self.dtype) @ self.matrix[used]
+
+
+class FactorizedYears(Mapping):
+    """
+    Years of one profile as {year: {'hourly_values', 'annual_energy'}}.
+
+    Only the annual-energy coefficients per load profile are stored; hourly
+    values are materialized on access and kept in HOURLY_CACHE, or read from
+    the on-disk store row when the results were spilled.
+    """
+
+    __slots__ = ("_coefficients", "_annual", "_index", "_library", "_key", "_store", "_store_row")
+
+    def __init__(self, coefficients: np.ndarray, annual: np.ndarray, year_index: dict, library: ProfileLibrary,
+                 store: np.ndarray = None, store_row: int = None):
+        self._coefficients = coefficients
+        self._annual = annual
+        self._index = year_index
+        self._library = library
+        self._key = next(_FACTOR_KEYS)
+        self._store = store
+        self._store_row = store_row
+
+    def __getitem__(self, year):
+        y_idx = self._index[year]
+        return {'hourly_values': self.hourly(year), 'annual_energy': self._annual[y_idx]}
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __contains__(self, year) -> bool:
+        return year in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def library(self) -> ProfileLibrary:
+        """Profile library whose columns the coefficients refer to."""
+        return self._library
+
+    def annual_energy(self, year):
+        return self._annual[self._index[year]]
+
+    def coefficients(self, year) -> np.ndarray:
+        """Annual energy of the year split by load profile (library column order)."""
+        return self._coefficients[self._index[year]]
+
+    def values_at(self, year, hours: np.ndarray) -> np.ndarray:
+        """Hourly values of the year at the given hour indices, without materializing the full year."""
+        y_idx = self._index[year]
+        hours = np.asarray(hours, dtype=np.int64)
+        values = np.zeros(hours.size, dtype=np.float64)
+        if self._store is not None:
+            row = self._store[self._store_row, y_idx]
+            inside = hours < row.shape[0]
+            values[inside] = row[hours[inside]]
+            return values
+        # Hours beyond the (zero-padded) profile length stay zero.
+        inside = hours < self._library.matrix.shape[1]
+        coefficients = self._coefficients[y_idx]
+        used = np.flatnonzero(coefficients)
+        values[inside] = coefficients[used] @ self._library.matrix[np.ix_(used, hours[inside])].astype(np.float64)
+        return values
+
+    def hourly_total(self, year, stop: int) -> float:
+        """Sum of the year's hourly values over the first `stop` hours."""
+        y_idx = self._index[year]
+        if self._store is not None:
+            return float(self._store[self._store_row, y_idx, :stop].sum(dtype=np.float64))
+        return float(self._coefficients[y_idx] @ self._library.window_sums(stop))
+
+    def hourly(self, year) -> np.ndarray:
+        y_idx = self._index[year]
+        if self._store is not None:
+            return self._store[self._store_row, y_idx]
+        return HOURLY_CACHE.get(
+            (self._key, y_idx),
+            lambda: self._library.materialize(self._coefficients[y_idx]),
+        )
+
+
+class HourlyBase:
+    """
+    Factorized hourly results of all technology components of one region and channel.
+
+    Rows are the technology components in hierarchy order, so every technology,
+    subsector and sector owns a contiguous row range. Only the coefficient
+    tensor (rows x years x profiles) and the region profile library are kept;
+    the levels reduce coefficients (hourly values are linear in them) and
+    materialize hourly arrays on demand.
+    """
+
+    def __init__(self, channel: str, year_columns: list[str], hourly_dtype=np.float64, library: ProfileLibrary = None):
+        self.channel = channel
+        self.year_columns = year_columns
+        self.library = library if library is not None else ProfileLibrary(hourly_dtype)
+        self.tech_rows = []
+        self.profile_ids = []
+        self.components = []
+        self.contributors = []
+        self._tables = []
+        self.coefficients = None
+        self.present = None
+        self.store = None
+
+    @property
+    def rows(self) -> int:
+        return len(self.profile_ids)
+
+    def state(self) -> dict:
+        """Side table and coefficient arrays, without the profile library (returned by worker processes)."""
+        return {
+            'tech_rows': self.tech_rows,
+            'profile_ids': self.profile_ids,
+            'components': self.components,
+            'contributors': self.contributors,
+            'coefficients': self.coefficients,
+            'present': self.present,
+        }
+
+    @classmethod
+    def from_state(cls, channel: str, year_columns: list[str], library: ProfileLibrary, state: dict) -> "HourlyBase":
+        base = cls(channel, year_columns, library.dtype, library)
+        for key, value in state.items():
+            setattr(base, key, value)
+        return base
+
+    def add_table(self, table: HourlyComponents, sector_name, subsector_name) -> None:
+        columns = [self.library.column(profile) for profile in table.load_profiles]
+        self._tables.append((self.rows, table, columns))
+        self.profile_ids.extend(table.profile_ids)
+        self.components.extend(table.components)
+        for contributors in table.contributors:
+            self.contributors.append({
+                'sectors': {sector_name},
+                'subsectors': {subsector_name},
+                **contributors,
+            })
+
+    def compute(self) -> None:
+        """Place the technology coefficients into the region tensor (library column order)."""
+        self.library.freeze()
+        shape = (self.rows, len(self.year_columns))
+        self.coefficients = np.zeros(shape + (len(self.library),), dtype=np.float64)
+        self.present = np.zeros(shape, dtype=bool)
+        for start, table, columns in self._tables:
+            stop = start + len(table.profile_ids)
+            coefficients, present = table.tensors()
+            for profile_idx, col in enumerate(columns):
+                self.coefficients[start:stop, :, col] += coefficients[:, :, profile_idx]
+            self.present[start:stop] = present
+        self._tables = []
+
+    def spill(self, path, chunk_bytes: int = 64 * 1024 * 1024) -> None:
+        """
+        Write the (components x years x hours) tensor to a memory-mapped .npy file,
+        a block of component rows at a time, with a .json side table next to it.
+        Hourly values of single-component profiles are then read from the file.
+        """
+        n_years, hours = len(self.year_columns), self.library.matrix.shape[1]
+        tensor = np.lib.format.open_memmap(
+            path, mode='w+', dtype=self.library.dtype, shape=(self.rows, n_years, hours)
+        )
+        block = max(1, int(chunk_bytes // max(1, n_years * hours * self.library.dtype.itemsize)))
+        for start in range(0, self.rows, block):
+            stop = min(start + block, self.rows)
+            coefficients = self.coefficients[start:stop].reshape((stop - start) * n_years, -1)
+            tensor[start:stop] = (coefficients.astype(self.library.dtype) @ self.library.matrix).reshape(
+                stop - start, n_years, hours
+            )
+        tensor.flush()
+        del tensor
+
+        side_table = {
+            'channel': self.channel,
+            'years': self.year_columns,
+            'profile_ids': self.profile_ids,
+            'components': self.components,
+            'annual_energy': self.coefficients.sum(axis=2).tolist(),
+            'present': self.present.tolist(),
+        }
+        with open(os.path.splitext(str(path))[0] + '.json', 'w', encoding='utf-8') as handle:
+            json.dump(side_table, handle, default=str)
+        self.store = np.load(path, mmap_mode='r')
+
+    def level_profiles(self, start: int, stop: int, contributor_keys: tuple, as_lists: bool = True) -> dict:
+        """Profiles of the rows [start, stop), summed per profile id (first-appearance order)."""
+        if start == stop:
+            return {}
+        groups = {}
+        group_index = [groups.setdefault(pid, len(groups)) for pid in self.profile_ids[start:stop]]
+        first_rows = {}
+        for offset, group in enumerate(group_index):
+            first_rows.setdefault(group, start + offset)
+
+        group_rows = np.bincount(group_index, minlength=len(groups))
+        coefficients = self.coefficients[start:stop]
+        present = self.present[start:stop]
+        if len(groups) < stop - start:
+            # Several rows share a profile id: reduce with an aggregation matrix (groups x rows).
+            aggregation = np.zeros((len(groups), stop - start), dtype=np.float64)
+            aggregation[group_index, np.arange(stop - start)] = 1.0
+            coefficients = (aggregation @ coefficients.reshape(stop - start, -1)).reshape(
+                (len(groups),) + coefficients.shape[1:]
+            )
+            present = (aggregation @ present) > 0
+        annual = coefficients.sum(axis=2)
+
+        contributors = [{key: set() for key in contributor_keys} for _ in groups]
+        for offset, group in enumerate(group_index):
+            row_contributors = self.contributors[start + offset]
+            for key in contributor_keys:
+                contributors[group][key].update(row_contributors[key])
+
+        profiles = {}
+        for profile_id, group in groups.items():
+            group_contributors = contributors[group]
+            if as_lists:
+                group_contributors = {key: list(values) for key, values in group_contributors.items()}
+            year_index = {
+                year: y_idx for y_idx, year in enumerate(self.year_columns) if present[group, y_idx]
+            }
+            profiles[profile_id] = {
+                'components': self.components[first_rows[group]],
+                'contributors': group_contributors,
+                'years': FactorizedYears(
+                    coefficients[group], annual[group], year_index, self.library,
+                    store=self.store if group_rows[group] == 1 else None,
+                    store_row=first_rows[group],
+                ),
+            }
+        return profiles
+
+
+# Contributor lists kept per hierarchy level.
+_LEVEL_CONTRIBUTORS = {
+    'technology': ('technologies', 'subtechs', 'drives'),
+    'subsector': ('technologies', 'subtechs', 'drives'),
+    'sector': ('subsectors', 'technologies', 'subtechs', 'drives'),
+    'region': ('sectors', 'subsectors', 'technologies', 'subtechs', 'drives'),
+}
+
+
+def _build_region_base(region, forecast_year_range, channel: str, allowed_heat_levels: list[str],
+                       hourly_dtype=np.float64, library: ProfileLibrary = None) -> HourlyBase:
+    year_columns = [str(y) for y in forecast_year_range]
+    base = HourlyBase(channel, year_columns, hourly_dtype, library)
+    for sector in region.sectors:
+        for subsector in sector.subsectors:
+            for tech in subsector.technologies:
+                rows_before = base.rows
+                table = _collect_tech_channel_components(
+                    tech, forecast_year_range, channel, allowed_heat_levels,
+                    load_profiles=getattr(tech, 'unique_profiles', None),
                 )
-            if profile_id not in profiles:
-                profiles[profile_id] = {
-                    'components': {
-                        'Channel': channel,
-                        'UE_Type': comp.get('UE_Type'),
-                        'FE_Type': comp.get('FE_Type'),
-                        'Temp_level': comp.get('Temp_level'),
-                        'Region': comp.get('Region'),
-                        'Sector': comp.get('Sector'),
-                        'Subsector': comp.get('Subsector'),
-                        'Technology': comp.get('Technology'),
-                        'Subtech': comp.get('Subtech'),
-                        'Drive': comp.get('Drive')
-                    },
-                    'contributors': {
-                        'technologies': set(),
-                        'subtechs': set(),
-                        'drives': set()
-                    },
-                    'years': {}
-                }
-            tech_profile = profiles[profile_id]
-            tech_profile['contributors']['technologies'].add(_tok(comp.get('Technology')))
-            tech_profile['contributors']['subtechs'].add(_tok(comp.get('Subtech')))
-            tech_profile['contributors']['drives'].add(_tok(comp.get('Drive')))
-
-            for year_idx, year in enumerate(year_columns):
-                energy_val = energy_matrix[idx, year_idx]
-                if np.isnan(energy_val):
-                    continue
-                hourly_vals = l_profile.values * energy_val
-                if year not in tech_profile['years']:
-                    tech_profile['years'][year] = {
-                        'hourly_values': hourly_vals,
-                        'annual_energy': energy_val
-                    }
-                else:
-                    tech_profile['years'][year]['hourly_values'] += hourly_vals
-                    tech_profile['years'][year]['annual_energy'] += energy_val
-    return profiles
-
-
-def _calc_timeseries_tech(tech, forecast_year_range, channels: list[str], allowed_heat_levels: list[str]):
-    tech.timeseries_results = {}
-    tech.timeseries_results_fe = {}
-    for channel in channels:
-        channel_profiles = _calc_timeseries_tech_channel(tech, forecast_year_range, channel, allowed_heat_levels)
-        setattr(tech, _channel_attr(channel), channel_profiles)
+                if table is not None:
+                    base.add_table(table, sector.name, subsector.name)
+                base.tech_rows.append(base.rows - rows_before)
+    base.compute()
+    return base
+
+
+def _attach_region_results(region, base: HourlyBase) -> None:
+    """Set the technology/subsector/sector/region results of one channel from the region base."""
+    tech_rows = iter(base.tech_rows)
+    ranges = []
+    stop = 0
+    for sector in region.sectors:
+        sector_start = stop
+        for subsector in sector.subsectors:
+            subsector_start = stop
+            for tech in subsector.technologies:
+                tech_start = stop
+                stop += next(tech_rows)
+                ranges.append((tech, tech_start, stop, 'technology'))
+            ranges.append((subsector, subsector_start, stop, 'subsector'))
+        ranges.append((sector, sector_start, stop, 'sector'))
+    ranges.append((region, 0, stop, 'region'))
+
+    attr = _channel_attr(base.channel)
+    for node, start, stop, level in ranges:
+        if level == 'technology':
+            # Technology results keep the flat layout with contributor sets.
+            setattr(node, attr, base.level_profiles(start, stop, _LEVEL_CONTRIBUTORS[level], as_lists=False))
+        else:
+            setattr(node, attr, {"profiles": base.level_profiles(start, stop, _LEVEL_CONTRIBUTORS[level])})
 
 
-def _calc_timeseries_sub(subsector, forecast_year_range, channels: list[str], allowed_heat_levels: list[str]):
-    subsector.timeseries_results = {"profiles": {}}
-    subsector.timeseries_results_fe = {"profiles": {}}
-    for tech in subsector.technologies:
-        _calc_timeseries_tech(tech, forecast_year_range, channels, allowed_heat_levels)
-        for channel in channels:
-            tech_profiles = getattr(tech, _channel_attr(channel), {}) or {}
-            if not tech_profiles:
-                continue
-            target = getattr(subsector, _channel_attr(channel))['profiles']
-            for profile_id, tech_data in tech_profiles.items():
-                if profile_id not in target:
-                    target[profile_id] = {
-                        'components': tech_data['components'],
-                        'years': {},
-                        'contributors': {
-                            'technologies': set(),
-                            'subtechs': set(),
-                            'drives': set()
-                        }
-                    }
-                subsector_profile = target[profile_id]
-                subsector_profile['contributors']['technologies'].update(
-                    tech_data['contributors']['technologies'])
-                subsector_profile['contributors']['subtechs'].update(
-                    tech_data['contributors']['subtechs'])
-                subsector_profile['contributors']['drives'].update(
-                    tech_data['contributors']['drives'])
-                for year, year_data in tech_data['years'].items():
-                    if year in subsector_profile['years']:
-                        subsector_profile['years'][year]['hourly_values'] += year_data['hourly_values']
-                        subsector_profile['years'][year]['annual_energy'] += year_data['annual_energy']
-                    else:
-                        subsector_profile['years'][year] = {
-                            'hourly_values': np.array(year_data['hourly_values']),
-                            'annual_energy': year_data['annual_energy']
-                        }
-    for channel in channels:
-        target = getattr(subsector, _channel_attr(channel))['profiles']
-        for profile in target.values():
-            for key in profile['contributors']:
-                profile['contributors'][key] = list(profile['contributors'][key])
+def _store_path(store_dir, region_name, channel: str):
+    return os.path.join(store_dir, f"{region_name}_{channel}.npy")
 
 
-def _calc_timeseries_sec(sector, forecast_year_range, channels: list[str], allowed_heat_levels: list[str]):
-    sector.timeseries_results = {"profiles": {}}
-    sector.timeseries_results_fe = {"profiles": {}}
-    for subsector in sector.subsectors:
-        _calc_timeseries_sub(subsector, forecast_year_range, channels, allowed_heat_levels)
-        for channel in channels:
-            subsector_profiles = getattr(subsector, _channel_attr(channel), {}).get('profiles', {})
-            if not subsector_profiles:
-                continue
-            target = getattr(sector, _channel_attr(channel))['profiles']
-            for profile_id, subsector_data in subsector_profiles.items():
-                if profile_id not in target:
-                    target[profile_id] = {
-                        'components': subsector_data['components'],
-                        'years': {},
-                        'contributors': {
-                            'subsectors': set(),
-                            'technologies': set(),
-                            'subtechs': set(),
-                            'drives': set()
-                        }
-                    }
-                sector_profile = target[profile_id]
-                sector_profile['contributors']['subsectors'].add(subsector.name)
-                sector_profile['contributors']['technologies'].update(
-                    subsector_data['contributors']['technologies'])
-                sector_profile['contributors']['subtechs'].update(
-                    subsector_data['contributors']['subtechs'])
-                sector_profile['contributors']['drives'].update(
-                    subsector_data['contributors']['drives'])
-                for year, year_data in subsector_data['years'].items():
-                    if year in sector_profile['years']:
-                        sector_profile['years'][year]['hourly_values'] += year_data['hourly_values']
-                        sector_profile['years'][year]['annual_energy'] += year_data['annual_energy']
-                    else:
-                        sector_profile['years'][year] = {
-                            'hourly_values': np.array(year_data['hourly_values']),
-                            'annual_energy': year_data['annual_energy']
-                        }
-    for channel in channels:
-        target = getattr(sector, _channel_attr(channel))['profiles']
-        for profile in target.values():
-            for key in profile['contributors']:
-                profile['contributors'][key] = list(profile['contributors'][key])
+def _calc_timeseries_reg_channel(region, forecast_year_range, channel: str, allowed_heat_levels: list[str],
+                                 hourly_dtype=np.float64, store_dir=None):
+    base = _build_region_base(region, forecast_year_range, channel, allowed_heat_levels, hourly_dtype)
+    if store_dir is not None and base.rows:
+        base.spill(_store_path(store_dir, region.region_name, channel))
+    _attach_region_results(region, base)
 
 
-def _calc_timeseries_reg(region, forecast_year_range, channels: list[str], allowed_heat_levels: list[str]):
+def _reset_timeseries_results(region) -> None:
     region.timeseries_results = {"profiles": {}}
     region.timeseries_results_fe = {"profiles": {}}
     for sector in region.sectors:
-        _calc_timeseries_sec(sector, forecast_year_range, channels, allowed_heat_levels)
-        for channel in channels:
-            sector_profiles = getattr(sector, _channel_attr(channel), {}).get('profiles', {})
-            if not sector_profiles:
-                continue
-            target = getattr(region, _channel_attr(channel))['profiles']
-            for profile_id, sector_data in sector_profiles.items():
-                if profile_id not in target:
-                    target[profile_id] = {
-                        'components': sector_data['components'],
-                        'years': {},
-                        'contributors': {
-                            'sectors': set(),
-                            'subsectors': set(),
-                            'technologies': set(),
-                            'subtechs': set(),
-                            'drives': set()
-                        }
-                    }
-                region_profile = target[profile_id]
-                region_profile['contributors']['sectors'].add(sector.name)
-                region_profile['contributors']['subsectors'].update(
-                    sector_data['contributors']['subsectors'])
-                region_profile['contributors']['technologies'].update(
-                    sector_data['contributors']['technologies'])
-                region_profile['contributors']['subtechs'].update(
-                    sector_data['contributors']['subtechs'])
-                region_profile['contributors']['drives'].update(
-                    sector_data['contributors']['drives'])
-                for year, year_data in sector_data['years'].items():
-                    if year in region_profile['years']:
-                        region_profile['years'][year]['hourly_values'] += year_data['hourly_values']
-                        region_profile['years'][year]['annual_energy'] += year_data['annual_energy']
-                    else:
-                        region_profile['years'][year] = {
-                            'hourly_values': np.array(year_data['hourly_values']),
-                            'annual_energy': year_data['annual_energy']
-                        }
+        sector.timeseries_results = {"profiles": {}}
+        sector.timeseries_results_fe = {"profiles": {}}
+        for subsector in sector.subsectors:
+            subsector.timeseries_results = {"profiles": {}}
+            subsector.timeseries_results_fe = {"profiles": {}}
+            for tech in subsector.technologies:
+                tech.timeseries_results = {}
+                tech.timeseries_results_fe = {}
+
+
+def _calc_timeseries_reg(region, forecast_year_range, channels: list[str], allowed_heat_levels: list[str],
+                         hourly_dtype=np.float64, store_dir=None):
+    _reset_timeseries_results(region)
     for channel in channels:
-        target = getattr(region, _channel_attr(channel))['profiles']
-        for profile in target.values():
-            for level in profile['contributors']:
-                profile['contributors'][level] = list(profile['contributors'][level])
+        _calc_timeseries_reg_channel(
+            region, forecast_year_range, channel, allowed_heat_levels, hourly_dtype, store_dir
+        )
+
+
+# Shared (per worker process) inputs of the process-based timeseries mode.
+_TS_SHARED = {}
 
 
-def calculate_timeseries(data):
+def _init_timeseries_worker(shared: dict) -> None:
+    _TS_SHARED.clear()
+    _TS_SHARED.update(shared)
+    _TS_SHARED['library'] = ProfileLibrary.attach(shared['library'])
+
+
+def _region_payload(region, library: ProfileLibrary):
+    """
+    Picklable stand-in of a region for the worker processes: names and UE/FE
+    tables only, load profiles replaced by references into the shared library.
+    """
+    sectors = []
+    for sector in region.sectors:
+        subsectors = []
+        for subsector in sector.subsectors:
+            technologies = []
+            for tech in subsector.technologies:
+                refs = None
+                if tech.load_profile is not None:
+                    refs = [_ProfileRef(library.column(p), p) for p in _unique_load_profiles(tech.load_profile)]
+                technologies.append(SimpleNamespace(
+                    name=tech.name,
+                    energy_ue=tech.energy_ue,
+                    energy_fe=tech.energy_fe,
+                    load_profile=refs,
+                    unique_profiles=refs,
+                ))
+            subsectors.append(SimpleNamespace(name=subsector.name, technologies=technologies))
+        sectors.append(SimpleNamespace(name=sector.name, subsectors=subsectors))
+    return SimpleNamespace(region_name=region.region_name, sectors=sectors)
+
+
+def _run_timeseries_shard(region_payload) -> dict:
+    """Build the coefficient tensors of one region (and spill its hourly tensor if enabled)."""
+    results = {}
+    store_dir = _TS_SHARED['store_dir']
+    for channel in _TS_SHARED['channels']:
+        base = _build_region_base(
+            region_payload, _TS_SHARED['forecast_year_range'], channel, _TS_SHARED['allowed_heat_levels'],
+            library=_TS_SHARED['library'],
+        )
+        state = base.state()
+        state['store'] = None
+        if store_dir is not None and base.rows:
+            state['store'] = _store_path(store_dir, region_payload.region_name, channel)
+            base.spill(state['store'])
+        results[channel] = state
+    return results
+
+
+def _calc_timeseries_processes(regions, forecast_year_range, channels, allowed_heat_levels, hourly_dtype,
+                               store_dir, workers: int) -> None:
+    """
+    Process-based timeseries stage: the distinct load profiles of all regions are
+    placed once in shared memory, workers build the coefficient tensors region by
+    region (and spill hourly tensors from the shared profile matrix), and only the
+    compact side tables are returned. No hourly vectors are pickled.
+    """
+    library = ProfileLibrary(hourly_dtype)
+    payloads = [_region_payload(region, library) for region in regions]
+    library.freeze()
+    shared = {
+        'library': library.share(),
+        'channels': channels,
+        'forecast_year_range': forecast_year_range,
+        'allowed_heat_levels': allowed_heat_levels,
+        'store_dir': store_dir,
+    }
+    try:
+        max_workers = min(max(1, int(workers)), len(regions))
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_timeseries_worker, initargs=(shared,)
+        ) as executor:
+            results = list(executor.map(_run_timeseries_shard, payloads))
+    finally:
+        library.unshare()
+
+    for region, result in zip(regions, results):
+        _reset_timeseries_results(region)
+        for channel in channels:
+            state = result[channel]
+            store = state.pop('store')
+            base = HourlyBase.from_state(channel, [str(y) for y in forecast_year_range], library, state)
+            if store is not None:
+                base.store = np.load(store, mmap_mode='r')
+            _attach_region_results(region, base)
+
+
+def open_hourly_store(path):
+    """
+    Reopen a spilled hourly store without recomputation.
+
+    Returns (tensor, side_table): the read-only memory-mapped components x years x
+    hours tensor and the side table with channel, years, profile ids, components,
+    annual energies and year presence per component row.
+    """
+    tensor = np.load(path, mmap_mode='r')
+    with open(os.path.splitext(str(path))[0] + '.json', encoding='utf-8') as handle:
+        side_table = json.load(handle)
+    return tensor, side_table
+
+
+def timeseries_writer(settings) -> dict:
+    """
+    Writer of the hourly workbooks as the export will open it: format (xlsx when
+    the configured backend is unavailable), whether xlsx is row-streamed by
+    xlsxwriter, and whether the writer holds only the sheet being written
+    (constant memory) rather than the whole workbook until it closes.
+    """
+    fmt = normalize_output_format(getattr(settings, 'output_format_timeseries', None))
+    if not output_format_available(fmt):
+        fmt = "xlsx"
+    stream = (
+        fmt == "xlsx" and is_truthy(getattr(settings, 'output_xlsx_streaming', True)) and stream_xlsx_available()
+    )
+    if fmt != "xlsx":
+        name = fmt
+    else:
+        name = "xlsx (xlsxwriter, constant memory)" if stream else "xlsx (whole workbook in memory)"
+    return {
+        'format': fmt,
+        'stream': stream,
+        'constant_memory': stream or fmt != "xlsx",
+        'write_factor': write_memory_factor(fmt, stream),
+        'name': name,
+    }
+
+
+def estimate_timeseries_memory(regions, channels: list[str], n_years: int, hourly_dtype, cache_bytes: int,
+                               writer: dict = None) -> dict:
+    """
+    Estimate the peak bytes of the timeseries stage and its export from component,
+    year and profile counts. Component counts are taken from the UE/FE rows of the
+    technologies with load profiles, i.e. an upper bound. The export is costed
+    with the write factor of the writer (see timeseries_writer).
+    """
+    writer = writer or {'write_factor': 1, 'constant_memory': True}
+    itemsize = np.dtype(hourly_dtype).itemsize
+    estimate = {'coefficients': 0, 'profiles': 0, 'hourly_cache': int(cache_bytes), 'export': 0, 'dense': 0}
+    for region in regions:
+        profiles = {}
+        for sector in region.sectors:
+            for subsector in sector.subsectors:
+                for tech in subsector.technologies:
+                    for profile in tech.load_profile or []:
+                        profiles[id(profile)] = len(profile.values)
+        hours = max(profiles.values(), default=0)
+        for channel in channels:
+            components = 0
+            for sector in region.sectors:
+                for subsector in sector.subsectors:
+                    for tech in subsector.technologies:
+                        energy = tech.energy_ue if channel == "UE" else tech.energy_fe
+                        if tech.load_profile and energy is not None:
+                            components += len(energy)
+            estimate['coefficients'] += components * n_years * len(profiles) * 8
+            estimate['profiles'] += len(profiles) * hours * itemsize
+            # The workbook writers hold all years of the region columns (annual total + 8760 hours).
+            estimate['export'] += components * n_years * 8761 * 8 * writer['write_factor']
+            estimate['dense'] += components * n_years * hours * itemsize
+    # The LRU cache never holds more than the fully materialized results.
+    estimate['hourly_cache'] = min(estimate['hourly_cache'], estimate['dense'])
+    estimate['total'] = (
+        estimate['coefficients'] + estimate['profiles'] + estimate['hourly_cache'] + estimate['export']
+    )
+    # Streaming export: the cache holds a single year; so does the writer, if it writes in constant memory.
+    per_year = max(1, n_years)
+    estimate['streaming'] = (
+        estimate['coefficients'] + estimate['profiles']
+        + min(estimate['hourly_cache'], estimate['dense'] // per_year)
+        + (estimate['export'] // per_year if writer['constant_memory'] else estimate['export'])
+    )
+    return estimate
+
+
+def build_typical_periods(regions, settings):
+    """
+    Cluster the distinct load profiles of all regions into typical periods, or
+    return None when the typical-period mode is off.
+    """
+    n_periods = getattr(settings, 'timeseries_typical_periods', 0)
+    if n_periods is None or pd.isna(n_periods) or int(n_periods) <= 0:
+        return None
+    period_hours = getattr(settings, 'timeseries_typical_period_hours', 24)
+    period_hours = 24 if period_hours is None or pd.isna(period_hours) else int(period_hours)
+
+    library = ProfileLibrary(np.float64)
+    for region in regions:
+        for sector in region.sectors:
+            for subsector in sector.subsectors:
+                for tech in subsector.technologies:
+                    for profile in tech.load_profile or []:
+                        library.column(profile)
+    if len(library) == 0:
+        return None
+    library.freeze()
+    periods = cluster_typical_periods(library.matrix, int(n_periods), period_hours)
+    print(
+        f"[Timeseries] Typical periods: {len(periods)} x {periods.period_hours} h representing "
+        f"{periods.assignment.size} periods ({len(library)} distinct load profiles)."
+    )
+    return periods
+
+
+def calculate_timeseries(data, workers: int = 1):
     """
     Calculate hourly time series for all regions, if timeseries forecast is enabled.
+
+    With workers > 1 the regions are processed in worker processes that share
+    one load-profile matrix; otherwise a thread pool is used.
     """
-    if data.input_manager.general_settings.timeseries_forecast == 0:
+    if not data.output_plan.timeseries:
         print("Calculation Timeseries is not activated")
         return None
 
@@ -338,7 +899,13 @@ def calculate_timeseries(data):
         print("Calculation Timeseries is not activated")
         return None
 
-    forecast_year_range = [str(year) for year in data.input_manager.general_settings.forecast_year_range]
+    settings = data.input_manager.general_settings
+    cache_mb = getattr(settings, 'timeseries_cache_mb', DEFAULT_TIMESERIES_CACHE_MB)
+    HOURLY_CACHE.clear()
+    HOURLY_CACHE.configure(float(cache_mb) * 1024 * 1024)
+    hourly_dtype = np.float32 if getattr(settings, 'timeseries_float32', False) else np.float64
+
+    forecast_year_range = [str(year) for year in settings.forecast_year_range]
     raw_heat_levels = getattr(data.input_manager.general_settings, 'heat_levels', []) or []
     allowed_heat_levels = [
         str(level).strip().upper()
@@ -349,7 +916,69 @@ def calculate_timeseries(data):
     regions = list(data.regions)
     if not regions:
         return None
+
+    mb = 1024 * 1024
+    writer = timeseries_writer(settings)
+    estimate = estimate_timeseries_memory(
+        regions, channels, len(forecast_year_range), hourly_dtype, HOURLY_CACHE.max_bytes, writer
+    )
+    print(
+        f"[Timeseries] Estimated peak memory: {estimate['total'] / mb:.1f} MB "
+        f"(coefficients {estimate['coefficients'] / mb:.1f} MB, profiles {estimate['profiles'] / mb:.1f} MB, "
+        f"hourly cache {estimate['hourly_cache'] / mb:.1f} MB, export {estimate['export'] / mb:.1f} MB "
+        f"as {writer['name']}; fully materialized {estimate['dense'] / mb:.1f} MB, {np.dtype(hourly_dtype).name})"
+    )
+    streaming = bool(getattr(settings, 'timeseries_streaming', False))
+    budget_mb = getattr(settings, 'timeseries_memory_budget_mb', None)
+    if budget_mb is not None and not pd.isna(budget_mb) and estimate['total'] > float(budget_mb) * mb:
+        if not writer['constant_memory']:
+            # Streaming would only shrink the cache: the writer keeps every year until the workbook closes.
+            raise ValueError(
+                f"[Timeseries] Estimated peak memory {estimate['total'] / mb:.1f} MB exceeds the configured budget "
+                f"of {float(budget_mb):.1f} MB. The xlsx writer (openpyxl) holds the whole workbook, so streaming "
+                f"export cannot bound it; install xlsxwriter (Output xlsx streaming) or choose a columnar "
+                f"timeseries output format."
+            )
+        if estimate['streaming'] > float(budget_mb) * mb:
+            raise ValueError(
+                f"[Timeseries] Estimated peak memory {estimate['streaming'] / mb:.1f} MB (streaming export) "
+                f"exceeds the configured budget of {float(budget_mb):.1f} MB. Enable float32 hourly values, "
+                f"reduce the timeseries cache or the number of regions/years."
+            )
+        if not streaming:
+            print(
+                f"[Timeseries] Estimate exceeds the budget of {float(budget_mb):.1f} MB; switching to streaming "
+                f"export ({estimate['streaming'] / mb:.1f} MB)."
+            )
+        streaming = True
+    data.timeseries_streaming = streaming
+    data.typical_periods = build_typical_periods(regions, settings)
+    if streaming:
+        # Only the year being exported needs to stay materialized.
+        HOURLY_CACHE.configure(min(HOURLY_CACHE.max_bytes, estimate['dense'] // max(1, len(forecast_year_range))))
+        print("[Timeseries] Streaming export: hourly results are materialized and written one year at a time.")
+        if not writer['constant_memory']:
+            print("[Timeseries] The xlsx writer (openpyxl) still holds all years until each workbook closes.")
+
+    store_dir = None
+    if getattr(settings, 'timeseries_spill', False):
+        base_dir = getattr(data, 'runtime_output_path', None) or data.input_manager.output_path
+        store_dir = os.path.join(str(base_dir), "timeseries_store")
+        os.makedirs(store_dir, exist_ok=True)
+        print(f"[Timeseries] Hourly results are spilled to {store_dir}")
+
+    if int(workers or 1) > 1 and len(regions) > 1:
+        _calc_timeseries_processes(
+            regions, forecast_year_range, channels, allowed_heat_levels, hourly_dtype, store_dir, workers
+        )
+        return None
+
     max_workers = min(max(1, (os.cpu_count() or 1)), len(regions))
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        list(executor.map(lambda reg: _calc_timeseries_reg(reg, forecast_year_range, channels, allowed_heat_levels), regions))
+        list(executor.map(
+            lambda reg: _calc_timeseries_reg(
+                reg, forecast_year_range, channels, allowed_heat_levels, hourly_dtype, store_dir
+            ),
+            regions,
+        ))
 
@@ -3,6 +3,7 @@ import itertools
 import numpy as np
 from endemo2.Modeling.model_final_energy import get_matches
 from endemo2.Input.loaders.common import select_rows_with_default
+from endemo2.provenance import Provenance
 
 # Switch for normalization
 
@@ -55,73 +56,87 @@ def normalize_tech_shares(data, forecast_year_range):
 
 # Hirachie durchlaufen und Variablen auslesen
     for region in data.regions:
-        for sector in region.sectors:
-            for subsector in sector.subsectors:
-                tech_share_vars = []
-                for tech in subsector.technologies:
-                    for var in getattr(tech, "ddets", []):
-                        if str(getattr(var, "name", "")).upper() != TECH_SHARE_VARIABLE_NAME:
-                            continue
-                        if getattr(var, "forecast", None) is None or var.forecast.empty:
-                            continue
-                        tech_share_vars.append(var)
-
-                # Nur normieren, wenn es mehr ale eine Technologie gibt
-                if len(tech_share_vars) < 2:
-                    continue
+        normalize_region_tech_shares(region, year_cols)
 
-                # alle Tech-shares werden in ein Array gepackt, zum übergeben an hilfsfunktion
-                combined = pd.concat([v.forecast.copy() for v in tech_share_vars], ignore_index=True)
-                combined.columns = combined.columns.astype(str)
 
-                # Es wird eine Gruppe erstellt, für die Normiert wird (also alle Technologien innerhalb eines Subsektors)
-                group_keys = [k for k in ["Region", "Sector", "Subsector"] if k in combined.columns]
-                if not group_keys or "Technology" not in combined.columns:
-                    continue
+def normalize_region_tech_shares(region, year_cols) -> list:
+    """
+    Normalize TECH_SHARE across technologies within each subsector of one region.
 
-                #Übergabe an hilfsfunktion
-                combined_num = combined.copy()
-                combined_num[year_cols] = combined_num[year_cols].apply(pd.to_numeric, errors="coerce")
-                sums = combined_num.groupby(group_keys, dropna=False)[year_cols].sum(min_count=1).reset_index()
-                needs_norm = False
-                for _, sum_row in sums.iterrows():
-                    not_norm_years = []
-                    for y in year_cols:
-                        val = sum_row.get(y)
-                        if pd.isna(val) or val <= 0:
-                            continue
-                        if abs(val - 1.0) > TECH_SHARE_NORM_TOLERANCE:
-                            not_norm_years.append(y)
-                    if not_norm_years:
-                        needs_norm = True
-                        group_desc = ", ".join(f"{k}={sum_row.get(k)}" for k in group_keys)
-                        print(
-                            f"[TECH_SHARE] Not normalized for group ({group_desc}). "
-                            f"Years: {', '.join(not_norm_years)}. Normalizing."
-                        )
-
-                if not needs_norm:
-                    continue
+    Returns the TECH_SHARE variables whose forecast was replaced.
+    """
+    updated = []
+    if not NORMALIZE_TECH_SHARE:
+        return updated
+    for sector in region.sectors:
+        for subsector in sector.subsectors:
+            tech_share_vars = []
+            for tech in subsector.technologies:
+                for var in getattr(tech, "ddets", []):
+                    if str(getattr(var, "name", "")).upper() != TECH_SHARE_VARIABLE_NAME:
+                        continue
+                    if getattr(var, "forecast", None) is None or var.forecast.empty:
+                        continue
+                    tech_share_vars.append(var)
 
-                normalized = normalize_share(
-                    combined,
-                    year_cols=year_cols,
-                    group_keys=group_keys,
-                )
+            # Nur normieren, wenn es mehr ale eine Technologie gibt
+            if len(tech_share_vars) < 2:
+                continue
 
-                # Hier werden die Normierten Werte zurück in die entsprechende Variable geschrieben
-                match_keys = group_keys + ["Technology"]
-                normalized_idx = normalized.set_index(match_keys)
-                for v in tech_share_vars:
-                    vf = v.forecast.copy()
-                    vf.columns = vf.columns.astype(str)
-                    if not all(k in vf.columns for k in match_keys):
+            # alle Tech-shares werden in ein Array gepackt, zum übergeben an hilfsfunktion
+            combined = pd.concat([v.forecast.copy() for v in tech_share_vars], ignore_index=True)
+            combined.columns = combined.columns.astype(str)
+
+            # Es wird eine Gruppe erstellt, für die Normiert wird (also alle Technologien innerhalb eines Subsektors)
+            group_keys = [k for k in ["Region", "Sector", "Subsector"] if k in combined.columns]
+            if not group_keys or "Technology" not in combined.columns:
+                continue
+
+            #Übergabe an hilfsfunktion
+            combined_num = combined.copy()
+            combined_num[year_cols] = combined_num[year_cols].apply(pd.to_numeric, errors="coerce")
+            sums = combined_num.groupby(group_keys, dropna=False)[year_cols].sum(min_count=1).reset_index()
+            needs_norm = False
+            for _, sum_row in sums.iterrows():
+                not_norm_years = []
+                for y in year_cols:
+                    val = sum_row.get(y)
+                    if pd.isna(val) or val <= 0:
                         continue
-                    vf_idx = vf.set_index(match_keys)
-                    update_cols = [c for c in year_cols if c in vf_idx.columns and c in normalized_idx.columns]
-                    if update_cols:
-                        vf_idx.update(normalized_idx[update_cols])
-                        v.forecast = vf_idx.reset_index()
+                    if abs(val - 1.0) > TECH_SHARE_NORM_TOLERANCE:
+                        not_norm_years.append(y)
+                if not_norm_years:
+                    needs_norm = True
+                    group_desc = ", ".join(f"{k}={sum_row.get(k)}" for k in group_keys)
+                    print(
+                        f"[TECH_SHARE] Not normalized for group ({group_desc}). "
+                        f"Years: {', '.join(not_norm_years)}. Normalizing."
+                    )
+
+            if not needs_norm:
+                continue
+
+            normalized = normalize_share(
+                combined,
+                year_cols=year_cols,
+                group_keys=group_keys,
+            )
+
+            # Hier werden die Normierten Werte zurück in die entsprechende Variable geschrieben
+            match_keys = group_keys + ["Technology"]
+            normalized_idx = normalized.set_index(match_keys)
+            for v in tech_share_vars:
+                vf = v.forecast.copy()
+                vf.columns = vf.columns.astype(str)
+                if not all(k in vf.columns for k in match_keys):
+                    continue
+                vf_idx = vf.set_index(match_keys)
+                update_cols = [c for c in year_cols if c in vf_idx.columns and c in normalized_idx.columns]
+                if update_cols:
+                    vf_idx.update(normalized_idx[update_cols])
+                    v.forecast = vf_idx.reset_index()
+                    updated.append(v)
+    return updated
 
 def calculate_useful_energy(data):
     """
@@ -135,49 +150,57 @@ def calculate_useful_energy(data):
     # Optional: normalize technology shares before UE is computed.
     normalize_tech_shares(data, forecast_year_range)
     for region in data.regions:
-        region_name = region.region_name
-        ue_region = []
-        for sector in region.sectors:
-            sector_name = sector.name
-            ue_per_sector = []
-            for subsector in sector.subsectors:
-                # Gather region-level results for this subsector
-                ecu = subsector.ecu
-                technologies = subsector.technologies
-                subsector_name = subsector.name
-                ue_per_subsectors = []
-                for technology in technologies:
-                    technology_name = technology.name
-                    ddets = technology.ddets  # list of dddet variables per technology
-                    ue_per_technology = calculate_ue(ecu, ddets, forecast_year_range, subsector_name,
-                                                          technology_name, sector_name, region_name,effiency_fe)
-                    technology.energy_ue = ue_per_technology
-                    if ue_per_technology is not None and not ue_per_technology.empty:
-                        ue_per_subsectors.append(ue_per_technology)
-                if not ue_per_subsectors:
-                    continue
-                ue_per_subsector = pd.concat(ue_per_subsectors, ignore_index=True)
-                subsector.energy_ue = ue_per_subsector
-                ue_per_sector.append(ue_per_subsector)
-            if not ue_per_sector:
+        calculate_region_useful_energy(region, forecast_year_range, effiency_fe)
+
+
+def calculate_region_useful_energy(region, forecast_year_range, effiency_fe):
+    """Calculate useful energy for all technologies of one region and roll it up the hierarchy."""
+    region_name = region.region_name
+    ue_region = []
+    for sector in region.sectors:
+        sector_name = sector.name
+        ue_per_sector = []
+        for subsector in sector.subsectors:
+            # Gather region-level results for this subsector
+            ecu = subsector.ecu
+            technologies = subsector.technologies
+            subsector_name = subsector.name
+            ue_per_subsectors = []
+            for technology in technologies:
+                technology_name = technology.name
+                ddets = technology.ddets  # list of dddet variables per technology
+                ue_per_technology = calculate_ue(ecu, ddets, forecast_year_range, subsector_name,
+                                                      technology_name, sector_name, region_name,effiency_fe)
+                technology.energy_ue = ue_per_technology
+                if ue_per_technology is not None and not ue_per_technology.empty:
+                    ue_per_subsectors.append(ue_per_technology)
+            if not ue_per_subsectors:
                 continue
-            ue_sector = pd.concat(ue_per_sector, ignore_index=True)
-            sector.energy_ue = ue_sector
-            ue_region.append(ue_sector)
-        if ue_region:
-            ue_per_region = pd.concat(ue_region, ignore_index=True)
-            region.energy_ue = ue_per_region
+            ue_per_subsector = pd.concat(ue_per_subsectors, ignore_index=True)
+            subsector.energy_ue = ue_per_subsector
+            ue_per_sector.append(ue_per_subsector)
+        if not ue_per_sector:
+            continue
+        ue_sector = pd.concat(ue_per_sector, ignore_index=True)
+        sector.energy_ue = ue_sector
+        ue_region.append(ue_sector)
+    if ue_region:
+        ue_per_region = pd.concat(ue_region, ignore_index=True)
+        region.energy_ue = ue_per_region
 
 
-def _build_ue_trace(region_name, sector_name, subsector_name, technology_name, ecu_name, ddet_names, ue_type, subtech, drive, temp_level="TOTAL"):
+def _build_ue_trace(region_name, sector_name, subsector_name, technology_name, ecu_name, ddet_names, ue_type, subtech, drive, temp_level="TOTAL", derived_from=None):
     """Build compact per-row trace text for useful-energy rows."""
     ddet_txt = ",".join(sorted({str(n) for n in ddet_names})) if ddet_names else "none"
-    return (
+    trace = (
         f"Region={region_name} | Sector={sector_name} | Subsector={subsector_name} | "
         f"Technology={technology_name} | UE_Type={ue_type} | Temp_level={temp_level} | "
         f"ECU={ecu_name} | DDets={ddet_txt} | Subtech={subtech if subtech is not None else 'default'} | "
         f"Drive={drive if drive is not None else 'default'}"
     )
+    if derived_from:
+        trace += f" | DerivedFrom={derived_from}"
+    return trace
 
 
 def calculate_ue(ecu, ddets, forecast_year_range,
@@ -320,7 +343,8 @@ def calculate_ue(ecu, ddets, forecast_year_range,
                 "Temp_level": "TOTAL",
                 "Subtech": subtech if subtech is not None else "default",
                 "Drive": drive if drive is not None else "default",
-                "Trace": _build_ue_trace(
+                "Trace": Provenance(
+                    _build_ue_trace,
                     region_name=region_name,
                     sector_name=sector_name,
                     subsector_name=subsector_name,
@@ -385,7 +409,8 @@ def calculate_ue(ecu, ddets, forecast_year_range,
                 "Temp_level": temp_level,
                 "Subtech": subtech if subtech is not None else "default",
                 "Drive": drive if drive is not None else "default",
-                "Trace": _build_ue_trace(
+                "Trace": Provenance(
+                    _build_ue_trace,
                     region_name=region_name,
                     sector_name=sector_name,
                     subsector_name=subsector_name,
@@ -396,7 +421,8 @@ def calculate_ue(ecu, ddets, forecast_year_range,
                     subtech=subtech,
                     drive=drive,
                     temp_level=temp_level,
-                ) + " | DerivedFrom=HeatTotal*Share",
+                    derived_from="HeatTotal*Share",
+                ),
             }
             temp_entry.update(heat_values_level.to_dict())
             ue_entries.append(temp_entry)
@@ -410,7 +436,8 @@ def calculate_ue(ecu, ddets, forecast_year_range,
                     f"{technology_name} (Subtech={subtech}, Drive={drive}). Max deviation={max_dev:.4f}"
                 )
 
-        total_trace = _build_ue_trace(
+        total_trace = Provenance(
+            _build_ue_trace,
             region_name=region_name,
             sector_name=sector_name,
             subsector_name=subsector_name,
@@ -421,7 +448,8 @@ def calculate_ue(ecu, ddets, forecast_year_range,
             subtech=subtech,
             drive=drive,
             temp_level="TOTAL",
-        ) + " | DerivedFrom=DirectHeatTotal"
+            derived_from="DirectHeatTotal",
+        )
 
         total_entry = {
             "Region": region_name,
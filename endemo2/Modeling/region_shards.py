@@ -0,0 +1,147 @@
+"""
+Region-sharded execution of the per-region model stages.
+
+Once the ECU/DDet forecasts exist, useful energy, final energy and the
+subregional disaggregation only depend on one Region subtree plus the shared
+efficiency/share forecasts. This module ships each Region to a worker process,
+runs UE -> FE -> subregions there and merges the returned result tables back
+into the hierarchy in data.regions order, so results do not depend on worker
+scheduling.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from endemo2.Modeling.model_useful_energy import calculate_region_useful_energy, normalize_region_tech_shares
+from endemo2.Modeling.model_final_energy import build_fe_lookups, calculate_region_final_energy
+from endemo2.Modeling.subregional_disaggregation import SubregionalDisaggregation
+
+
+# Shared (per worker process) inputs, set once by the pool initializer.
+_SHARED = {}
+
+
+def _init_worker(shared: dict) -> None:
+    _SHARED.clear()
+    _SHARED.update(shared)
+
+
+def _subregional_channels(plan) -> list[str]:
+    channels = ["UE", "ECU"]
+    if plan.fe:
+        channels.append("FE")
+    return channels
+
+
+def _run_region_shard(region) -> dict:
+    """Run UE -> FE -> subregions for one region and return compact result tables."""
+    year_cols = _SHARED["year_cols"]
+
+    updated_shares = normalize_region_tech_shares(region, year_cols)
+    calculate_region_useful_energy(region, year_cols, _SHARED["efficiency_fe"])
+    if _SHARED["fe_enabled"]:
+        eff_lookup, share_lookup = _SHARED["fe_lookups"]
+        calculate_region_final_energy(region, eff_lookup, share_lookup, year_cols)
+
+    # Results are addressed by position in the region subtree.
+    nodes = {(): region}
+    ddet_paths = {}
+    for i_sec, sector in enumerate(region.sectors):
+        nodes[(i_sec,)] = sector
+        for i_sub, subsector in enumerate(sector.subsectors):
+            nodes[(i_sec, i_sub)] = subsector
+            for i_tech, tech in enumerate(subsector.technologies):
+                nodes[(i_sec, i_sub, i_tech)] = tech
+                for i_var, var in enumerate(tech.ddets):
+                    ddet_paths[id(var)] = (i_sec, i_sub, i_tech, i_var)
+
+    result = {
+        "energy_ue": {path: node.energy_ue for path, node in nodes.items()},
+        "energy_fe": {path: node.energy_fe for path, node in nodes.items()},
+        "tech_shares": {ddet_paths[id(var)]: var.forecast for var in updated_shares if id(var) in ddet_paths},
+        "subregional": {},
+        "subregional_errors": set(),
+    }
+
+    if _SHARED["subregional_on"]:
+        disaggregation = SubregionalDisaggregation(
+            [region], _SHARED["subregions"], _SHARED["subregion_division_forecast"], year_cols
+        )
+        for channel in _SHARED["subregional_channels"]:
+            result["subregional"][channel] = disaggregation.compute(channel)
+        result["subregional_errors"] = disaggregation.errors
+    return result
+
+
+def _merge_region_result(region, result: dict) -> None:
+    nodes = {(): region}
+    for i_sec, sector in enumerate(region.sectors):
+        nodes[(i_sec,)] = sector
+        for i_sub, subsector in enumerate(sector.subsectors):
+            nodes[(i_sec, i_sub)] = subsector
+            for i_tech, tech in enumerate(subsector.technologies):
+                nodes[(i_sec, i_sub, i_tech)] = tech
+
+    for path, node in nodes.items():
+        node.energy_ue = result["energy_ue"].get(path)
+        node.energy_fe = result["energy_fe"].get(path)
+    for (i_sec, i_sub, i_tech, i_var), forecast in result["tech_shares"].items():
+        tech = region.sectors[i_sec].subsectors[i_sub].technologies[i_tech]
+        tech.ddets[i_var].forecast = forecast
+
+
+def calculate_region_stages(data, workers: int):
+    """
+    Calculate useful energy, final energy and subregional results region by region
+    in `workers` processes.
+
+    UE/FE results are attached to the hierarchy as in the sequential pipeline.
+    Subregional tables are stored on data.subregional_results (per channel) and
+    picked up by the subregional writers instead of recomputing them.
+    """
+    settings = data.input_manager.general_settings
+    regions = list(data.regions)
+    if not regions:
+        return None
+
+    year_cols = [str(year) for year in settings.forecast_year_range]
+    plan = data.output_plan
+    fe_enabled = plan.fe
+    subregional_on = plan.subregional
+    if not fe_enabled:
+        print("Calculation Final energy is not activated")
+
+    shared = {
+        "year_cols": year_cols,
+        "fe_enabled": fe_enabled,
+        "fe_lookups": build_fe_lookups(data, year_cols) if fe_enabled else None,
+        "efficiency_fe": data.efficiency_data[0].forecast,
+        "subregional_on": subregional_on,
+        "subregional_channels": _subregional_channels(plan),
+        "subregions": data.subregions if subregional_on else {},
+        "subregion_division_forecast": (
+            getattr(data, "subregion_division_forecast", pd.DataFrame()) if subregional_on else pd.DataFrame()
+        ),
+    }
+
+    max_workers = min(max(1, int(workers)), len(regions))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(shared,)) as executor:
+        results = list(executor.map(_run_region_shard, regions))
+
+    subregional = {channel: [] for channel in _subregional_channels(plan)} if subregional_on else {}
+    errors = set()
+    for region, result in zip(regions, results):
+        _merge_region_result(region, result)
+        for channel, frame in result["subregional"].items():
+            if frame is not None and not frame.empty:
+                subregional[channel].append(frame)
+        errors.update(result["subregional_errors"])
+
+    if subregional_on:
+        data.subregional_results = {
+            channel: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            for channel, frames in subregional.items()
+        }
+        data.subregional_errors = errors
+    return None
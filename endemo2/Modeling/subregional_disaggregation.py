@@ -0,0 +1,435 @@
+"""
+Subregional disaggregation of regional results.
+
+The UE, FE and ECU tables of every region are split into subregions with the
+subregional division forecast: each (Region, Sector, Subsector) names a
+distribution variable in the sector settings ("Subregional_division"), whose
+forecast rows are matched on the source row metadata and normalized per year.
+The output writers and the region-sharded worker processes use the same
+SubregionalDisaggregation, so both produce identical tables.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from endemo2.Input.loaders.common import select_rows_with_default
+from endemo2.provenance import Provenance
+
+
+# Source row metadata the distribution rows are matched on
+SUBREGIONAL_MATCH_KEYS = ("Sector", "Subsector", "Technology", "UE_Type", "FE_Type", "Temp_level", "Subtech", "Drive")
+
+# Dict key of missing (NaN) metadata values, which do not compare equal to themselves
+_NAN_KEY = ("nan",)
+
+
+def _build_subregional_trace(source_trace, dist_var, normalized_flag):
+    """Build trace text for subregional rows from the trace of their source row."""
+    if pd.isna(source_trace):
+        source_trace = ""
+    base_trace = str(source_trace).strip()
+    dist_trace = f"SubregionalDivision={dist_var}; Normalized={normalized_flag}"
+    return f"{base_trace} | {dist_trace}" if base_trace else dist_trace
+
+
+def _norm_var(value) -> str:
+    if pd.isna(value):
+        return ""
+    return str(value).strip().upper().replace(" ", "").replace("_", "")
+
+
+def _is_default(value) -> bool:
+    if pd.isna(value):
+        return True
+    s = str(value).strip().lower()
+    return s in {"", "default", "none", "nan"}
+
+
+def prepare_distribution_weights(match_df: pd.DataFrame, year_cols: list) -> tuple[pd.DataFrame, bool]:
+    """Distribution rows normalized to shares per year, and whether they had to be normalized."""
+    block = match_df[year_cols]
+    try:
+        weights = block.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        weights = block.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    sums = np.nansum(weights, axis=0)
+    normalized = bool(((sums > 0) & ~(np.isclose(sums, 1.0, atol=1e-6) | np.isclose(sums, 100.0, atol=1e-4))).any())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        norm = np.where(sums > 0, weights / np.where(sums > 0, sums, 1.0), np.nan)
+    norm = np.where(np.isnan(norm), 0.0, norm)
+    return pd.DataFrame(norm, index=match_df.index, columns=year_cols), normalized
+
+
+class SubregionalDisaggregation:
+    """
+    Distribution matching and subregional tables of a set of regions.
+
+    Unresolved distributions are recorded in `errors` as (channel, region,
+    sector, subsector, message) tuples; pass a shared set to collect them
+    across several instances.
+    """
+
+    def __init__(self, regions, subregions: dict, dist_df: pd.DataFrame, forecast_years, errors: set = None):
+        self.regions = list(regions)
+        self.subregions = subregions or {}
+        self.dist_df = dist_df
+        self.forecast_years = [str(y) for y in forecast_years]
+        self.errors = set() if errors is None else errors
+        self._variable_map = None
+        self._candidates = None
+
+    @classmethod
+    def from_data(cls, data, errors: set = None) -> "SubregionalDisaggregation":
+        return cls(
+            data.regions,
+            getattr(data, "subregions", {}),
+            getattr(data, "subregion_division_forecast", None),
+            data.input_manager.general_settings.forecast_year_range,
+            errors,
+        )
+
+    def log_error(self, channel: str, region: str, sector: str, subsector: str, message: str) -> None:
+        # Mapping diagnostics are tracked in-memory but intentionally not printed to console.
+        self.errors.add((channel, region, str(sector), str(subsector), message))
+
+    def variable_map(self) -> dict:
+        """(Region, Sector, Subsector) -> distribution variable from the sector settings."""
+        if self._variable_map is not None:
+            return self._variable_map
+        mapping = {}
+        for region in self.regions:
+            for sector in region.sectors:
+                settings = getattr(sector, "settings", None)
+                if settings is None or settings.empty:
+                    continue
+                if "Subregional_division" not in settings.columns:
+                    continue
+                for subsector_name, row in settings.iterrows():
+                    val = row.get("Subregional_division")
+                    if pd.isna(val) or str(val).strip() == "":
+                        continue
+                    key = (region.region_name, str(sector.name).strip(), str(subsector_name).strip())
+                    mapping[key] = str(val).strip()
+        self._variable_map = mapping
+        return mapping
+
+    def candidates(self) -> dict:
+        """Distribution rows grouped by (region, normalized variable), in input order."""
+        if self._candidates is None:
+            dist_df = self.dist_df
+            keys = pd.DataFrame({
+                "Region": dist_df["Region"].astype(str).str.strip().to_numpy(),
+                "Variable": dist_df["Variable"].apply(_norm_var).to_numpy(),
+            })
+            groups = keys.groupby(["Region", "Variable"], sort=False, dropna=False).indices
+            self._candidates = {key: dist_df.iloc[positions] for key, positions in groups.items()}
+        return self._candidates
+
+    def match_distribution_rows(self, source_row: pd.Series, dist_var: str, region_name: str) -> pd.DataFrame:
+        target_var = _norm_var(dist_var)
+        df = self.candidates().get((str(region_name).strip(), target_var), self.dist_df.iloc[0:0])
+        if df.empty:
+            return df
+
+        # Primary resolver: same hierarchical default-mapping as DDr.
+        # This enforces ordered priority instead of global "best score".
+        def _resolve_with_default(criteria_keys: list[str]) -> pd.DataFrame:
+            ordered = [k for k in criteria_keys if k in df.columns]
+            if not ordered:
+                return df
+            criteria = {k: source_row.get(k) for k in ordered}
+            return select_rows_with_default(df=df, criteria=criteria, ordered_columns=ordered)
+
+        def _dedupe_best_per_subregion(input_df: pd.DataFrame, ordered_keys: list[str]) -> pd.DataFrame:
+            """
+            Keep only the most specific row per subregion.
+
+            This is the final resolver step that avoids returning both exact and
+            default matches for the same target subregion.
+            """
+            if input_df is None or input_df.empty:
+                return input_df
+            if "Subregion" not in input_df.columns:
+                return input_df
+
+            keys = [k for k in ordered_keys if k in input_df.columns]
+            if not keys:
+                return input_df
+
+            ranked = input_df.copy()
+            # Build a lexicographic specificity tuple in hierarchy order.
+            # non-default (1) outranks default (0), earlier keys are more important.
+            ranked["_spec_tuple"] = ranked[keys].apply(
+                lambda r: tuple(0 if _is_default(v) else 1 for v in r),
+                axis=1,
+            )
+            ranked["_rowid"] = np.arange(len(ranked))
+            ranked = ranked.sort_values(["Subregion", "_spec_tuple", "_rowid"], ascending=[True, False, True])
+            ranked = ranked.drop_duplicates(subset=["Subregion"], keep="first")
+            ranked = ranked.sort_values("_rowid")
+            return ranked.drop(columns=["_spec_tuple", "_rowid"], errors="ignore")
+
+        def _cell_matches_target(cell_value, target_value) -> bool:
+            """Allow exact match or list-like match (comma/semicolon) in scenario cells."""
+            if _is_default(cell_value):
+                return True
+            if pd.isna(target_value):
+                return False
+            target = str(target_value).strip()
+            if target == "":
+                return False
+            raw = str(cell_value).strip()
+            if raw == target:
+                return True
+            # Support cells like "A, B, C" or "A;B;C"
+            tokens = [t.strip() for t in re.split(r"[;,]", raw) if t.strip()]
+            if not tokens:
+                return False
+            target_norm = target.casefold()
+            return any(t.casefold() == target_norm for t in tokens)
+
+        def _match_with_keys(input_df: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+            out_df = input_df
+            for col in keys:
+                if col not in out_df.columns:
+                    continue
+                val = source_row.get(col)
+                out_df = out_df[out_df[col].apply(lambda c: _cell_matches_target(c, val))]
+                if out_df.empty:
+                    return out_df
+            if out_df.empty:
+                return out_df
+            spec_scores = []
+            for _, row in out_df.iterrows():
+                score = 0
+                for col in keys:
+                    if col not in out_df.columns:
+                        continue
+                    if not _is_default(row.get(col)):
+                        score += 1
+                spec_scores.append(score)
+            scored = out_df.copy()
+            scored["_spec"] = spec_scores
+            scored = scored[scored["_spec"] == scored["_spec"].max()]
+            return scored.drop(columns=["_spec"], errors="ignore")
+
+        # 1) Primary match: full metadata (keeps UE/Temp-specific distributions when defined)
+        full_keys = list(SUBREGIONAL_MATCH_KEYS)
+        matched = _resolve_with_default(full_keys)
+        if not matched.empty:
+            return _dedupe_best_per_subregion(matched, full_keys)
+
+        # Compatibility fallback: legacy list-like cell matching ("A, B; C").
+        matched = _match_with_keys(df, full_keys)
+        if not matched.empty:
+            return _dedupe_best_per_subregion(matched, full_keys)
+
+        # 2) Fallback: subsector-level distribution (independent of energy type)
+        base_keys = ["Sector", "Subsector", "Technology"]
+        matched = _resolve_with_default(base_keys)
+        if not matched.empty:
+            return _dedupe_best_per_subregion(matched, base_keys)
+        return _dedupe_best_per_subregion(_match_with_keys(df, base_keys), base_keys)
+
+    def matched_distribution(self, channel: str, source_row: pd.Series, dist_var: str, region_name: str):
+        """
+        Distribution rows of one source row, or None (error logged) when they are
+        missing or do not cover the region's subregions.
+        """
+        sector = str(source_row.get("Sector", "")).strip()
+        subsector = str(source_row.get("Subsector", "")).strip()
+        match_df = self.match_distribution_rows(source_row, dist_var, region_name)
+        if match_df.empty:
+            self.log_error(
+                channel,
+                region_name,
+                sector,
+                subsector,
+                f"No subregional forecast rows found for distribution variable '{dist_var}'.",
+            )
+            return None
+
+        expected_subs = set((self.subregions.get(region_name) or {}).keys())
+        found_subs = set(match_df["Subregion"].astype(str).str.strip().tolist())
+        if expected_subs and found_subs != expected_subs:
+            missing = sorted(expected_subs - found_subs)
+            extra = sorted(found_subs - expected_subs)
+            self.log_error(
+                channel,
+                region_name,
+                sector,
+                subsector,
+                f"Subregion mismatch (missing={missing}, extra={extra}) for variable '{dist_var}'.",
+            )
+            return None
+        return match_df
+
+    def source_frames(self, channel: str) -> list:
+        """(region name, source table) blocks of a channel: UE/FE tables per region, ECU forecasts per subsector."""
+        blocks = []
+        if channel in ("UE", "FE"):
+            attr = "energy_fe" if channel == "FE" else "energy_ue"
+            for region in self.regions:
+                frame = getattr(region, attr)
+                if frame is None or frame.empty:
+                    continue
+                blocks.append((region.region_name, frame))
+            return blocks
+
+        if channel == "ECU":
+            for region in self.regions:
+                for sector in region.sectors:
+                    for subsector in sector.subsectors:
+                        ecu = getattr(subsector, "ecu", None)
+                        ecu_forecast = getattr(ecu, "forecast", None)
+                        if ecu_forecast is None or ecu_forecast.empty:
+                            self.log_error("ECU", region.region_name, sector.name, subsector.name, "Missing ECU forecast.")
+                            continue
+                        frame = ecu_forecast.copy()
+                        frame["Region"] = region.region_name
+                        frame["Sector"] = sector.name
+                        frame["Subsector"] = subsector.name
+                        frame["Technology"] = "default"
+                        blocks.append((region.region_name, frame))
+            return blocks
+
+        return blocks
+
+    def _resolve_distribution(self, channel: str, source_row: pd.Series, dist_var: str, region_name: str,
+                              year_cols: list, forecast_years: list):
+        """Subregions, normalized weights (subregions x forecast years) and the normalized flag, or None."""
+        match_df = self.matched_distribution(channel, source_row, dist_var, region_name)
+        if match_df is None:
+            return None
+        norm_weights, normalized_flag = prepare_distribution_weights(match_df, year_cols)
+        weights = norm_weights[forecast_years].to_numpy(dtype=np.float64)
+        return match_df["Subregion"].to_numpy(), weights, normalized_flag
+
+    def distribute_source_frame(self, channel: str, region_name: str, source: pd.DataFrame, year_cols: list,
+                                forecast_years: list, resolved: dict):
+        """
+        Subregional rows of one source table.
+
+        Rows sharing region, distribution variable and matching metadata share
+        one resolved distribution (cached in `resolved`). The weights of all
+        rows form a sparse (source row x subregion) matrix per year, stored in
+        coordinate form; the subregional values are its product with the source
+        values, and the metadata is expanded with the same row index.
+        """
+        dist_map = self.variable_map()
+        n_rows = len(source)
+        names = [str(col) for col in source.columns]
+        positions = {}
+        for pos, name in enumerate(names):
+            positions.setdefault(name, pos)
+
+        def column(name: str) -> np.ndarray:
+            pos = positions.get(name)
+            if pos is None:
+                return np.full(n_rows, None, dtype=object)
+            return source.iloc[:, pos].to_numpy(dtype=object)
+
+        def text_column(name: str) -> list:
+            if name not in positions:
+                return [""] * n_rows
+            return [str(value).strip() for value in column(name)]
+
+        match_columns = {key: column(key) for key in SUBREGIONAL_MATCH_KEYS}
+        sector_names = text_column("Sector")
+        subsector_names = text_column("Subsector")
+
+        row_ids = []
+        distribution_ids = []
+        dist_vars = []
+        for row in range(n_rows):
+            sector = sector_names[row]
+            subsector = subsector_names[row]
+            dist_var = dist_map.get((region_name, sector, subsector))
+            if not dist_var:
+                self.log_error(channel, region_name, sector, subsector, "Missing 'Subregional_division' setting.")
+                continue
+            key = (region_name, dist_var) + tuple(
+                _NAN_KEY if isinstance(values[row], float) and values[row] != values[row]
+                else (type(values[row]), values[row])
+                for values in match_columns.values()
+            )
+            if key not in resolved:
+                resolved[key] = self._resolve_distribution(
+                    channel, source.iloc[row], dist_var, region_name, year_cols, forecast_years
+                )
+            if resolved[key] is None:
+                continue
+            row_ids.append(row)
+            distribution_ids.append(key)
+            dist_vars.append(dist_var)
+        if not row_ids:
+            return None
+
+        distributions = [resolved[key] for key in distribution_ids]
+        counts = np.array([len(subregions) for subregions, _, _ in distributions], dtype=np.int64)
+        entry_rows = np.repeat(np.asarray(row_ids, dtype=np.int64), counts)
+        entry_sources = np.repeat(np.arange(len(row_ids)), counts)
+        subregions = np.concatenate([subregions for subregions, _, _ in distributions])
+        weights = np.concatenate([weights for _, weights, _ in distributions], axis=0)
+        normalized = np.array([flag for _, _, flag in distributions], dtype=bool)
+
+        source_values = np.full((n_rows, len(forecast_years)), np.nan, dtype=np.float64)
+        for pos, year in enumerate(forecast_years):
+            if year in positions:
+                source_values[:, pos] = pd.to_numeric(source.iloc[:, positions[year]], errors="coerce").to_numpy(
+                    dtype=np.float64, na_value=np.nan
+                )
+        values = weights * source_values[entry_rows]
+
+        variables = column("Variable")
+        fallback = column("FE_Type") if channel == "FE" else column("UE_Type") if channel == "UE" else None
+        traces = column("Trace")
+        row_traces = np.empty(len(row_ids), dtype=object)
+        row_variables = np.empty(len(row_ids), dtype=object)
+        for pos, row in enumerate(row_ids):
+            variable = variables[row]
+            if pd.isna(variable) or str(variable).strip() == "":
+                variable = fallback[row] if fallback is not None else "ECU"
+            row_variables[pos] = variable
+            row_traces[pos] = Provenance(_build_subregional_trace, traces[row], dist_vars[pos], bool(normalized[pos]))
+
+        def expanded(values: np.ndarray) -> pd.Series:
+            return pd.Series(values, dtype=object).infer_objects()
+
+        meta = {
+            "Region": expanded(np.full(entry_rows.size, region_name, dtype=object)),
+            "Subregion": pd.Series(subregions),
+            "Sector": expanded(match_columns["Sector"][entry_rows]),
+            "Subsector": expanded(match_columns["Subsector"][entry_rows]),
+            "Variable": expanded(row_variables[entry_sources]),
+        }
+        for key in ("Technology", "UE_Type", "FE_Type", "Temp_level", "Subtech", "Drive"):
+            meta[key] = expanded(match_columns[key][entry_rows])
+        meta["Trace"] = pd.Series(row_traces[entry_sources], dtype=object)
+        meta["Distribution_variable"] = pd.Series(np.asarray(dist_vars, dtype=object)[entry_sources], dtype=object)
+        meta["Normalized"] = pd.Series(normalized[entry_sources])
+        out = pd.DataFrame(meta)
+        return pd.concat([out, pd.DataFrame(values, columns=forecast_years)], axis=1)
+
+    def compute(self, channel: str) -> pd.DataFrame:
+        """Subregional table of a channel ("UE", "FE" or "ECU"); empty without distributions."""
+        dist_df = self.dist_df
+        if dist_df is None or dist_df.empty:
+            return pd.DataFrame()
+        if not self.variable_map():
+            return pd.DataFrame()
+
+        year_cols = [str(c) for c in dist_df.columns if str(c).isdigit()]
+        forecast_years = [y for y in self.forecast_years if y in year_cols]
+        resolved = {}
+        output_frames = []
+        for region_name, source in self.source_frames(channel):
+            out_df = self.distribute_source_frame(channel, region_name, source, year_cols, forecast_years, resolved)
+            if out_df is not None:
+                output_frames.append(out_df)
+
+        if not output_frames:
+            return pd.DataFrame()
+        return pd.concat(output_frames, ignore_index=True)
@@ -0,0 +1,101 @@
+"""
+Typical-period aggregation of the hourly output.
+
+The distinct load profiles of all regions are cut into periods (days by default)
+and the periods are grouped by hierarchical (Ward) clustering. Each cluster is
+represented by its medoid period and weighted by the number of periods it
+stands for. Hourly results are emitted as K representative periods per
+component and year; every component is rescaled so that the weighted sum of its
+representative periods equals its annual hourly total exactly.
+"""
+
+import numpy as np
+from scipy.cluster.hierarchy import fcluster, linkage
+
+
+class TypicalPeriods:
+    """
+    K representative periods of a year.
+
+    - medoids: period index (0-based) of the representative period of each cluster
+    - weights: number of periods each representative stands for
+    - assignment: cluster (0-based) of every period of the year
+    """
+
+    def __init__(self, period_hours: int, medoids: np.ndarray, weights: np.ndarray, assignment: np.ndarray):
+        self.period_hours = int(period_hours)
+        self.medoids = np.asarray(medoids, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.assignment = np.asarray(assignment, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.medoids.size
+
+    @property
+    def hours(self) -> np.ndarray:
+        """Hour indices of the representative periods, period-major (K * period_hours)."""
+        offsets = np.arange(self.period_hours)
+        return (self.medoids[:, None] * self.period_hours + offsets).ravel()
+
+    def represent(self, values: np.ndarray, totals: np.ndarray) -> np.ndarray:
+        """
+        Scale representative-period values (rows x K * period_hours) so that the
+        weighted sum of each row equals its annual total. Rows whose
+        representative periods are all zero but whose total is not are spread
+        evenly over all represented hours.
+        """
+        values = np.array(values, dtype=np.float64, ndmin=2)
+        totals = np.asarray(totals, dtype=np.float64)
+        hour_weights = np.repeat(self.weights, self.period_hours)
+        weighted = values @ hour_weights
+        flat = (weighted == 0) & (totals != 0)
+        if flat.any():
+            values[flat] = 1.0
+            weighted[flat] = hour_weights.sum()
+        scale = np.divide(totals, weighted, out=np.zeros_like(totals), where=weighted != 0)
+        return values * scale[:, None]
+
+
+def cluster_typical_periods(profile_matrix: np.ndarray, n_periods: int, period_hours: int = 24,
+                            hours: int = 8760) -> TypicalPeriods:
+    """
+    Cluster the periods of a (profiles x hours) matrix into n_periods typical periods.
+
+    Every profile is scaled to its peak so that all profiles weigh equally in the
+    period distance; a trailing incomplete period is ignored.
+    """
+    period_hours = int(period_hours)
+    if period_hours <= 0:
+        raise ValueError(f"Typical period length must be a positive number of hours, got {period_hours}.")
+    n_total = min(int(hours), profile_matrix.shape[1]) // period_hours
+    if n_total == 0:
+        raise ValueError(f"Load profiles are shorter than one typical period ({period_hours} hours).")
+    n_periods = max(1, min(int(n_periods), n_total))
+
+    values = np.asarray(profile_matrix[:, :n_total * period_hours], dtype=np.float64)
+    peak = np.abs(values).max(axis=1, keepdims=True)
+    values = np.divide(values, peak, out=np.zeros_like(values), where=peak != 0)
+    # periods x (profiles * period_hours)
+    features = values.reshape(values.shape[0], n_total, period_hours).transpose(1, 0, 2).reshape(n_total, -1)
+
+    if n_periods == n_total:
+        labels = np.arange(n_total)
+    else:
+        labels = fcluster(linkage(features, method="ward"), t=n_periods, criterion="maxclust") - 1
+
+    medoids = []
+    members = []
+    for label in np.unique(labels):
+        idx = np.flatnonzero(labels == label)
+        centroid = features[idx].mean(axis=0)
+        medoids.append(idx[np.argmin(((features[idx] - centroid) ** 2).sum(axis=1))])
+        members.append(idx)
+
+    # Representative periods in chronological order.
+    order = np.argsort(medoids, kind="stable")
+    assignment = np.empty(n_total, dtype=np.int64)
+    weights = np.empty(len(order), dtype=np.float64)
+    for cluster, pos in enumerate(order):
+        assignment[members[pos]] = cluster
+        weights[cluster] = members[pos].size
+    return TypicalPeriods(period_hours, np.asarray(medoids)[order], weights, assignment)
@@ -3,13 +3,14 @@ from time import perf_counter
 from pathlib import Path
 import pandas as pd
 
-from endemo2.Input.model_config import InputManager, is_truthy
+from endemo2.Input.model_config import InputManager
 from endemo2.Input.hierachy_builder import initialize_hierarchy_and_load_input
 from endemo2.Modeling.dependent_ddr_forecast import forecast_dependent_ddrs
 from endemo2.Modeling.subregion_division_forecast import forecast_subregion_division
 from endemo2.Modeling.model_ECU_DDet import calc_ECU_DDet
 from endemo2.Modeling.model_useful_energy import calculate_useful_energy
 from endemo2.Modeling.model_final_energy import calculate_final_energy
+from endemo2.Modeling.region_shards import calculate_region_stages
 from endemo2.Modeling.model_timeseries import calculate_timeseries
 from endemo2.output.output_to_excel import ExcelWriter
 
@@ -19,8 +20,11 @@ class Endemo:
     This is the whole program. From here we control what the model does on the highest level.
     """
 
-    def __init__(self):
+    def __init__(self, workers: int = 1):
         self.input_manager = None
+        # Number of worker processes (1 = sequential) for the region-sharded UE/FE/subregional stages,
+        # the timeseries calculation and the output workbook writers.
+        self.workers = max(1, int(workers or 1))
         self.data = None
         self.output_to_excel = None
         self.run_timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -114,12 +118,12 @@ class Endemo:
         print(f"[{self._timestamp()}] Input data successfully read. ({perf_counter() - step_start:.2f}s)")
 
         # Forecast dependent demand drivers first (so they can be used by ECU/DDet)
-        subregional_on = is_truthy(self.input_manager.general_settings.subregional_resolution)
+        plan = self.data.output_plan
         print(f"[{self._timestamp()}] Do DDr and Subregional forecast")
         step_start = perf_counter()
         forecast_dependent_ddrs(self.data)
         # Forecast subregional division (parallel channel) only when enabled
-        if subregional_on:
+        if plan.subregional:
             forecast_subregion_division(self.data)
         print(f"[{self._timestamp()}] Forecast for DDrs and Subregions done ({perf_counter() - step_start:.2f}s)")
 
@@ -134,27 +138,36 @@ class Endemo:
         self._validate_forecast_completeness()
         print(f"[{self._timestamp()}] Forecast completeness successfully validated ({perf_counter() - step_start:.2f}s)")
 
-        # Calculate useful energy
-        print(f"[{self._timestamp()}] Calculate useful energy ...")
-        step_start = perf_counter()
-        calculate_useful_energy(self.data)
-        print(f"[{self._timestamp()}] Calculate useful energy successfully done... ({perf_counter() - step_start:.2f}s)")
-
-        # Calculate final energy
-        print(f"[{self._timestamp()}] Calculate Final energy ...")
-        step_start = perf_counter()
-        calculate_final_energy(self.data)
-        print(f"[{self._timestamp()}] Calculate Final energy successfully done... ({perf_counter() - step_start:.2f}s)")
+        if not plan.ue:
+            print(f"[{self._timestamp()}] Useful and final energy skipped (no enabled output consumes them)")
+        elif self.workers > 1 and len(self.data.regions) > 1:
+            # UE -> FE -> subregional division per region in worker processes
+            print(f"[{self._timestamp()}] Calculate useful energy, final energy and subregions ({self.workers} workers) ...")
+            step_start = perf_counter()
+            calculate_region_stages(self.data, self.workers)
+            print(f"[{self._timestamp()}] Region stages successfully done... ({perf_counter() - step_start:.2f}s)")
+        else:
+            # Calculate useful energy
+            print(f"[{self._timestamp()}] Calculate useful energy ...")
+            step_start = perf_counter()
+            calculate_useful_energy(self.data)
+            print(f"[{self._timestamp()}] Calculate useful energy successfully done... ({perf_counter() - step_start:.2f}s)")
+
+            # Calculate final energy
+            print(f"[{self._timestamp()}] Calculate Final energy ...")
+            step_start = perf_counter()
+            calculate_final_energy(self.data)
+            print(f"[{self._timestamp()}] Calculate Final energy successfully done... ({perf_counter() - step_start:.2f}s)")
 
         print(f"[{self._timestamp()}] Calculate Timeseries ...")
         step_start = perf_counter()
-        calculate_timeseries(self.data)
+        calculate_timeseries(self.data, self.workers)
         print(f"[{self._timestamp()}] Calculate Timeseries successfully done... ({perf_counter() - step_start:.2f}s)")
 
         # generate output files
         print(f"[{self._timestamp()}] Export output to excel ...")
         step_start = perf_counter()
-        self.output_to_excel = ExcelWriter(self.data)
+        self.output_to_excel = ExcelWriter(self.data, self.workers)
         print(f"[{self._timestamp()}] Exporting successfully done... ({perf_counter() - step_start:.2f}s)")
 
         print(f"[{self._timestamp()}] End Endemo run ({perf_counter() - total_start:.2f}s)")
@@ -0,0 +1,99 @@
+"""
+Factorized hourly output.
+
+Every hourly output column is a weighted sum of a few input load profiles, so
+instead of 8760 rows per header and year the factorized format stores
+
+- profiles.npy: the distinct load profiles once (profiles x 8760)
+- weights.csv: View, Header, Year, Profile, Annual energy; the column of a
+  header in a year is the sum of Annual energy * profiles[Profile]
+- metadata.csv: the component metadata of every view (as in the Metadata sheets)
+- factorized.json: channel, hours and the file names
+
+Views are "total" (the timeseries_total workbook) and one per region when
+hourly output per region is enabled. FactorizedHourly reads a directory back
+and reconstructs columns on demand:
+
+    hourly = FactorizedHourly(".../houerly timeserries/factorized_UE")
+    series = hourly.column("DE.ELEC", 2030)
+    sheet = hourly.frame(2030)
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+FACTORIZED_INFO_FILE = "factorized.json"
+FACTORIZED_FORMAT_VERSION = 1
+WEIGHT_COLUMNS = ["View", "Header", "Year", "Profile", "Annual energy"]
+
+
+def write_factorized_hourly(output_dir, channel: str, profiles: np.ndarray, weights: pd.DataFrame,
+                            metadata: pd.DataFrame = None, hours: int = 8760) -> Path:
+    """Write one factorized hourly directory and return its path."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    np.save(output_dir / "profiles.npy", np.ascontiguousarray(profiles))
+    weights.loc[:, WEIGHT_COLUMNS].to_csv(output_dir / "weights.csv", index=False)
+    info = {
+        "format_version": FACTORIZED_FORMAT_VERSION,
+        "channel": channel,
+        "hours": int(hours),
+        "profiles": "profiles.npy",
+        "weights": "weights.csv",
+    }
+    if metadata is not None and not metadata.empty:
+        metadata.to_csv(output_dir / "metadata.csv", index=False)
+        info["metadata"] = "metadata.csv"
+    with open(output_dir / FACTORIZED_INFO_FILE, "w", encoding="utf-8") as handle:
+        json.dump(info, handle, indent=1)
+    return output_dir
+
+
+class FactorizedHourly:
+    """Reader of a factorized hourly output directory; columns are rebuilt on demand."""
+
+    def __init__(self, path, mmap: bool = True):
+        self.path = Path(path)
+        with open(self.path / FACTORIZED_INFO_FILE, encoding="utf-8") as handle:
+            self.info = json.load(handle)
+        if self.info.get("format_version") != FACTORIZED_FORMAT_VERSION:
+            raise ValueError(f"Unsupported factorized hourly format in {self.path}: {self.info.get('format_version')}")
+        self.channel = self.info["channel"]
+        self.hours = int(self.info["hours"])
+        self.profiles = np.load(self.path / self.info["profiles"], mmap_mode="r" if mmap else None)
+        self.weights = pd.read_csv(self.path / self.info["weights"], dtype={"View": str, "Header": str})
+        self._rows = self.weights.groupby(["View", "Header", "Year"], sort=False).indices
+
+    @property
+    def views(self) -> list:
+        return self.weights["View"].unique().tolist()
+
+    def years(self, view: str = "total") -> list:
+        return self.weights.loc[self.weights["View"] == view, "Year"].unique().tolist()
+
+    def headers(self, year=None, view: str = "total") -> list:
+        """Headers of a view (of one year if given) in output order."""
+        mask = self.weights["View"] == view
+        if year is not None:
+            mask &= self.weights["Year"] == int(year)
+        return self.weights.loc[mask, "Header"].unique().tolist()
+
+    def column(self, header: str, year, view: str = "total") -> np.ndarray:
+        """Hourly values of one header and year (float64, `hours` values)."""
+        rows = self._rows.get((view, str(header), int(year)))
+        if rows is None:
+            raise KeyError(f"No hourly column '{header}' for {year} in view '{view}'.")
+        table = self.weights.iloc[rows]
+        energies = table["Annual energy"].to_numpy(dtype=np.float64)
+        profiles = np.asarray(self.profiles[table["Profile"].to_numpy(dtype=np.int64)], dtype=np.float64)
+        return energies @ profiles
+
+    def frame(self, year, view: str = "total") -> pd.DataFrame:
+        """All columns of a view and year as an (hours x headers) frame, hours numbered from 1."""
+        headers = self.headers(year, view)
+        values = {header: self.column(header, year, view) for header in headers}
+        return pd.DataFrame(values, index=pd.RangeIndex(1, self.hours + 1, name="Hour"))
@@ -69,74 +69,78 @@ class GraphDataPreparer:
         }
         return plots_data
 
+    def _long_by_year(self, grouped: pd.DataFrame) -> pd.DataFrame:
+        """Grouped year columns as long rows (year-major), keys as columns and the value in 'Value'."""
+        years = [col for col in grouped.columns if col.isdigit()]
+        return grouped[years].reset_index().melt(
+            id_vars=list(grouped.index.names), var_name='Year', value_name='Value'
+        )
+
+    def _concat_flows(self, frames):
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
     def _demand_to_ue_flows(self):
         """Generates flows with region-specific node naming and colors"""
         flows = []
         for region in self.data.regions:
-            grouped = region.energy_ue.copy().groupby(['Sector', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
-            grouped = grouped.xs('TOTAL', level='Temp_level')
-            for year in [col for col in grouped.columns if col.isdigit()]:
-                for (sector, ue_type), row in grouped.iterrows():
-                    flows.append({
-                        'Region': region.region_name,
-                        'Source': f"{sector}",
-                        'Target': f"{ue_type}_ue",
-                        'Value': row[year],
-                        'Year': year,
-                        'Color': self.region_colors.get(region.region_name, '#999999')
-                    })
-        return pd.DataFrame(flows)
+            grouped = region.energy_ue.groupby(['Sector', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
+            long = self._long_by_year(grouped.xs('TOTAL', level='Temp_level'))
+            flows.append(pd.DataFrame({
+                'Region': region.region_name,
+                'Source': long['Sector'].astype(str),
+                'Target': long['UE_Type'].astype(str) + '_ue',
+                'Value': long['Value'],
+                'Year': long['Year'],
+                'Color': self.region_colors.get(region.region_name, '#999999'),
+            }))
+        return self._concat_flows(flows)
 
     def _prepare_ue_to_fe_flows(self):
         """Prepare FE→UE flows when both markers are enabled"""
         flows = []
         for region in self.data.regions:
-            grouped = region.energy_fe.copy().groupby(['Sector','FE_Type', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
-            grouped = grouped.xs('TOTAL', level='Temp_level')
-            for year in [col for col in grouped.columns if col.isdigit()]:
-                for (sector, fe_type, ue_type), row in grouped.iterrows():
-                    flows.append({
-                        'Region': region.region_name,
-                        'Source': f"{ue_type}_ue",
-                        'Target': f"{fe_type}_fe",
-                        'Value': row[year],
-                        'Year': year
-                    })
-        return pd.DataFrame(flows)
+            grouped = region.energy_fe.groupby(['Sector', 'FE_Type', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
+            long = self._long_by_year(grouped.xs('TOTAL', level='Temp_level'))
+            flows.append(pd.DataFrame({
+                'Region': region.region_name,
+                'Source': long['UE_Type'].astype(str) + '_ue',
+                'Target': long['FE_Type'].astype(str) + '_fe',
+                'Value': long['Value'],
+                'Year': long['Year'],
+            }))
+        return self._concat_flows(flows)
 
     def _prepare_ue_bar_data(self):
         """Prepares UE data in stacked bar format: Region × UE_Type × Sector"""
         flows = []
         for region in self.data.regions:
-            grouped = region.energy_ue.copy().groupby(['Sector', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
-            for year in [col for col in grouped.columns if col.isdigit()]:
-                for (sector, ue_type,temp_level), value in grouped[year].items():
-                    flows.append({
-                        'Region': region.region_name,
-                        'Energy_Type': f"UE: {ue_type}",
-                        'Sector': sector,
-                        'Temp_level': temp_level,
-                        'Value': value,
-                        'Year': year
-                    })
-        return pd.DataFrame(flows)
+            grouped = region.energy_ue.groupby(['Sector', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
+            long = self._long_by_year(grouped)
+            flows.append(pd.DataFrame({
+                'Region': region.region_name,
+                'Energy_Type': 'UE: ' + long['UE_Type'].astype(str),
+                'Sector': long['Sector'],
+                'Temp_level': long['Temp_level'],
+                'Value': long['Value'],
+                'Year': long['Year'],
+            }))
+        return self._concat_flows(flows)
 
     def _prepare_fe_bar_data(self):
         """Prepares FE data in stacked bar format: Region × FE_Type × Sector"""
         flows = []
         for region in self.data.regions:
-            grouped = region.energy_fe.copy().groupby(['Sector', 'FE_Type', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
-            for year in [col for col in grouped.columns if col.isdigit()]:
-                for (sector, fe_type, ue_type,temp_level), value in grouped[year].items():
-                    flows.append({
-                        'Region': region.region_name,
-                        'Energy_Type': f"FE: {fe_type}",
-                        'Sector': sector,
-                        'Temp_level': temp_level,
-                        'Value': value,
-                        'Year': year
-                    })
-        return pd.DataFrame(flows)
+            grouped = region.energy_fe.groupby(['Sector', 'FE_Type', 'UE_Type', 'Temp_level']).sum(numeric_only=True)
+            long = self._long_by_year(grouped)
+            flows.append(pd.DataFrame({
+                'Region': region.region_name,
+                'Energy_Type': 'FE: ' + long['FE_Type'].astype(str),
+                'Sector': long['Sector'],
+                'Temp_level': long['Temp_level'],
+                'Value': long['Value'],
+                'Year': long['Year'],
+            }))
+        return self._concat_flows(flows)
 
 class Visualizer:
     def __init__(self, data):
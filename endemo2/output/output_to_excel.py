@@ -9,7 +9,11 @@ from endemo2.output.writers import (
     SubregionalOutputMixin,
     TimeseriesOutputMixin,
     DiagramOutputMixin,
+    ResultsStoreOutputMixin,
 )
+from endemo2.output.writers.manifest import OutputManifest, resolve_previous_run
+from endemo2.output.writers.scheduler import OutputScheduler
+from endemo2.Input.model_config import DEFAULT_OUTPUT_WRITER_MEMORY_MB
 
 
 class ExcelWriter(
@@ -18,10 +22,14 @@ class ExcelWriter(
     SubregionalOutputMixin,
     TimeseriesOutputMixin,
     DiagramOutputMixin,
+    ResultsStoreOutputMixin,
 ):
-    def __init__(self, data):
+    def __init__(self, data, workers: int = 1):
         # Create a timestamped output directory
         self.data = data
+        self.workers = max(1, int(workers or 1))
+        self._output_scheduler = None
+        self._output_manifest = None
         self.timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         existing_output_path = getattr(data, "runtime_output_path", None)
         self.output_path = Path(existing_output_path) if existing_output_path else self._create_output_directory(data.input_manager)
@@ -54,7 +62,44 @@ class ExcelWriter(
             self._write_diagrams()
 
     def write_all_outputs(self):
-        """Final method to write all collected data to Excel"""
+        """
+        Final method to write all collected data to Excel.
+
+        With workers > 1 the workbooks are prepared here and written by a pool
+        of writer processes. With skip-unchanged writing, workbooks whose
+        fingerprint matches the previous run are reused from it.
+        """
+        manifest = self._create_output_manifest()
+        self._output_manifest = manifest
+        try:
+            if self.workers <= 1:
+                self._write_outputs()
+            else:
+                budget_mb = getattr(
+                    self.data.input_manager.general_settings, "output_writer_memory_mb", DEFAULT_OUTPUT_WRITER_MEMORY_MB
+                )
+                with OutputScheduler(self.workers, float(budget_mb) * 1024 * 1024, root=self.output_path) as scheduler:
+                    self._output_scheduler = scheduler
+                    if manifest is not None:
+                        manifest.scheduler = scheduler
+                    try:
+                        self._write_outputs()
+                    finally:
+                        self._output_scheduler = None
+        finally:
+            self._output_manifest = None
+        if manifest is not None:
+            manifest.save()
+
+    def _create_output_manifest(self):
+        """Output manifest of this run, or None when skip-unchanged writing is off."""
+        settings = self.data.input_manager.general_settings
+        previous_run = resolve_previous_run(getattr(settings, "output_previous_run", None), self.output_path)
+        if not getattr(settings, "output_skip_unchanged", False) and previous_run is None:
+            return None
+        return OutputManifest(self.output_path, previous_run)
+
+    def _write_outputs(self):
         subregional_on = self._is_enabled(self.data.input_manager.general_settings.subregional_resolution)
         self._write_sector_forecasts()
         self._write_ue_sector_data()
@@ -69,3 +114,4 @@ class ExcelWriter(
         self._write_dependent_ddrs()
         if subregional_on:
             self._write_subregion_division_forecast()
+        self._write_results_store()
@@ -3,6 +3,7 @@ from endemo2.output.writers.sector_energy import SectorEnergyOutputMixin
 from endemo2.output.writers.subregional import SubregionalOutputMixin
 from endemo2.output.writers.timeseries import TimeseriesOutputMixin
 from endemo2.output.writers.diagram import DiagramOutputMixin
+from endemo2.output.writers.results_store import ResultsStoreOutputMixin
 
 __all__ = [
     'OutputCommonMixin',
@@ -10,4 +11,5 @@ __all__ = [
     'SubregionalOutputMixin',
     'TimeseriesOutputMixin',
     'DiagramOutputMixin',
+    'ResultsStoreOutputMixin',
 ]
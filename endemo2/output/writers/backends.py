@@ -0,0 +1,195 @@
+"""
+Writer backends for output workbooks.
+
+Excel stays the default. The columnar backends keep the sheet structure of the
+Excel outputs: a workbook becomes a directory named after it and every sheet
+one file in it, e.g. sector_forecasts/predictions_IND/Sheet1.parquet.
+Parquet and Feather need pyarrow; without it the output falls back to Excel.
+
+Flat xlsx workbooks can be written by XlsxStreamWriter, which uses xlsxwriter's
+constant_memory mode: rows go straight from frame columns / NumPy buffers to
+the file and are flushed row by row, so a workbook is never held in memory.
+"""
+
+from datetime import date, time, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from endemo2.Input.model_config import (
+    normalize_output_format,
+    output_format_available,
+    stream_xlsx_available,
+)
+
+
+def open_excel_writer(output_path):
+    """ExcelWriter using xlsxwriter when available, openpyxl otherwise."""
+    try:
+        return pd.ExcelWriter(output_path, engine="xlsxwriter")
+    except Exception:
+        return pd.ExcelWriter(output_path, engine="openpyxl")
+
+
+def write_sheet(writer, df: pd.DataFrame, sheet_name: str, index: bool = False, **kwargs) -> None:
+    """Write one sheet through a pandas ExcelWriter or any backend writer with a write() method."""
+    if isinstance(writer, pd.ExcelWriter):
+        df.to_excel(writer, sheet_name=sheet_name, index=index, **kwargs)
+    else:
+        writer.write(df, sheet_name, index=index, **kwargs)
+
+
+def write_matrix(writer, sheet_name: str, columns: list, labels: list, values: np.ndarray) -> None:
+    """
+    Write a label column plus a numeric matrix (rows x len(columns) - 1).
+    Streaming writers take the NumPy buffer directly; others get a DataFrame.
+    """
+    if hasattr(writer, "write_matrix"):
+        writer.write_matrix(sheet_name, columns, labels, values)
+        return
+    df = pd.DataFrame(values, columns=columns[1:])
+    df.insert(0, columns[0], labels)
+    write_sheet(writer, df, sheet_name)
+
+
+def open_output_writer(output_path, fmt: str, stream: bool = False):
+    """Writer of one output workbook in the given (available) format."""
+    if fmt == "xlsx":
+        if stream and stream_xlsx_available():
+            return XlsxStreamWriter(output_path)
+        return open_excel_writer(output_path)
+    return COLUMNAR_WRITERS[fmt](output_path)
+
+
+class ColumnarWriter:
+    """Directory of per-sheet files; used like a pandas ExcelWriter in `with` blocks."""
+
+    extension = ""
+
+    def __init__(self, output_path):
+        self.path = Path(output_path).with_suffix("")
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.sheets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        pass
+
+    def write(self, df: pd.DataFrame, sheet_name: str, index: bool = False, **kwargs) -> None:
+        # Excel-only options (merge_cells, startrow, ...) do not apply to per-sheet files.
+        frame = df.reset_index() if index else df
+        name = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(sheet_name)) or "Sheet"
+        self.sheets.append(name)
+        self._write_frame(frame, self.path / f"{name}.{self.extension}")
+
+    def _write_frame(self, frame: pd.DataFrame, path: Path) -> None:
+        raise NotImplementedError
+
+
+class _ArrowWriter(ColumnarWriter):
+
+    def _arrow_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """String column names, default index and no mixed-type object columns."""
+        out = frame.reset_index(drop=True)
+        out.columns = [str(col) for col in out.columns]
+        for col in out.columns:
+            if out[col].dtype == object:
+                out[col] = out[col].astype("string")
+        return out
+
+
+class ParquetWriter(_ArrowWriter):
+    extension = "parquet"
+
+    def _write_frame(self, frame: pd.DataFrame, path: Path) -> None:
+        self._arrow_frame(frame).to_parquet(path, index=False)
+
+
+class FeatherWriter(_ArrowWriter):
+    extension = "feather"
+
+    def _write_frame(self, frame: pd.DataFrame, path: Path) -> None:
+        self._arrow_frame(frame).to_feather(path)
+
+
+class CsvWriter(ColumnarWriter):
+    extension = "csv"
+    chunk_rows = 100_000
+
+    def _write_frame(self, frame: pd.DataFrame, path: Path) -> None:
+        frame.to_csv(path, index=False, chunksize=self.chunk_rows)
+
+
+_CELL_TYPES = (str, bool, int, float, date, time, timedelta)
+
+
+def _cell_value(value):
+    """Python value xlsxwriter can write; missing values become blanks, other objects text (as in pandas)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and value != value) or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, _CELL_TYPES):
+        return value
+    return str(value)
+
+
+class XlsxStreamWriter:
+    """
+    Flat xlsx workbook in xlsxwriter's constant_memory mode. Sheets are written
+    row by row (header, then data rows) and must not use merged index cells.
+    Missing values are left blank, as pandas does.
+    """
+
+    block_rows = 1024
+
+    def __init__(self, output_path):
+        import xlsxwriter
+
+        self.book = xlsxwriter.Workbook(str(output_path), {"constant_memory": True, "nan_inf_to_errors": True})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        self.book.close()
+
+    def write(self, df: pd.DataFrame, sheet_name: str, index: bool = False, **kwargs) -> None:
+        frame = df.reset_index() if index else df
+        sheet = self.book.add_worksheet(str(sheet_name)[:31])
+        sheet.write_row(0, 0, [str(col) for col in frame.columns])
+        columns = []
+        for _, series in frame.items():
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_object_dtype(series):
+                columns.append(series.astype(object).where(series.notna(), None).tolist())
+            else:
+                columns.append([_cell_value(value) for value in series.tolist()])
+        for row, values in enumerate(zip(*columns), start=1):
+            sheet.write_row(row, 0, values)
+
+    def write_matrix(self, sheet_name: str, columns: list, labels: list, values: np.ndarray) -> None:
+        sheet = self.book.add_worksheet(str(sheet_name)[:31])
+        sheet.write_row(0, 0, [str(col) for col in columns])
+        values = np.asarray(values, dtype=np.float64)
+        for start in range(0, values.shape[0], self.block_rows):
+            block = values[start:start + self.block_rows]
+            rows = block.tolist()
+            if np.isnan(block).any():
+                rows = [[None if value != value else value for value in row] for row in rows]
+            for offset, row in enumerate(rows):
+                sheet.write(start + offset + 1, 0, labels[start + offset])
+                sheet.write_row(start + offset + 1, 1, row)
+
+
+COLUMNAR_WRITERS = {"parquet": ParquetWriter, "feather": FeatherWriter, "csv": CsvWriter}
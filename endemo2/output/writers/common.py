@@ -1,6 +1,82 @@
 from pathlib import Path
 import pandas as pd
 
+from endemo2.provenance import render_trace
+from endemo2.output.writers.backends import (
+    normalize_output_format,
+    open_excel_writer,
+    open_output_writer,
+    output_format_available,
+    stream_xlsx_available,
+    write_matrix,
+    write_sheet,
+)
+
+
+def _blank_to_na(series: pd.Series) -> pd.Series:
+    """Whitespace-only strings become missing values; non-text columns are returned unchanged."""
+    if not (series.dtype == object or pd.api.types.is_string_dtype(series)):
+        return series
+    try:
+        blank = series.str.strip().eq("")
+    except AttributeError:
+        # object column without any strings
+        return series
+    if not blank.any():
+        return series
+    return series.where(~blank, pd.NA)
+
+
+def _frame_from_columns(columns: list, names: list, index) -> pd.DataFrame:
+    """One frame from same-indexed columns, copied once."""
+    if not columns:
+        return pd.DataFrame(index=index)
+    out = pd.concat(columns, axis=1)
+    out.columns = names
+    return out
+
+
+class OutputLayoutPlan:
+    """
+    Output layout of one table schema, compiled once: alias renaming, year
+    filtering/sorting, missing layout columns and the Trace column are applied
+    to a frame as a single column projection.
+    """
+
+    def __init__(self, columns: list, layout_columns: list, aliases: dict, trace_enabled: bool, years=None):
+        names = [aliases.get(str(col), str(col)) for col in columns]
+        first_pos = {}
+        for pos, name in enumerate(names):
+            first_pos.setdefault(name, pos)
+
+        year_names = [name for name in first_pos if name.isdigit()]
+        if years is not None:
+            year_names = [name for name in year_names if name in set(years)]
+        year_names.sort(key=int)
+
+        fixed = [c for c in layout_columns if c != "Trace"]
+        fixed_set = set(fixed)
+        self.sources = [(name, first_pos.get(name)) for name in fixed]
+        self.sources += [(name, first_pos[name]) for name in year_names]
+        self.sources += [
+            (name, pos) for pos, name in enumerate(names)
+            if name not in fixed_set and not name.isdigit() and name != "Trace"
+        ]
+        if trace_enabled:
+            self.sources.append(("Trace", first_pos.get("Trace")))
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        columns = []
+        for name, pos in self.sources:
+            if pos is None:
+                series = pd.Series(pd.NA, index=df.index, dtype=object)
+            else:
+                series = df.iloc[:, pos]
+                if name == "Trace":
+                    series = series.map(render_trace)
+            columns.append(series)
+        return _frame_from_columns(columns, [name for name, _ in self.sources], df.index)
+
 
 class OutputCommonMixin:
 
@@ -31,6 +107,14 @@ class OutputCommonMixin:
         "Trace",
     ]
 
+    # GeneralSettings attribute holding the output format of each output family
+    OUTPUT_FORMAT_SETTINGS = {
+        "forecasts": "output_format_forecasts",
+        "energy": "output_format_energy",
+        "subregional": "output_format_subregional",
+        "timeseries": "output_format_timeseries",
+    }
+
     OUTPUT_LAYOUT_ALIASES = {
         "Top-Region": "Top_Region",
         "Top Region": "Top_Region",
@@ -71,40 +155,44 @@ class OutputCommonMixin:
             return True
         return self._is_enabled(getattr(settings, 'trace_output', None))
 
+    def _render_trace_column(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Render lazy Provenance records in the Trace column to text."""
+        if df is None or "Trace" not in df.columns:
+            return df
+        df["Trace"] = df["Trace"].map(render_trace)
+        return df
+
     def _filter_years_for_output(self, df: pd.DataFrame) -> pd.DataFrame:
         if df is None or df.empty:
             return df
         years = self.data.input_manager.general_settings.forecast_year_range
         year_cols = [c for c in df.columns if str(c).isdigit()]
-        keep_years = [str(y) for y in years if str(y) in {str(c) for c in year_cols}]
-        non_year = [c for c in df.columns if c not in year_cols]
         if not year_cols:
             return df
-        rename_map = {c: str(c) for c in year_cols}
-        df = df.rename(columns=rename_map)
-        cols = non_year + [y for y in keep_years if y in df.columns]
-        return df.loc[:, cols]
-
-    def _normalize_output_column_aliases(self, df: pd.DataFrame) -> pd.DataFrame:
-        if df is None or df.empty:
-            return df
-        if not self.OUTPUT_LAYOUT_ALIASES:
-            return df
-        rename_map = {}
-        for col in df.columns:
-            mapped = self.OUTPUT_LAYOUT_ALIASES.get(str(col), str(col))
-            rename_map[col] = mapped
-        return df.rename(columns=rename_map)
+        by_name = {str(c): c for c in year_cols}
+        keep_years = [by_name[str(y)] for y in years if str(y) in by_name]
+        non_year = [c for c in df.columns if c not in year_cols]
+        out = df.loc[:, non_year + keep_years]
+        out.columns = non_year + [str(c) for c in keep_years]
+        return out
 
-    def _extract_sorted_year_columns(self, df: pd.DataFrame) -> list[str]:
-        if df is None or df.empty:
-            return []
-        year_cols = [c for c in df.columns if str(c).isdigit()]
-        if not year_cols:
-            return []
-        rename_map = {c: str(c) for c in year_cols}
-        df.rename(columns=rename_map, inplace=True)
-        return sorted([str(c) for c in df.columns if str(c).isdigit()], key=lambda x: int(x))
+    def _output_layout_plan(self, columns, filter_years: bool) -> "OutputLayoutPlan":
+        """Compiled layout of one table schema; cached per (columns, trace setting, year filter)."""
+        trace_enabled = self._trace_enabled()
+        years = None
+        if filter_years:
+            years = tuple(str(y) for y in self.data.input_manager.general_settings.forecast_year_range)
+        key = (tuple(columns), trace_enabled, years)
+        plans = getattr(self, "_output_layout_plans", None)
+        if plans is None:
+            plans = self._output_layout_plans = {}
+        plan = plans.get(key)
+        if plan is None:
+            plan = OutputLayoutPlan(
+                list(columns), self.OUTPUT_LAYOUT_COLUMNS, self.OUTPUT_LAYOUT_ALIASES, trace_enabled, years
+            )
+            plans[key] = plan
+        return plan
 
     def _standardize_output_layout(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -116,64 +204,58 @@ class OutputCommonMixin:
         """
         if df is None or df.empty:
             return df
+        return self._output_layout_plan(df.columns, filter_years=False).apply(df)
 
-        out = self._normalize_output_column_aliases(df.copy())
-        year_cols = self._extract_sorted_year_columns(out)
-
-        trace_enabled = self._trace_enabled()
-        layout_cols = self.OUTPUT_LAYOUT_COLUMNS if trace_enabled else [c for c in self.OUTPUT_LAYOUT_COLUMNS if c != "Trace"]
-
-        for col in layout_cols:
-            if col not in out.columns:
-                out[col] = pd.NA
-
-        if not trace_enabled and "Trace" in out.columns:
-            out = out.drop(columns=["Trace"])
-
-        fixed_cols = [c for c in layout_cols if c != "Trace"]
-        fixed_set = set(fixed_cols)
-        year_set = set(year_cols)
-        extra_cols = [c for c in out.columns if c not in fixed_set and c not in year_set and c != "Trace"]
-
-        ordered_cols = fixed_cols + year_cols + extra_cols
-        if trace_enabled:
-            if "Trace" not in out.columns:
-                out["Trace"] = pd.NA
-            ordered_cols = ordered_cols + ["Trace"]
-
-        return out.loc[:, ordered_cols]
+    def _layout_output_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """_filter_years_for_output and _standardize_output_layout as one projection."""
+        if df is None or df.empty:
+            return df
+        if not any(str(c).isdigit() for c in df.columns):
+            return self._standardize_output_layout(df)
+        return self._output_layout_plan(df.columns, filter_years=True).apply(df)
 
     def _drop_empty_output_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Remove columns that are completely empty in non-timeseries Excel outputs."""
         if df is None or df.empty:
             return df
-        cleaned = df.replace(r"^\s*$", pd.NA, regex=True)
-        return cleaned.dropna(axis=1, how="all")
+        keep = []
+        columns = []
+        for pos in range(df.shape[1]):
+            series = _blank_to_na(df.iloc[:, pos])
+            if series.notna().any():
+                keep.append(pos)
+                columns.append(series)
+        return _frame_from_columns(columns, [df.columns[pos] for pos in keep], df.index)
 
     def _prepare_non_timeseries_output(self, df: pd.DataFrame) -> pd.DataFrame:
         """Apply common non-timeseries export cleanup without touching hourly timeseries."""
         if df is None or df.empty:
             return df
-        out = df.copy()
-        if not self._trace_enabled() and "Trace" in out.columns:
-            out = out.drop(columns=["Trace"])
-        return self._drop_empty_output_columns(out)
+        trace_enabled = self._trace_enabled()
+        names = []
+        columns = []
+        for pos, col in enumerate(df.columns):
+            series = df.iloc[:, pos]
+            if col == "Trace":
+                if not trace_enabled:
+                    continue
+                series = series.map(render_trace)
+            series = _blank_to_na(series)
+            # Completely empty columns are not exported.
+            if series.notna().any():
+                names.append(col)
+                columns.append(series)
+        return _frame_from_columns(columns, names, df.index)
 
     def _write_large_excel(self, df, writer, base_sheet_name):
         """Modified writer that handles unsorted data"""
         max_rows = 1_000_000
+        df = self._prepare_non_timeseries_output(df)
         chunks = (len(df) // max_rows) + 1
         for i in range(chunks):
             chunk = df.iloc[i * max_rows: (i + 1) * max_rows]
-            chunk = self._prepare_non_timeseries_output(chunk)
             sheet_name = f"{base_sheet_name}_part{i + 1}" if chunks > 1 else base_sheet_name
-            chunk.to_excel(
-                writer,
-                sheet_name=sheet_name[:31],
-                index=False,
-                header=True,
-                startrow=0
-            )
+            self._write_sheet(writer, chunk, sheet_name[:31], header=True, startrow=0)
 
     def _get_excel_writer(self, output_path: Path):
         """
@@ -181,8 +263,69 @@ class OutputCommonMixin:
 
         Use xlsxwriter when available. If unavailable, fall back to openpyxl.
         """
-        try:
-            return pd.ExcelWriter(output_path, engine="xlsxwriter")
-        except Exception:
-            return pd.ExcelWriter(output_path, engine="openpyxl")
+        return open_excel_writer(output_path)
+
+    def _output_format(self, family: str = None) -> str:
+        """Output format of an output family; xlsx when unset or when the backend is unavailable."""
+        if family is None:
+            return "xlsx"
+        formats = getattr(self, "_output_formats", None)
+        if formats is None:
+            formats = self._output_formats = {}
+        if family not in formats:
+            settings = getattr(getattr(self.data, 'input_manager', None), 'general_settings', None)
+            fmt = normalize_output_format(getattr(settings, self.OUTPUT_FORMAT_SETTINGS[family], None))
+            if not output_format_available(fmt):
+                print(f"[Output] {fmt} output for {family} needs pyarrow; writing xlsx instead.")
+                fmt = "xlsx"
+            formats[family] = fmt
+        return formats[family]
+
+    def _get_output_writer(self, output_path: Path, family: str = None, deferred: bool = True):
+        """
+        Return the writer of one output workbook in the format configured for
+        its family. Columnar formats write one file per sheet into a directory
+        named after the workbook.
+
+        While an output scheduler is active (parallel export), the workbook is
+        recorded and written by a writer process when the `with` block closes,
+        unless deferred=False. While an output manifest is active, recorded
+        workbooks are fingerprinted first and unchanged ones are taken from the
+        previous run.
+        """
+        fmt = self._output_format(family)
+        stream = self._stream_xlsx(family)
+        manifest = getattr(self, "_output_manifest", None)
+        if manifest is not None and deferred:
+            return manifest.workbook(output_path, fmt, stream)
+        scheduler = getattr(self, "_output_scheduler", None)
+        if scheduler is not None and deferred:
+            return scheduler.workbook(output_path, fmt, stream)
+        return open_output_writer(output_path, fmt, stream=stream)
+
+    def _general_setting(self, name: str, default=None):
+        settings = getattr(getattr(self.data, 'input_manager', None), 'general_settings', None)
+        return getattr(settings, name, default)
+
+    def _flat_aggregates(self) -> bool:
+        return bool(self._general_setting("output_flat_aggregates", False))
+
+    def _stream_xlsx(self, family: str = None) -> bool:
+        """
+        Whether xlsx workbooks of a family are written row by row (constant memory).
+        UE/FE workbooks contain merged aggregate sheets and only stream in flat layout.
+        Without xlsxwriter the workbooks are written through openpyxl, which never streams.
+        """
+        if family is None or not self._general_setting("output_xlsx_streaming", True):
+            return False
+        if self._output_format(family) != "xlsx" or not stream_xlsx_available():
+            return False
+        return family != "energy" or self._flat_aggregates()
+
+    def _write_sheet(self, writer, df: pd.DataFrame, sheet_name: str, index: bool = False, **kwargs):
+        """Write one sheet through an ExcelWriter, a columnar backend or a deferred workbook."""
+        write_sheet(writer, df, sheet_name, index=index, **kwargs)
 
+    def _write_matrix(self, writer, sheet_name: str, columns: list, labels: list, values):
+        """Write a label column plus a numeric matrix, streamed from the NumPy buffer where supported."""
+        write_matrix(writer, sheet_name, columns, labels, values)
@@ -0,0 +1,174 @@
+"""
+Skip-unchanged output writing.
+
+While an OutputManifest is active, the writers record the sheets of each
+workbook (as for the parallel export) and the manifest fingerprints them when
+the workbook closes. If the previous run directory holds the same workbook with
+the same fingerprint, that file is hard-linked (or copied) instead of being
+serialized again; otherwise the workbook is written as usual, directly or by
+the output scheduler. The fingerprints of all workbooks of the run are saved
+to output_manifest.json for the next run.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from endemo2.output.writers.scheduler import DeferredWorkbook, _write_workbook
+
+
+MANIFEST_FILE = "output_manifest.json"
+
+# Bump when a change of the writers alters the files written for identical frames.
+FINGERPRINT_VERSION = 1
+
+
+def _hash_values(values) -> np.ndarray:
+    """Row hashes of one column; objects pandas cannot hash (lists, ...) are hashed as text."""
+    try:
+        return pd.util.hash_array(values, categorize=False)
+    except (TypeError, ValueError):
+        return pd.util.hash_array(np.array([str(value) for value in values], dtype=object), categorize=False)
+
+
+def _hash_frame(digest, df: pd.DataFrame, index: bool) -> None:
+    digest.update(repr([str(col) for col in df.columns]).encode())
+    digest.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    digest.update(str(df.shape).encode())
+    if index:
+        digest.update(repr(list(df.index.names)).encode())
+        for level in range(df.index.nlevels):
+            digest.update(_hash_values(np.asarray(df.index.get_level_values(level), dtype=object)).tobytes())
+    for pos in range(df.shape[1]):
+        digest.update(_hash_values(df.iloc[:, pos].to_numpy()).tobytes())
+
+
+def fingerprint_workbook(fmt: str, stream: bool, sheets: list) -> str:
+    """Content fingerprint of a recorded workbook: format, sheet names and options, and all cell values."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{FINGERPRINT_VERSION}|{fmt}|{int(bool(stream))}".encode())
+    for kind, args, kwargs in sheets:
+        digest.update(f"|{kind}|{sorted(kwargs.items())!r}".encode())
+        if kind == "matrix":
+            sheet_name, columns, labels, values = args
+            digest.update(repr((sheet_name, [str(col) for col in columns])).encode())
+            digest.update("\x1f".join(str(label) for label in labels).encode())
+            values = np.ascontiguousarray(values, dtype=np.float64)
+            digest.update(str(values.shape).encode())
+            digest.update(values.tobytes())
+        else:
+            df, sheet_name = args
+            digest.update(repr(sheet_name).encode())
+            _hash_frame(digest, df, bool(kwargs.get("index", False)))
+    return digest.hexdigest()
+
+
+def _artifact_path(output_path: Path, fmt: str) -> Path:
+    """File of an xlsx workbook; directory of a columnar one."""
+    return output_path if fmt == "xlsx" else output_path.with_suffix("")
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def resolve_previous_run(value, output_path: Path):
+    """
+    Previous run directory of a GeneralSet entry: a path (relative paths are
+    taken next to this run's directory) or "latest" for the most recent run
+    directory next to this one that has a manifest. None when unset.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)) or not str(value).strip():
+        return None
+    output_path = Path(output_path)
+    if str(value).strip().lower() == "latest":
+        candidates = [
+            path.parent for path in output_path.parent.glob(f"*/{MANIFEST_FILE}")
+            if path.parent.resolve() != output_path.resolve()
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda path: (path / MANIFEST_FILE).stat().st_mtime)
+    previous = Path(str(value).strip())
+    if not previous.is_absolute():
+        previous = output_path.parent / previous
+    return previous
+
+
+class OutputManifest:
+    """Fingerprints the workbooks of a run and reuses unchanged ones from a previous run."""
+
+    def __init__(self, root, previous_root=None):
+        self.root = Path(root)
+        self.previous_root = Path(previous_root) if previous_root is not None else None
+        self.previous = {}
+        if self.previous_root is not None and self.previous_root.resolve() == self.root.resolve():
+            # Reusing files of the run being written would replace them by themselves.
+            self.previous_root = None
+        if self.previous_root is not None:
+            manifest_path = self.previous_root / MANIFEST_FILE
+            if manifest_path.is_file():
+                with open(manifest_path, encoding="utf-8") as handle:
+                    previous = json.load(handle)
+                if previous.get("version") == FINGERPRINT_VERSION:
+                    self.previous = previous.get("files", {})
+            else:
+                print(f"[Output] No {MANIFEST_FILE} in {self.previous_root}; writing all outputs.")
+        self.scheduler = None
+        self.files = {}
+        self.reused = 0
+
+    def workbook(self, output_path, fmt: str, stream: bool = False) -> DeferredWorkbook:
+        return DeferredWorkbook(self, output_path, fmt, stream)
+
+    def _relative(self, output_path) -> str:
+        path = Path(output_path)
+        try:
+            return path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def _reuse(self, relative: str, output_path: Path, fmt: str) -> bool:
+        source = _artifact_path(self.previous_root / relative, fmt)
+        target = _artifact_path(output_path, fmt)
+        if source.is_file():
+            _link_or_copy(source, target)
+            return True
+        if source.is_dir():
+            for path in source.rglob("*"):
+                if path.is_file():
+                    _link_or_copy(path, target / path.relative_to(source))
+            return True
+        return False
+
+    def submit(self, output_path, fmt: str, sheets: list, stream: bool = False) -> None:
+        output_path = Path(output_path)
+        relative = self._relative(output_path)
+        fingerprint = fingerprint_workbook(fmt, stream, sheets)
+        self.files[relative] = {"format": fmt, "fingerprint": fingerprint}
+        previous = self.previous.get(relative)
+        if previous == self.files[relative] and self._reuse(relative, output_path, fmt):
+            self.reused += 1
+            return
+        if self.scheduler is not None:
+            self.scheduler.submit(output_path, fmt, sheets, stream=stream)
+        else:
+            _write_workbook(str(output_path), fmt, stream, sheets)
+
+    def save(self) -> None:
+        """Write output_manifest.json and report the reused workbooks."""
+        with open(self.root / MANIFEST_FILE, "w", encoding="utf-8") as handle:
+            json.dump({"version": FINGERPRINT_VERSION, "files": self.files}, handle, indent=1, sort_keys=True)
+        if self.previous_root is not None:
+            print(f"[Output] Reused {self.reused} of {len(self.files)} unchanged workbooks from {self.previous_root}")
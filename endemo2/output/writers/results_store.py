@@ -0,0 +1,259 @@
+"""
+Indexed SQLite store of the yearly results of a run.
+
+Next to the workbooks, the writers hand every yearly table they export (sector
+forecasts, UE, FE, subregional results, DDrs and the subregional division
+forecast) to the results store. At the end of the export the tables are written
+to one file, results.sqlite, in normalized form:
+
+- series: one row per output row with its hierarchy keys (dataset, channel,
+  region, sector, ...), the forecast metadata and the rendered trace
+- series_values: (series_id, year, value), one row per non-missing year value
+- coefficients: (series_id, position, point, value), the regression
+  coefficients or interpolation points of a forecast row
+
+The views forecasts, ue, fe, subregional, ddrs and subregional_division join
+series and values. Everything is inserted with executemany in one transaction.
+"""
+
+from pathlib import Path
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from endemo2.provenance import render_trace
+
+
+RESULTS_STORE_FILE = "results.sqlite"
+
+COEFFICIENTS_COLUMN = "Coefficients/intp_points"
+
+# Output layout column -> series table column
+SERIES_COLUMNS = {
+    "Top_Region": "top_region",
+    "Region": "region",
+    "Subregion": "subregion",
+    "Subregion_name": "subregion_name",
+    "Sector": "sector",
+    "Subsector": "subsector",
+    "Variable": "variable",
+    "Technology": "technology",
+    "UE_Type": "ue_type",
+    "FE_Type": "fe_type",
+    "Temp_level": "temp_level",
+    "Subtech": "subtech",
+    "Drive": "drive",
+    "Forecast data": "forecast_data",
+    "Function": "function",
+    "Equation": "equation",
+    "DDr1": "ddr1",
+    "DDr2": "ddr2",
+    "DDr3": "ddr3",
+    "Unit": "unit",
+    "Factor": "factor",
+    "Lower limit": "lower_limit",
+    "Upper limit": "upper_limit",
+    "Comment": "comment",
+    "Trace": "trace",
+}
+
+# Mixed text/number metadata keeps SQLite's dynamic typing.
+_UNTYPED_COLUMNS = {"factor", "lower_limit", "upper_limit"}
+
+_INDEXED_KEYS = (
+    ("region",),
+    ("subregion",),
+    ("sector", "subsector", "technology"),
+    ("variable",),
+    ("ue_type", "temp_level"),
+    ("fe_type",),
+)
+
+_VIEWS = {
+    "forecasts": "s.dataset = 'forecast'",
+    "ue": "s.dataset = 'energy' AND s.channel = 'UE'",
+    "fe": "s.dataset = 'energy' AND s.channel = 'FE'",
+    "subregional": "s.dataset = 'subregional'",
+    "ddrs": "s.dataset = 'ddr'",
+    "subregional_division": "s.dataset = 'subregional_division'",
+}
+
+
+def _sql_value(value):
+    """Python value sqlite3 can bind; missing and blank values become NULL, other objects text."""
+    value = render_trace(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, str):
+        return value if value.strip() else None
+    if isinstance(value, (int, float)):
+        return value
+    return str(value)
+
+
+def _as_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value
+
+
+def _coefficient_rows(series_id: int, entry) -> list:
+    """
+    (series_id, position, point, value) rows of one Coefficients/intp_points cell.
+
+    Coefficient lists (also nested arrays) give one row per coefficient.
+    Interpolation points, (x1, ..., value) tuples, keep their coordinates as
+    text in `point`.
+    """
+    if isinstance(entry, np.ndarray):
+        entry = entry.tolist()
+    if not isinstance(entry, (list, tuple)):
+        return []
+    rows = []
+    for item in entry:
+        if isinstance(item, tuple) and len(item) >= 2:
+            point = ", ".join(str(_sql_value(coord)) for coord in item[:-1])
+            rows.append((point, _as_float(item[-1])))
+        elif isinstance(item, (list, np.ndarray)):
+            rows.extend((None, _as_float(value)) for value in np.ravel(item).tolist())
+        else:
+            rows.append((None, _as_float(item)))
+    return [(series_id, pos, point, value) for pos, (point, value) in enumerate(rows)]
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    key_columns = ",\n".join(
+        f"    {name}{'' if name in _UNTYPED_COLUMNS else ' TEXT'}" for name in SERIES_COLUMNS.values()
+    )
+    conn.executescript(
+        f"""
+CREATE TABLE series (
+    series_id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    channel TEXT,
+{key_columns}
+);
+CREATE TABLE series_values (
+    series_id INTEGER NOT NULL REFERENCES series(series_id),
+    year INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (series_id, year)
+) WITHOUT ROWID;
+CREATE TABLE coefficients (
+    series_id INTEGER NOT NULL REFERENCES series(series_id),
+    position INTEGER NOT NULL,
+    point TEXT,
+    value REAL,
+    PRIMARY KEY (series_id, position)
+) WITHOUT ROWID;
+"""
+    )
+
+
+def _create_indexes_and_views(conn: sqlite3.Connection) -> None:
+    for keys in _INDEXED_KEYS:
+        name = "_".join(keys)
+        conn.execute(f"CREATE INDEX idx_series_{name} ON series (dataset, channel, {', '.join(keys)})")
+    conn.execute("CREATE INDEX idx_series_values_year ON series_values (year, series_id)")
+    key_columns = ", ".join(f"s.{name}" for name in SERIES_COLUMNS.values() if name != "trace")
+    for view, condition in _VIEWS.items():
+        conn.execute(
+            f"CREATE VIEW {view} AS SELECT s.series_id, s.channel, {key_columns}, v.year, v.value "
+            f"FROM series s JOIN series_values v ON v.series_id = s.series_id WHERE {condition}"
+        )
+
+
+class ResultsStoreOutputMixin:
+
+    def _results_store_enabled(self) -> bool:
+        return bool(self._general_setting("output_sqlite", True))
+
+    def _store_results(self, dataset: str, df: pd.DataFrame, channel: str = None) -> None:
+        """Queue a laid-out yearly output table for the SQLite results store."""
+        if df is None or df.empty or not self._results_store_enabled():
+            return
+        tables = getattr(self, "_results_store_tables", None)
+        if tables is None:
+            tables = self._results_store_tables = []
+        tables.append((dataset, channel, df))
+
+    def _results_store_rows(self, first_id: int, dataset: str, channel: str, df: pd.DataFrame):
+        """series, series_values and coefficients rows of one table; ids start at first_id."""
+        n_rows = len(df)
+        ids = range(first_id, first_id + n_rows)
+        names = [str(col) for col in df.columns]
+
+        key_values = []
+        for column in SERIES_COLUMNS:
+            if column in names:
+                key_values.append([_sql_value(v) for v in df.iloc[:, names.index(column)].tolist()])
+            else:
+                key_values.append([None] * n_rows)
+        series_rows = list(zip(ids, [dataset] * n_rows, [channel] * n_rows, *key_values))
+
+        year_pos = [pos for pos, name in enumerate(names) if name.isdigit()]
+        value_rows = []
+        if year_pos:
+            values = df.iloc[:, year_pos].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+            rows, cols = np.nonzero(np.isfinite(values))
+            years = np.array([int(names[pos]) for pos in year_pos])
+            value_rows = list(zip(
+                (rows + first_id).tolist(), years[cols].tolist(), values[rows, cols].tolist()
+            ))
+
+        coefficient_rows = []
+        if COEFFICIENTS_COLUMN in names:
+            entries = df.iloc[:, names.index(COEFFICIENTS_COLUMN)].tolist()
+            for series_id, entry in zip(ids, entries):
+                coefficient_rows.extend(_coefficient_rows(series_id, entry))
+        return series_rows, value_rows, coefficient_rows
+
+    def _write_results_store(self) -> None:
+        """Write all queued yearly tables to results.sqlite in one transaction."""
+        tables = getattr(self, "_results_store_tables", None)
+        if not tables:
+            return
+        start = time.perf_counter()
+        path = Path(self.output_path) / RESULTS_STORE_FILE
+        if path.exists():
+            path.unlink()
+
+        placeholders = ", ".join("?" * (len(SERIES_COLUMNS) + 3))
+        series_sql = (
+            f"INSERT INTO series (series_id, dataset, channel, {', '.join(SERIES_COLUMNS.values())}) "
+            f"VALUES ({placeholders})"
+        )
+        conn = sqlite3.connect(path)
+        n_series = n_values = 0
+        try:
+            # One file per run that is written once: no journal needed.
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            with conn:
+                _create_schema(conn)
+                for dataset, channel, df in tables:
+                    series_rows, value_rows, coefficient_rows = self._results_store_rows(
+                        n_series + 1, dataset, channel, df
+                    )
+                    conn.executemany(series_sql, series_rows)
+                    conn.executemany("INSERT INTO series_values VALUES (?, ?, ?)", value_rows)
+                    conn.executemany("INSERT INTO coefficients VALUES (?, ?, ?, ?)", coefficient_rows)
+                    n_series += len(series_rows)
+                    n_values += len(value_rows)
+                # Indexes are built after the bulk insert.
+                _create_indexes_and_views(conn)
+        finally:
+            conn.close()
+        self._results_store_tables = []
+        print(
+            f"[Output] Results store {path.name}: {n_series} series, {n_values} values "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
@@ -0,0 +1,126 @@
+"""
+Parallel export of output workbooks.
+
+While an OutputScheduler is active, the writers record the sheets of each
+workbook instead of writing them (DeferredWorkbook). When a workbook's `with`
+block closes, its frames are handed to a process pool that writes the file.
+The frames of all workbooks in flight are kept below a memory budget, and the
+write time of every file is reported when the scheduler closes.
+"""
+
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+import os
+import time
+
+import numpy as np
+
+from endemo2.Input.model_config import write_memory_factor
+from endemo2.output.writers.backends import open_output_writer, write_matrix, write_sheet
+
+
+_SHEET_WRITERS = {"frame": write_sheet, "matrix": write_matrix}
+
+
+def _write_workbook(output_path: str, fmt: str, stream: bool, sheets: list) -> float:
+    """Write one recorded workbook; runs in a writer process and returns the write time."""
+    start = time.perf_counter()
+    with open_output_writer(output_path, fmt, stream=stream) as writer:
+        for kind, args, kwargs in sheets:
+            _SHEET_WRITERS[kind](writer, *args, **kwargs)
+    return time.perf_counter() - start
+
+
+class DeferredWorkbook:
+    """Records the sheets of one workbook and submits them to the scheduler on close."""
+
+    def __init__(self, scheduler: "OutputScheduler", output_path, fmt: str, stream: bool = False):
+        self.scheduler = scheduler
+        self.output_path = output_path
+        self.fmt = fmt
+        self.stream = stream
+        self.sheets = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def write(self, df, sheet_name: str, index: bool = False, **kwargs) -> None:
+        self.sheets.append(("frame", (df, sheet_name), {"index": index, **kwargs}))
+
+    def write_matrix(self, sheet_name: str, columns: list, labels: list, values) -> None:
+        self.sheets.append(("matrix", (sheet_name, columns, labels, values), {}))
+
+    def close(self) -> None:
+        if self.sheets:
+            self.scheduler.submit(self.output_path, self.fmt, self.sheets, stream=self.stream)
+        self.sheets = []
+
+
+class OutputScheduler:
+    """Process pool of workbook writers whose queued frames stay within memory_budget bytes."""
+
+    def __init__(self, workers: int, memory_budget: float, root=None):
+        self.workers = max(1, int(workers))
+        self.memory_budget = float(memory_budget)
+        self.root = root
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._in_flight = {}
+        self.timings = []
+        self._start = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            return False
+        self.close()
+        return False
+
+    def workbook(self, output_path, fmt: str, stream: bool = False) -> DeferredWorkbook:
+        return DeferredWorkbook(self, output_path, fmt, stream)
+
+    def estimate(self, fmt: str, sheets: list, stream: bool = False) -> int:
+        frame_bytes = 0
+        for kind, args, _ in sheets:
+            if kind == "matrix":
+                frame_bytes += np.asarray(args[3]).nbytes
+            else:
+                frame_bytes += int(args[0].memory_usage(index=True, deep=True).sum())
+        return frame_bytes * write_memory_factor(fmt, stream)
+
+    def submit(self, output_path, fmt: str, sheets: list, stream: bool = False) -> None:
+        cost = self.estimate(fmt, sheets, stream)
+        # A workbook larger than the budget is written once nothing else is in flight.
+        while self._in_flight and sum(c for _, c in self._in_flight.values()) + cost > self.memory_budget:
+            self._wait(FIRST_COMPLETED)
+        future = self._executor.submit(_write_workbook, str(output_path), fmt, stream, sheets)
+        self._in_flight[future] = (output_path, cost)
+
+    def _wait(self, return_when) -> None:
+        done, _ = wait(list(self._in_flight), return_when=return_when)
+        for future in done:
+            output_path, _ = self._in_flight.pop(future)
+            self.timings.append((output_path, future.result()))
+
+    def close(self) -> None:
+        """Wait for all writers and print the per-file write times (slowest first)."""
+        try:
+            if self._in_flight:
+                self._wait(ALL_COMPLETED)
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        if not self.timings:
+            return
+        print(
+            f"[Output] Wrote {len(self.timings)} files with {self.workers} writer processes "
+            f"in {time.perf_counter() - self._start:.2f}s:"
+        )
+        for output_path, seconds in sorted(self.timings, key=lambda item: -item[1]):
+            name = os.path.relpath(output_path, self.root) if self.root else str(output_path)
+            print(f"[Output]   {seconds:7.2f}s  {name}")
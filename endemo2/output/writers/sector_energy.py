@@ -147,7 +147,7 @@ class SectorEnergyOutputMixin:
         sum_label_col: str = 'Temp_level',
         sum_label: str = 'SUM',
     ):
-        """Write one aggregate sheet in legacy style (index + merged blocks)."""
+        """Write one aggregate sheet in legacy style (index + merged blocks) or, if configured, flat."""
         agg_idx = self._aggregate_with_sum_rows(
             combined,
             group_cols,
@@ -159,122 +159,88 @@ class SectorEnergyOutputMixin:
             sum_label_col=sum_label_col,
             sum_label=sum_label,
         )
-        agg_idx.to_excel(writer, sheet_name=sheet_name, merge_cells=True)
-
-
-    def _energy_series_header(self, row: pd.Series, channel: str) -> str:
-        def tok(v):
-            if v is None:
-                return "default"
-            try:
-                if pd.isna(v):
-                    return "default"
-            except Exception:
-                pass
-            s = str(v).strip()
-            return s if s else "default"
-
-        region = tok(row.get("Region"))
-        sector = tok(row.get("Sector"))
-        subsector = tok(row.get("Subsector"))
-        technology = tok(row.get("Technology"))
-        subtech = tok(row.get("Subtech"))
-        drive = tok(row.get("Drive"))
-        ue_type = tok(row.get("UE_Type"))
-        temp_level = tok(row.get("Temp_level"))
-
-        if channel == "FE":
-            fe_type = tok(row.get("FE_Type"))
-            parts = [region, sector, subsector, technology, subtech, drive, fe_type, ue_type, temp_level]
+        if self._flat_aggregates():
+            self._write_sheet(writer, agg_idx.reset_index(), sheet_name)
         else:
-            parts = [region, sector, subsector, technology, subtech, drive, ue_type, temp_level]
-        return "|".join(parts)
+            self._write_sheet(writer, agg_idx, sheet_name, index=True, merge_cells=True)
+
+
+    def _energy_series_headers(self, combined: pd.DataFrame, channel: str) -> pd.Series:
+        """Series header (Region|Sector|...|Temp_level) of every row; empty parts become "default"."""
+        def tok(col):
+            if col not in combined.columns:
+                return pd.Series("default", index=combined.index)
+            values = combined[col]
+            text = values.astype(str).str.strip()
+            return text.where(values.notna() & (text != ""), "default")
+
+        cols = ["Region", "Sector", "Subsector", "Technology", "Subtech", "Drive"]
+        cols += ["FE_Type", "UE_Type", "Temp_level"] if channel == "FE" else ["UE_Type", "Temp_level"]
+        parts = [tok(col) for col in cols]
+        return parts[0].str.cat(parts[1:], sep="|")
+
+    def _energy_columnar_parts(self, combined: pd.DataFrame, channel: str):
+        """Return (sorted year columns, per-row headers, numeric year values with missing values as 0)."""
+        year_cols = sorted([str(c) for c in combined.columns if str(c).isdigit()], key=lambda x: int(x))
+        if not year_cols:
+            return [], None, None
+        combined = combined.rename(columns={c: str(c) for c in combined.columns if str(c).isdigit()})
+        headers = self._energy_series_headers(combined, channel)
+        values = combined[year_cols].apply(pd.to_numeric, errors="coerce").fillna(0.0).astype(float)
+        return year_cols, headers, values
+
+    def _write_energy_columnar_metadata(self, writer, combined: pd.DataFrame, headers: pd.Series):
+        metadata_cols = [
+            c for c in [
+                "Region", "Sector", "Subsector", "Technology", "Subtech", "Drive",
+                "UE_Type", "FE_Type", "Temp_level", "Variable", "Unit", "Trace"
+            ] if c in combined.columns
+        ]
+        metadata = combined[metadata_cols].copy()
+        metadata["Header"] = headers
+        metadata = self._render_trace_column(metadata.drop_duplicates(subset=["Header"], keep="first"))
+        self._write_sheet(writer, metadata, "Metadata")
+
+    def _year_row_frame(self, totals: pd.DataFrame, year: str) -> pd.DataFrame:
+        """One-row sheet of a year: each column is one series (header) in that year."""
+        df_year = pd.DataFrame([totals[year].to_numpy()], columns=list(totals.index))
+        df_year.insert(0, "year", year)
+        return df_year
 
     def _write_energy_columnar_yearly(self, combined: pd.DataFrame, output_path, channel: str):
         if combined is None or combined.empty:
             return
 
-        year_cols = [c for c in combined.columns if str(c).isdigit()]
+        year_cols, headers, values = self._energy_columnar_parts(combined, channel)
         if not year_cols:
             return
-        year_cols = sorted([str(c) for c in year_cols], key=lambda x: int(x))
-
-        with self._get_excel_writer(output_path) as writer:
-            # metadata sheet
-            metadata_cols = [
-                c for c in [
-                    "Region", "Sector", "Subsector", "Technology", "Subtech", "Drive",
-                    "UE_Type", "FE_Type", "Temp_level", "Variable", "Unit", "Trace"
-                ] if c in combined.columns
-            ]
-            metadata = combined[metadata_cols].copy()
-            metadata["Header"] = combined.apply(lambda r: self._energy_series_header(r, channel), axis=1)
-            metadata = metadata.drop_duplicates(subset=["Header"], keep="first")
-            metadata.to_excel(writer, sheet_name="Metadata", index=False)
+
+        # all years summed per header in one pass (headers in first-appearance order)
+        totals = values.groupby(headers, sort=False).sum()
+
+        with self._get_output_writer(output_path, "energy") as writer:
+            self._write_energy_columnar_metadata(writer, combined, headers)
 
             # one sheet per forecast year
             for year in year_cols:
-                cols = {}
-                for _, row in combined.iterrows():
-                    header = self._energy_series_header(row, channel)
-                    value = pd.to_numeric(row.get(year), errors="coerce")
-                    if pd.isna(value):
-                        value = 0.0
-                    if header in cols:
-                        cols[header] += float(value)
-                    else:
-                        cols[header] = float(value)
-
-                if not cols:
-                    continue
-
-                # one-row sheet: each column is one series in that year
-                df_year = pd.DataFrame([cols])
-                df_year.insert(0, "year", year)
-                df_year.to_excel(writer, sheet_name=str(year)[:31], index=False)
+                self._write_sheet(writer, self._year_row_frame(totals, year), str(year)[:31])
 
     def _write_energy_columnar_by_sector(self, combined: pd.DataFrame, output_path, channel: str):
         if combined is None or combined.empty or "Sector" not in combined.columns:
             return
 
-        year_cols = [c for c in combined.columns if str(c).isdigit()]
+        year_cols, headers, values = self._energy_columnar_parts(combined, channel)
         if not year_cols:
             return
-        year_cols = sorted([str(c) for c in year_cols], key=lambda x: int(x))
-
-        with self._get_excel_writer(output_path) as writer:
-            metadata_cols = [
-                c for c in [
-                    "Region", "Sector", "Subsector", "Technology", "Subtech", "Drive",
-                    "UE_Type", "FE_Type", "Temp_level", "Variable", "Unit", "Trace"
-                ] if c in combined.columns
-            ]
-            metadata = combined[metadata_cols].copy()
-            metadata["Header"] = combined.apply(lambda r: self._energy_series_header(r, channel), axis=1)
-            metadata = metadata.drop_duplicates(subset=["Header"], keep="first")
-            metadata.to_excel(writer, sheet_name="Metadata", index=False)
+
+        with self._get_output_writer(output_path, "energy") as writer:
+            self._write_energy_columnar_metadata(writer, combined, headers)
 
             used_sheet_names = set(["Metadata"])
-            for sector_name, sector_df in combined.groupby("Sector", dropna=False):
+            for sector_name, sector_values in values.groupby(combined["Sector"], dropna=False):
                 sector_label = str(sector_name) if pd.notna(sector_name) else "default"
+                totals = sector_values.groupby(headers.loc[sector_values.index], sort=False).sum()
                 for year in year_cols:
-                    cols = {}
-                    for _, row in sector_df.iterrows():
-                        header = self._energy_series_header(row, channel)
-                        value = pd.to_numeric(row.get(year), errors="coerce")
-                        if pd.isna(value):
-                            value = 0.0
-                        if header in cols:
-                            cols[header] += float(value)
-                        else:
-                            cols[header] = float(value)
-
-                    if not cols:
-                        continue
-
-                    df_year = pd.DataFrame([cols])
-                    df_year.insert(0, "year", year)
-
                     base_name = f"{year}_{sector_label}"
                     sheet_name = base_name[:31]
                     counter = 1
@@ -283,7 +249,7 @@ class SectorEnergyOutputMixin:
                         sheet_name = (base_name[: max(0, 31 - len(suffix))] + suffix)
                         counter += 1
                     used_sheet_names.add(sheet_name)
-                    df_year.to_excel(writer, sheet_name=sheet_name, index=False)
+                    self._write_sheet(writer, self._year_row_frame(totals, year), sheet_name)
 
     def collect_ue_data(self, regions):
         """Collect useful energy data from model_useful_energy structure"""
@@ -348,21 +314,21 @@ class SectorEnergyOutputMixin:
             if not dfs:
                 continue
             combined = pd.concat(dfs, ignore_index=True)
-            combined = self._filter_years_for_output(combined)
-            combined = self._standardize_output_layout(combined)
+            combined = self._layout_output_frame(combined)
+            self._store_results("forecast", combined)
             file_path = sector_dir / f"predictions_{sector_name}.xlsx"
-            with self._get_excel_writer(file_path) as writer:
-                self._prepare_non_timeseries_output(combined).to_excel(writer, sheet_name="Sheet1", index=False)
+            with self._get_output_writer(file_path, "forecasts") as writer:
+                self._write_sheet(writer, self._prepare_non_timeseries_output(combined), "Sheet1")
 
         for name, df_list in self.efficiency.items():
             if all(x is None for x in df_list):
                 continue
             combined = pd.concat(df_list, ignore_index=True)
-            combined = self._filter_years_for_output(combined)
-            combined = self._standardize_output_layout(combined)
+            combined = self._layout_output_frame(combined)
+            self._store_results("forecast", combined)
             file_path = sector_dir / f"predictions_{name}.xlsx"
-            with self._get_excel_writer(file_path) as writer:
-                self._prepare_non_timeseries_output(combined).to_excel(writer, sheet_name="Sheet1", index=False)
+            with self._get_output_writer(file_path, "forecasts") as writer:
+                self._write_sheet(writer, self._prepare_non_timeseries_output(combined), "Sheet1")
 
 
 
@@ -375,15 +341,15 @@ class SectorEnergyOutputMixin:
                 continue
 
             combined = pd.concat(valid, ignore_index=True)
-            combined = self._filter_years_for_output(combined)
-            combined = self._standardize_output_layout(combined)
+            combined = self._layout_output_frame(combined)
+            self._store_results("energy", combined, channel="UE")
 
             year_cols = [c for c in combined.columns if str(c).isdigit()]
             year_cols = sorted(year_cols, key=lambda x: int(str(x)))
 
             file_path = self.output_path / f"UE_{sector_name}.xlsx"
-            with self._get_excel_writer(file_path) as writer:
-                self._prepare_non_timeseries_output(combined).to_excel(writer, sheet_name="UE_all", index=False)
+            with self._get_output_writer(file_path, "energy") as writer:
+                self._write_sheet(writer, self._prepare_non_timeseries_output(combined), "UE_all")
 
                 if year_cols:
                     self._write_aggregate_sheet(
@@ -412,15 +378,15 @@ class SectorEnergyOutputMixin:
                 continue
 
             combined = pd.concat(valid, ignore_index=True)
-            combined = self._filter_years_for_output(combined)
-            combined = self._standardize_output_layout(combined)
+            combined = self._layout_output_frame(combined)
+            self._store_results("energy", combined, channel="FE")
 
             year_cols = [c for c in combined.columns if str(c).isdigit()]
             year_cols = sorted(year_cols, key=lambda x: int(str(x)))
 
             file_path = self.output_path / f"FE_{sector_name}.xlsx"
-            with self._get_excel_writer(file_path) as writer:
-                self._prepare_non_timeseries_output(combined).to_excel(writer, sheet_name="FE_all", index=False)
+            with self._get_output_writer(file_path, "energy") as writer:
+                self._write_sheet(writer, self._prepare_non_timeseries_output(combined), "FE_all")
 
                 if year_cols:
                     self._write_aggregate_sheet(
@@ -459,11 +425,9 @@ class SectorEnergyOutputMixin:
             return
 
         if not ue_all.empty:
-            ue_all = self._filter_years_for_output(ue_all)
-            ue_all = self._standardize_output_layout(ue_all)
+            ue_all = self._layout_output_frame(ue_all)
         if not fe_all.empty:
-            fe_all = self._filter_years_for_output(fe_all)
-            fe_all = self._standardize_output_layout(fe_all)
+            fe_all = self._layout_output_frame(fe_all)
 
         year_cols_ue = [c for c in ue_all.columns if str(c).isdigit()] if not ue_all.empty else []
         year_cols_fe = [c for c in fe_all.columns if str(c).isdigit()] if not fe_all.empty else []
@@ -471,7 +435,7 @@ class SectorEnergyOutputMixin:
         year_cols_fe = sorted(year_cols_fe, key=lambda x: int(str(x)))
 
         out_path = self.output_path / "Aggregated_Comparison.xlsx"
-        with self._get_excel_writer(out_path) as writer:
+        with self._get_output_writer(out_path, "energy") as writer:
             if not ue_all.empty and year_cols_ue:
                 self._write_aggregate_sheet(
                     writer, ue_all, 'UE_Agg_Sector_per_Region',
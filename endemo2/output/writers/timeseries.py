@@ -1,9 +1,14 @@
-from concurrent.futures import ThreadPoolExecutor
-import os
+from contextlib import ExitStack
 import time
 import numpy as np
 import pandas as pd
 
+from endemo2.output.factorized_hourly import write_factorized_hourly
+
+
+# Load-duration curve sample points (share of the sorted hours)
+LDC_SAMPLES = (0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+
 
 class TimeseriesOutputMixin:
 
@@ -28,30 +33,52 @@ class TimeseriesOutputMixin:
             return
         print("Starting timeseries export...")
         start_time = time.time()
+        settings = self.data.input_manager.general_settings
         hourly_dir = self.output_path / "houerly timeserries"
         hourly_dir.mkdir(exist_ok=True)
 
-        # total workbook (region + UE/FE aggregation)
-        self._write_timeseries_results(channel="UE", output_dir=hourly_dir)
-        if self._is_enabled(self.data.input_manager.general_settings.FE_marker):
-            self._write_timeseries_results(channel="FE", output_dir=hourly_dir)
-
-        per_sector_enabled = self._is_enabled(self.data.input_manager.general_settings.timeseries_per_region)
+        channels = ["UE"]
+        if self._is_enabled(settings.FE_marker):
+            channels.append("FE")
+        per_sector_enabled = self._is_enabled(settings.timeseries_per_region)
+        subregional_on = self._is_enabled(settings.subregional_resolution)
+        streaming = getattr(self.data, "timeseries_streaming", False)
 
         # by-sector output only when enabled:
         # - one workbook per region (Region_UE/Region_FE naming)
+        region_dir = None
         if per_sector_enabled:
-            directory = hourly_dir / "timeseries"
-            directory.mkdir(exist_ok=True)
-            self._write_per_region_timeseries(directory, channel="UE")
-            if self._is_enabled(self.data.input_manager.general_settings.FE_marker):
-                self._write_per_region_timeseries(directory, channel="FE")
+            region_dir = hourly_dir / "timeseries"
+            region_dir.mkdir(exist_ok=True)
+
+        # Factorized output replaces the hourly workbooks of the total and per-region views.
+        factorized = self._is_enabled(getattr(settings, "timeseries_factorized", False))
+
+        # Streaming mode also writes the subregional workbooks year by year.
+        subregional_context = None
+        if streaming and subregional_on and not factorized and getattr(self.data, "typical_periods", None) is None:
+            subregional_context = self._subregional_timeseries_context()
+            if subregional_context is not None:
+                subregional_dir = self._subregional_timeseries_dir()
+                if subregional_context["per_sector_enabled"]:
+                    (subregional_dir / "by_sector").mkdir(exist_ok=True)
+
+        # total workbook (region + UE/FE aggregation) and per-region workbooks in one pass per channel
+        typical_periods = getattr(self.data, "typical_periods", None)
+        for channel in channels:
+            if typical_periods is not None:
+                self._write_typical_period_views(channel, hourly_dir, typical_periods, region_dir=region_dir)
+            elif factorized:
+                self._write_factorized_hourly(channel, hourly_dir, per_region=region_dir is not None)
+            else:
+                self._write_timeseries_views(
+                    channel, hourly_dir, region_dir=region_dir, subregional_context=subregional_context
+                )
 
         # Optional subregional output stays in row format.
-        subregional_on = self._is_enabled(self.data.input_manager.general_settings.subregional_resolution)
-        if subregional_on:
+        if subregional_on and (not streaming or factorized or typical_periods is not None):
             self._write_subregional_timeseries_rows(channel="UE")
-            if self._is_enabled(self.data.input_manager.general_settings.FE_marker):
+            if self._is_enabled(settings.FE_marker):
                 self._write_subregional_timeseries_rows(channel="FE")
 
         print(f"Timeseries export completed in {time.time() - start_time:.2f}s")
@@ -62,25 +89,25 @@ class TimeseriesOutputMixin:
         df = self.data.build_dependent_ddr_export()
         if df is None or df.empty:
             return
-        df = self._filter_years_for_output(df)
-        df = self._standardize_output_layout(df)
+        df = self._layout_output_frame(df)
+        self._store_results("ddr", df)
         forecast_dir = self.output_path / "DDr and Subregional forecasst"
         forecast_dir.mkdir(exist_ok=True)
         file_path = forecast_dir / "DemandDrivers_calculated.xlsx"
-        with self._get_excel_writer(file_path) as writer:
-            self._prepare_non_timeseries_output(df).to_excel(writer, sheet_name="Demand_drivers", index=False)
+        with self._get_output_writer(file_path) as writer:
+            self._write_sheet(writer, self._prepare_non_timeseries_output(df), "Demand_drivers")
 
     def _write_subregion_division_forecast(self):
         df = getattr(self.data, "subregion_division_forecast", None)
         if df is None or df.empty:
             return
-        df = self._filter_years_for_output(df)
-        df = self._standardize_output_layout(df)
+        df = self._layout_output_frame(df)
+        self._store_results("subregional_division", df)
         forecast_dir = self.output_path / "DDr and Subregional forecasst"
         forecast_dir.mkdir(exist_ok=True)
         file_path = forecast_dir / "Subregional_Division_Forecast.xlsx"
-        with self._get_excel_writer(file_path) as writer:
-            self._prepare_non_timeseries_output(df).to_excel(writer, sheet_name="Subregional_division", index=False)
+        with self._get_output_writer(file_path) as writer:
+            self._write_sheet(writer, self._prepare_non_timeseries_output(df), "Subregional_division")
 
     def _ts_token(self, value, default="default") -> str:
         if value is None:
@@ -93,19 +120,6 @@ class TimeseriesOutputMixin:
         text = str(value).strip()
         return text if text else default
 
-    def _normalize_hourly_column_data(self, ydata) -> np.ndarray:
-        """Return fixed-length array: [annual_total, h1..h8760]."""
-        hourly_values = list(ydata.get("hourly_values", [])) if isinstance(ydata, dict) else []
-        if len(hourly_values) > 8760:
-            hourly_values = hourly_values[:8760]
-        elif len(hourly_values) < 8760:
-            hourly_values = hourly_values + [0.0] * (8760 - len(hourly_values))
-
-        # Keep total row strictly consistent with the written hourly values.
-        annual = float(np.nansum(hourly_values))
-        return np.asarray([annual] + hourly_values, dtype=np.float64)
-
-
 
     def _build_timeseries_header(self, region_code: str, comp: dict, channel: str, mode: str = "detailed") -> str:
         region = self._ts_token(region_code).upper()
@@ -142,159 +156,484 @@ class TimeseriesOutputMixin:
             parts = [region, sector, subsector, technology, subtech, drive, ue_type, temp_level]
         return "|".join(parts)
 
-    def _collect_timeseries_columns(self, channel: str, header_mode: str = "detailed", split_by_sector: bool = False):
-        metadata = []
-        yearly_data = {}  # year -> headers OR year -> sector -> headers
+    def _timeseries_metadata_row(self, channel: str, region, pid, header: str, pdata: dict) -> dict:
+        contributors = pdata.get("contributors", {})
+        return {
+            "Channel": channel,
+            "Region": region.code,
+            "Profile ID": pid,
+            "Header": header,
+            **pdata.get("components", {}),
+            "Sectors": ", ".join(contributors.get("sectors", [])),
+            "Subsectors": ", ".join(contributors.get("subsectors", [])),
+            "Techs": ", ".join(contributors.get("technologies", [])),
+            "Subtechs": ", ".join(contributors.get("subtechs", [])),
+            "Drives": ", ".join(contributors.get("drives", [])),
+        }
+
+    def _build_timeseries_views(self, channel: str, header_modes: tuple = ("total",), per_region: bool = False) -> dict:
+        """
+        One pass over the region profiles of a channel.
+
+        Every region profile becomes one component row. Each view (a workbook)
+        maps the component rows it covers to header ids via an index array, so
+        all views of a year are produced from one component matrix:
+        - header_modes: views over all regions ("total" / "sector" headers)
+        - per_region: one "sector"-header view per region
+        """
+        components = []
+        years = set()
+        views = {mode: {"headers": [], "ids": {}, "index": [], "rows": None, "metadata": []} for mode in header_modes}
+        region_views = []
 
         for region in self.data.regions:
             profiles = self._get_profiles_by_channel(region, channel)
             if not profiles:
                 continue
-
+            region_view = {"headers": [], "ids": {}, "index": [], "rows": [], "metadata": []}
             for pid, pdata in profiles.items():
                 comp = pdata.get("components", {})
-                sector_name = self._ts_token(comp.get("Sector"))
-                header = self._build_timeseries_header(region.code, comp, channel, mode=header_mode)
-
-                metadata.append({
-                    "Channel": channel,
-                    "Region": region.code,
-                    "Profile ID": pid,
-                    "Header": header,
-                    **comp,
-                    "Sectors": ", ".join(pdata.get("contributors", {}).get("sectors", [])),
-                    "Subsectors": ", ".join(pdata.get("contributors", {}).get("subsectors", [])),
-                    "Techs": ", ".join(pdata.get("contributors", {}).get("technologies", [])),
-                    "Subtechs": ", ".join(pdata.get("contributors", {}).get("subtechs", [])),
-                    "Drives": ", ".join(pdata.get("contributors", {}).get("drives", [])),
-                })
-
-                for yr, ydata in (pdata.get("years", {}) or {}).items():
-                    year_key = str(yr)
-                    column_values = self._normalize_hourly_column_data(ydata)
-
-                    if split_by_sector:
-                        sector_bucket = yearly_data.setdefault(year_key, {}).setdefault(sector_name, {})
-                        if header in sector_bucket:
-                            sector_bucket[header] += column_values
-                        else:
-                            sector_bucket[header] = column_values.copy()
-                    else:
-                        year_bucket = yearly_data.setdefault(year_key, {})
-                        if header in year_bucket:
-                            year_bucket[header] += column_values
-                        else:
-                            year_bucket[header] = column_values.copy()
-
-        return metadata, yearly_data
-
-    def _write_columnar_sheet(self, writer, sheet_name: str, columns: dict):
-        if not columns:
+                years_map = pdata.get("years", {}) or {}
+                year_keys = {str(yr): yr for yr in years_map}
+                years.update(year_keys)
+                row = len(components)
+                components.append((years_map, year_keys))
+
+                targets = [(views[mode], mode) for mode in header_modes]
+                if per_region:
+                    targets.append((region_view, "sector"))
+                for view, mode in targets:
+                    header = self._build_timeseries_header(region.code, comp, channel, mode=mode)
+                    view["metadata"].append(self._timeseries_metadata_row(channel, region, pid, header, pdata))
+                    header_id = view["ids"].get(header)
+                    if header_id is None:
+                        header_id = len(view["headers"])
+                        view["ids"][header] = header_id
+                        view["headers"].append(header)
+                    view["index"].append(header_id)
+                    if view["rows"] is not None:
+                        view["rows"].append(row)
+            if per_region:
+                region_views.append((region, region_view))
+
+        for view in list(views.values()) + [view for _, view in region_views]:
+            view["index"] = np.asarray(view["index"], dtype=np.int64)
+            if view["rows"] is not None:
+                view["rows"] = np.asarray(view["rows"], dtype=np.int64)
+        return {
+            "components": components,
+            "years": sorted(years, key=lambda y: int(y) if str(y).isdigit() else str(y)),
+            "views": views,
+            "regions": region_views,
+        }
+
+    def _component_year_matrix(self, components: list, year: str):
+        """Return (components x 8760 matrix, presence mask) of one year; shorter series are zero-padded."""
+        fixed_hours = 8760
+        present = np.zeros(len(components), dtype=bool)
+        arrays = []
+        for row, (years_map, year_keys) in enumerate(components):
+            key = year_keys.get(year)
+            if key is None:
+                continue
+            ydata = years_map[key]
+            values = np.asarray(ydata.get("hourly_values", []) if isinstance(ydata, dict) else [])
+            present[row] = True
+            arrays.append((row, values))
+
+        float32 = bool(arrays) and all(values.dtype == np.float32 for _, values in arrays)
+        matrix = np.zeros((len(components), fixed_hours), dtype=np.float32 if float32 else np.float64)
+        for row, values in arrays:
+            n_hours = min(values.size, fixed_hours)
+            matrix[row, :n_hours] = values[:n_hours]
+        return matrix, present
+
+    def _reduce_view(self, matrix: np.ndarray, present: np.ndarray, view: dict):
+        """Sum the year's component rows per header; headers in first-appearance order."""
+        index = view["index"]
+        if view["rows"] is not None:
+            matrix = matrix[view["rows"]]
+            present = present[view["rows"]]
+        rows = np.flatnonzero(present)
+        if rows.size == 0:
+            return [], None
+        ids = index[rows]
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        sums = np.add.reduceat(matrix[rows[order]], starts, axis=0)
+        _, first_seen = np.unique(ids, return_index=True)
+        appearance = np.argsort(first_seen, kind="stable")
+        headers = [view["headers"][header_id] for header_id in sorted_ids[starts][appearance]]
+        return headers, sums[appearance]
+
+    def _write_column_matrix_sheet(self, writer, sheet_name: str, headers: list, columns: np.ndarray):
+        if not headers:
             return
-
         fixed_hours = 8760
-        data = {}
-        for header, arr in columns.items():
-            vec = np.asarray(arr, dtype=np.float64)
-            hourly = vec[1:] if vec.size > 0 else np.array([], dtype=np.float64)
-            if hourly.size > fixed_hours:
-                hourly = hourly[:fixed_hours]
-            elif hourly.size < fixed_hours:
-                hourly = np.pad(hourly, (0, fixed_hours - hourly.size), constant_values=0.0)
-
-            total = float(np.nansum(hourly))
-            data[header] = np.concatenate(([total], hourly))
-
-        df = pd.DataFrame(data)
-        df.insert(0, "Country_code.Commodity", ["total"] + [str(i) for i in range(1, fixed_hours + 1)])
-        df.to_excel(writer, sheet_name=sheet_name[:31], index=False)
-
-
-    def _write_timeseries_results(self, channel: str = "UE", output_dir=None):
+        # float32 columns are widened per sheet so totals are written in float64.
+        hourly = np.asarray(columns, dtype=np.float64)
+        data = np.empty((fixed_hours + 1, len(headers)), dtype=np.float64)
+        data[0] = np.nansum(hourly, axis=1)
+        data[1:] = hourly.T
+        labels = ["total"] + [str(i) for i in range(1, fixed_hours + 1)]
+        self._write_matrix(writer, sheet_name[:31], ["Country_code.Commodity"] + list(headers), labels, data)
+
+    def _hourly_summary_rows(self, view_name: str, year: str, headers: list, columns: np.ndarray) -> list[dict]:
+        """Annual total, peak/minimum, load factor, sampled load-duration curve and max ramp per header."""
+        if not headers:
+            return []
+        hourly = np.asarray(columns, dtype=np.float64)
+        n_hours = hourly.shape[1]
+        totals = np.nansum(hourly, axis=1)
+        # All-NaN columns have no peak, minimum, load factor or ramp.
+        valid = ~np.isnan(hourly).all(axis=1)
+        peaks = np.full(len(headers), np.nan)
+        minima = np.full(len(headers), np.nan)
+        peak_hours = np.zeros(len(headers), dtype=np.int64)
+        ramps = np.full(len(headers), np.nan)
+        if valid.any():
+            peaks[valid] = np.nanmax(hourly[valid], axis=1)
+            minima[valid] = np.nanmin(hourly[valid], axis=1)
+            peak_hours[valid] = np.nanargmax(hourly[valid], axis=1) + 1
+            ramps[valid] = np.nanmax(np.abs(np.diff(hourly[valid], axis=1)), axis=1) if n_hours > 1 else 0.0
+        load_factors = np.divide(totals, peaks * n_hours, out=np.zeros_like(totals), where=peaks > 0)
+        load_factors[~valid] = np.nan
+        duration = -np.sort(-hourly, axis=1)
+        samples = np.round(np.asarray(LDC_SAMPLES) * (n_hours - 1)).astype(np.int64)
+        ldc = duration[:, samples]
+
+        rows = []
+        for i, header in enumerate(headers):
+            row = {
+                "View": view_name,
+                "Year": year,
+                "Header": header,
+                "Annual total": totals[i],
+                "Peak": peaks[i],
+                "Peak hour": int(peak_hours[i]) if valid[i] else None,
+                "Minimum": minima[i],
+                "Load factor": load_factors[i],
+                "Max ramp": ramps[i],
+            }
+            for share, value in zip(LDC_SAMPLES, ldc[i]):
+                row[f"LDC {share:.0%}"] = value
+            rows.append(row)
+        return rows
+
+    def _write_timeseries_views(self, channel: str, output_dir, region_dir=None, header_mode: str = "total",
+                                file_prefix: str = "timeseries_total", subregional_context=None):
+        """
+        Write the total workbook (and the per-region workbooks when region_dir is
+        given) of a channel in a single year-major pass: per year the component
+        matrix is built once and reduced to every workbook's columns.
+        With subregional_context the subregional workbooks of that year are
+        written in the same pass (streaming export).
+        A summary workbook (peaks, load factor, load-duration curve, ramps per
+        header and year of every workbook) is collected in the same pass.
+        """
         if not self._has_channel_timeseries(channel):
             return
-
-        base_dir = output_dir or self.output_path
-        output_path = base_dir / f"timeseries_total_{channel}.xlsx"
-        metadata, yearly_data = self._collect_timeseries_columns(
-            channel=channel,
-            header_mode="total",
-            split_by_sector=False,
-        )
-
-        with self._get_excel_writer(output_path) as writer:
-            if metadata:
-                pd.DataFrame(metadata).to_excel(writer, sheet_name="Metadata", index=False)
-            for year in sorted(yearly_data.keys(), key=lambda y: int(y) if str(y).isdigit() else str(y)):
-                self._write_columnar_sheet(writer, sheet_name=str(year), columns=yearly_data.get(year, {}))
-
-
-
-    def _write_timeseries_results_by_sector(self, channel: str = "UE", output_dir=None):
+        views = self._build_timeseries_views(channel, header_modes=(header_mode,), per_region=region_dir is not None)
+        workbooks = [(output_dir / f"{file_prefix}_{channel}.xlsx", views["views"][header_mode], "total")]
+        for region, view in views["regions"]:
+            workbooks.append((region_dir / f"{region.region_name}_{channel}.xlsx", view, region.region_name))
+
+        # Streaming export writes year by year; its workbooks are never deferred to writer processes.
+        # Only constant-memory writers (xlsxwriter, columnar formats) release a year once it is written.
+        deferred = subregional_context is None and not getattr(self.data, "timeseries_streaming", False)
+        summary = []
+        with ExitStack() as stack:
+            writers = []
+            for output_path, view, view_name in workbooks:
+                writer = stack.enter_context(self._get_output_writer(output_path, "timeseries", deferred=deferred))
+                if view["metadata"]:
+                    self._write_sheet(writer, pd.DataFrame(view["metadata"]), "Metadata")
+                writers.append((writer, view, view_name))
+
+            subregional_writers = {}
+            subregional_plan = None
+            if subregional_context is not None:
+                subregional_plan = self._subregional_timeseries_plan(subregional_context, channel)
+
+            def subregional_writer(key, path):
+                if key not in subregional_writers:
+                    subregional_writers[key] = stack.enter_context(
+                        self._get_output_writer(path, "timeseries", deferred=deferred)
+                    )
+                return subregional_writers[key]
+
+            subregional_dir = self._subregional_timeseries_dir() if subregional_context is not None else None
+            for year in views["years"]:
+                matrix, present = self._component_year_matrix(views["components"], year)
+                for writer, view, view_name in writers:
+                    headers, columns = self._reduce_view(matrix, present, view)
+                    self._write_column_matrix_sheet(writer, str(year), headers, columns)
+                    summary.extend(self._hourly_summary_rows(view_name, str(year), headers, columns))
+                del matrix
+
+                if subregional_context is None or year not in subregional_context["valid_years"]:
+                    continue
+                total_columns, sector_columns = self._subregional_year_columns(subregional_plan, year)
+                if total_columns:
+                    writer = subregional_writer(None, subregional_dir / f"timeseries_subregions_total_{channel}.xlsx")
+                    self._write_subregional_columns_sheet(writer, year, total_columns)
+                for sector_name, columns in sector_columns.items():
+                    if not columns:
+                        continue
+                    writer = subregional_writer(
+                        sector_name,
+                        self._subregional_sector_workbook_path(subregional_dir / "by_sector", sector_name, channel),
+                    )
+                    self._write_subregional_columns_sheet(writer, year, columns)
+                del total_columns, sector_columns
+
+        self._write_hourly_summary(output_dir / f"{file_prefix}_summary_{channel}.xlsx", summary)
+
+    def _write_hourly_summary(self, output_path, summary: list[dict]) -> None:
+        if summary:
+            with self._get_output_writer(output_path, "timeseries") as writer:
+                self._write_sheet(writer, pd.DataFrame(summary), "Summary")
+
+    def _factorized_component_entries(self, years_map, key, profile_id, fixed_hours: int):
+        """(global profile ids, weights) of one component year; at least one entry per component."""
+        if hasattr(years_map, "coefficients") and years_map.library.matrix is not None:
+            library = years_map.library
+            coefficients = np.asarray(years_map.coefficients(key), dtype=np.float64)
+            used = np.flatnonzero(coefficients)
+            if used.size == 0:
+                used = np.arange(min(1, coefficients.size))
+            return [profile_id(library, col) for col in used], coefficients[used]
+        ydata = years_map[key]
+        hourly = np.zeros(fixed_hours, dtype=np.float64)
+        series = np.asarray(ydata.get("hourly_values", []) if isinstance(ydata, dict) else [], dtype=np.float64)
+        hourly[:min(series.size, fixed_hours)] = series[:fixed_hours]
+        # Plain hourly series are stored as their own normalized profile.
+        total = hourly.sum()
+        weight = total if total != 0 else 1.0
+        return [profile_id(None, hourly / weight)], np.array([weight if total != 0 else 0.0])
+
+    def _write_factorized_hourly(self, channel: str, output_dir, per_region: bool = False):
+        """
+        Factorized counterpart of _write_timeseries_views: the distinct load
+        profiles of all regions are written once and every header column of the
+        total (and per-region) view as (year, profile, annual energy) rows, see
+        endemo2.output.factorized_hourly. Only the summary workbook rebuilds the
+        hourly columns, one view and year at a time.
+        """
         if not self._has_channel_timeseries(channel):
             return
+        fixed_hours = 8760
+        views = self._build_timeseries_views(channel, per_region=per_region)
+        components = views["components"]
+        view_list = [("total", views["views"]["total"])]
+        view_list += [(region.region_name, view) for region, view in views["regions"]]
+
+        dtypes = [
+            years_map.library.dtype for years_map, _ in components
+            if hasattr(years_map, "library") and years_map.library.matrix is not None
+        ]
+        dtype = np.result_type(*dtypes) if dtypes else np.dtype(np.float64)
+        profiles = []
+        profile_ids = {}
+        library_ids = {}
+
+        def profile_id(library, column):
+            if library is not None:
+                cached = library_ids.get((id(library), column))
+                if cached is not None:
+                    return cached
+                values = np.zeros(fixed_hours, dtype=dtype)
+                row = library.matrix[column, :fixed_hours]
+                values[:row.size] = row
+            else:
+                values = np.asarray(column, dtype=dtype)
+            pid = profile_ids.setdefault(values.tobytes(), len(profiles))
+            if pid == len(profiles):
+                profiles.append(values)
+            if library is not None:
+                library_ids[(id(library), column)] = pid
+            return pid
+
+        # header id of every component row per view (-1: not in the view)
+        header_ids = []
+        for _, view in view_list:
+            ids = np.full(len(components), -1, dtype=np.int64)
+            rows = view["rows"] if view["rows"] is not None else np.arange(len(components))
+            ids[rows] = view["index"]
+            header_ids.append(ids)
+
+        tables = []
+        for year in views["years"]:
+            entry_rows, entry_profiles, entry_weights = [], [], []
+            for row, (years_map, year_keys) in enumerate(components):
+                key = year_keys.get(year)
+                if key is None:
+                    continue
+                pids, weights = self._factorized_component_entries(years_map, key, profile_id, fixed_hours)
+                entry_rows.extend([row] * len(pids))
+                entry_profiles.extend(pids)
+                entry_weights.append(weights)
+            if not entry_rows:
+                continue
+            entry_rows = np.asarray(entry_rows, dtype=np.int64)
+            entry_profiles = np.asarray(entry_profiles, dtype=np.int64)
+            entry_weights = np.concatenate(entry_weights)
+            for (view_name, view), ids in zip(view_list, header_ids):
+                headers = ids[entry_rows]
+                inside = headers >= 0
+                if not inside.any():
+                    continue
+                tables.append(pd.DataFrame({
+                    "View": view_name,
+                    "Header": np.asarray(view["headers"], dtype=object)[headers[inside]],
+                    "Year": int(year),
+                    "Profile": entry_profiles[inside],
+                    "Annual energy": entry_weights[inside],
+                }))
+        if not tables:
+            return
 
-        base_dir = output_dir or self.output_path
-        output_path = base_dir / f"timeseries_by_sector_{channel}.xlsx"
-        metadata, yearly_data = self._collect_timeseries_columns(
-            channel=channel,
-            header_mode="sector",
-            split_by_sector=False,
+        weights = pd.concat(tables, ignore_index=True)
+        weights = weights.groupby(["View", "Header", "Year", "Profile"], sort=False, as_index=False)["Annual energy"].sum()
+        # Zero weights are dropped; a header without any non-zero weight keeps one row so that it stays listed.
+        # Rows are kept grouped by header in first-appearance order (the column order of the workbooks).
+        group = [weights["View"], weights["Header"], weights["Year"]]
+        order = weights.groupby(group, sort=False).ngroup()
+        nonzero = weights["Annual energy"] != 0
+        listed = nonzero.groupby(group, sort=False).transform("any")
+        keep = nonzero | (~listed & ~weights.duplicated(["View", "Header", "Year"]))
+        weights = weights[keep].iloc[np.argsort(order[keep].to_numpy(), kind="stable")]
+
+        metadata = [pd.DataFrame(view["metadata"]).assign(View=view_name) for view_name, view in view_list if view["metadata"]]
+        metadata = pd.concat(metadata, ignore_index=True) if metadata else None
+        if metadata is not None:
+            metadata = metadata[["View"] + [col for col in metadata.columns if col != "View"]]
+
+        matrix = np.vstack(profiles) if profiles else np.zeros((0, fixed_hours), dtype=dtype)
+        path = write_factorized_hourly(
+            output_dir / f"factorized_{channel}", channel, matrix, weights.reset_index(drop=True),
+            metadata=metadata, hours=fixed_hours,
         )
-
-        with self._get_excel_writer(output_path) as writer:
-            if metadata:
-                pd.DataFrame(metadata).to_excel(writer, sheet_name="Metadata", index=False)
-
-            # One sheet per year; sector split is encoded in header (e.g. DE.IND.HEAT.Q1)
-            for year in sorted(yearly_data.keys(), key=lambda y: int(y) if str(y).isdigit() else str(y)):
-                self._write_columnar_sheet(writer, sheet_name=str(year), columns=yearly_data.get(year, {}))
-
-
-    def _write_per_region_timeseries(self, directory, channel: str = "UE"):
-        """Per-region timeseries in columnar yearly format (aggregated by sector level)."""
+        print(f"[Timeseries] Factorized {channel} output: {matrix.shape[0]} profiles, {len(weights)} weights in {path}")
+
+        # The summary needs the hourly columns; they are rebuilt from the weights one view and year at a time.
+        summary = []
+        rows_by_view = weights.groupby(["View", "Year"], sort=False).indices
+        for year in views["years"]:
+            for view_name, _ in view_list:
+                rows = rows_by_view.get((view_name, int(year)))
+                if rows is None:
+                    continue
+                table = weights.iloc[rows]
+                codes, headers = pd.factorize(table["Header"])
+                used, columns_of = np.unique(table["Profile"].to_numpy(dtype=np.int64), return_inverse=True)
+                mix = np.zeros((len(headers), used.size), dtype=np.float64)
+                np.add.at(mix, (codes, columns_of), table["Annual energy"].to_numpy(dtype=np.float64))
+                columns = mix @ np.asarray(matrix[used], dtype=np.float64)
+                summary.extend(self._hourly_summary_rows(view_name, str(year), list(headers), columns))
+        self._write_hourly_summary(output_dir / f"timeseries_total_summary_{channel}.xlsx", summary)
+
+    def _component_period_matrix(self, components: list, year: str, periods):
+        """
+        Return (components x K * period_hours matrix, presence mask) of one year.
+        Every component row is scaled so that its weighted periods sum to the
+        component's 8760-hour total.
+        """
+        fixed_hours = 8760
+        hours = periods.hours
+        present = np.zeros(len(components), dtype=bool)
+        values = np.zeros((len(components), hours.size), dtype=np.float64)
+        totals = np.zeros(len(components), dtype=np.float64)
+        for row, (years_map, year_keys) in enumerate(components):
+            key = year_keys.get(year)
+            if key is None:
+                continue
+            present[row] = True
+            if hasattr(years_map, "values_at"):
+                values[row] = years_map.values_at(key, hours)
+                totals[row] = years_map.hourly_total(key, fixed_hours)
+                continue
+            ydata = years_map[key]
+            hourly = np.zeros(fixed_hours, dtype=np.float64)
+            series = np.asarray(ydata.get("hourly_values", []) if isinstance(ydata, dict) else [], dtype=np.float64)
+            hourly[:min(series.size, fixed_hours)] = series[:fixed_hours]
+            values[row] = hourly[hours]
+            totals[row] = hourly.sum()
+        return periods.represent(values, totals), present
+
+    def _write_period_matrix_sheet(self, writer, sheet_name: str, headers: list, columns: np.ndarray, periods):
+        if not headers:
+            return
+        n_hours = periods.hours.size
+        hour_weights = np.repeat(periods.weights, periods.period_hours)
+        data = np.empty((n_hours + 1, len(headers)), dtype=np.float64)
+        data[0] = columns @ hour_weights
+        data[1:] = columns.T
+        labels = [
+            f"P{period}.{hour}"
+            for period in range(1, len(periods) + 1)
+            for hour in range(1, periods.period_hours + 1)
+        ]
+        self._write_matrix(writer, sheet_name[:31], ["Period.Hour"] + list(headers), ["total"] + labels, data)
+
+    def _write_typical_period_views(self, channel: str, output_dir, periods, region_dir=None):
+        """
+        Typical-period counterpart of _write_timeseries_views: per year one sheet
+        with K representative periods per header, plus the period weights and
+        the period-to-typical-period mapping. The "total" row holds the weighted
+        sum, i.e. the annual total of the full hourly series.
+        The summary workbook is computed from the full 8760-hour series, as in
+        _write_timeseries_views, not from the representative periods.
+        """
         if not self._has_channel_timeseries(channel):
             return
+        views = self._build_timeseries_views(channel, per_region=region_dir is not None)
+        workbooks = [(output_dir / f"typical_periods_{channel}.xlsx", views["views"]["total"], "total")]
+        for region, view in views["regions"]:
+            workbooks.append((region_dir / f"{region.region_name}_{channel}_typical_periods.xlsx", view, region.region_name))
+
+        period_table = pd.DataFrame({
+            "Typical period": np.arange(1, len(periods) + 1),
+            "Representative period": periods.medoids + 1,
+            "First hour": periods.medoids * periods.period_hours + 1,
+            "Weight": periods.weights,
+        })
+        mapping = pd.DataFrame({
+            "Period": np.arange(1, periods.assignment.size + 1),
+            "Typical period": periods.assignment + 1,
+        })
+        summary = []
+        with ExitStack() as stack:
+            writers = []
+            for output_path, view, view_name in workbooks:
+                writer = stack.enter_context(self._get_output_writer(output_path, "timeseries"))
+                if view["metadata"]:
+                    self._write_sheet(writer, pd.DataFrame(view["metadata"]), "Metadata")
+                self._write_sheet(writer, period_table, "Typical_periods")
+                self._write_sheet(writer, mapping, "Period_mapping")
+                writers.append((writer, view, view_name))
+
+            for year in views["years"]:
+                matrix, present = self._component_period_matrix(views["components"], year, periods)
+                for writer, view, _ in writers:
+                    headers, columns = self._reduce_view(matrix, present, view)
+                    self._write_period_matrix_sheet(writer, str(year), headers, columns, periods)
+                del matrix
+
+                matrix, present = self._component_year_matrix(views["components"], year)
+                for _, view, view_name in writers:
+                    headers, columns = self._reduce_view(matrix, present, view)
+                    summary.extend(self._hourly_summary_rows(view_name, str(year), headers, columns))
+                del matrix
+
+        self._write_hourly_summary(output_dir / f"timeseries_total_summary_{channel}.xlsx", summary)
 
-        def process_region(region):
-            profiles = self._get_profiles_by_channel(region, channel)
-            if not profiles:
-                return
-            output_path = directory / f"{region.region_name}_{channel}.xlsx"
-
-            metadata = []
-            yearly_data = {}
-            for pid, pdata in profiles.items():
-                comp = pdata.get("components", {})
-                header = self._build_timeseries_header(region.code, comp, channel, mode="sector")
-                metadata.append({
-                    "Channel": channel,
-                    "Region": region.code,
-                    "Profile ID": pid,
-                    "Header": header,
-                    **comp,
-                    "Sectors": ", ".join(pdata.get("contributors", {}).get("sectors", [])),
-                    "Subsectors": ", ".join(pdata.get("contributors", {}).get("subsectors", [])),
-                    "Techs": ", ".join(pdata.get("contributors", {}).get("technologies", [])),
-                    "Subtechs": ", ".join(pdata.get("contributors", {}).get("subtechs", [])),
-                    "Drives": ", ".join(pdata.get("contributors", {}).get("drives", [])),
-                })
-
-                for yr, ydata in (pdata.get("years", {}) or {}).items():
-                    year_key = str(yr)
-                    year_bucket = yearly_data.setdefault(year_key, {})
-                    col_data = self._normalize_hourly_column_data(ydata)
-                    if header in year_bucket:
-                        year_bucket[header] += col_data
-                    else:
-                        year_bucket[header] = col_data.copy()
-
-            with self._get_excel_writer(output_path) as writer:
-                if metadata:
-                    pd.DataFrame(metadata).to_excel(writer, sheet_name="Metadata", index=False)
-                for year in sorted(yearly_data.keys(), key=lambda y: int(y) if str(y).isdigit() else str(y)):
-                    self._write_columnar_sheet(writer, sheet_name=str(year), columns=yearly_data.get(year, {}))
-
-        with ThreadPoolExecutor(max_workers=min(4, os.cpu_count())) as executor:
-            list(executor.map(process_region, self.data.regions))
+    def _write_timeseries_results(self, channel: str = "UE", output_dir=None):
+        self._write_timeseries_views(channel, output_dir or self.output_path)
 
+    def _write_timeseries_results_by_sector(self, channel: str = "UE", output_dir=None):
+        # One sheet per year; sector split is encoded in header (e.g. DE.IND.HEAT.Q1)
+        self._write_timeseries_views(
+            channel, output_dir or self.output_path, header_mode="sector", file_prefix="timeseries_by_sector"
+        )
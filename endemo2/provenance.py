@@ -0,0 +1,38 @@
+"""
+Lazy row provenance for model outputs.
+
+Model stages store a Provenance record in the "Trace" column instead of a
+pipe-joined string. A record keeps the trace builder and its structured inputs
+(hierarchy names, the Method object, the parent record a row was derived from)
+and is rendered to text only when an output writer needs it, i.e. when trace
+output is enabled.
+"""
+
+
+class Provenance:
+    """Deferred trace text: builder(*args, **kwargs) with nested records rendered first."""
+
+    __slots__ = ("builder", "args", "kwargs")
+
+    def __init__(self, builder, *args, **kwargs):
+        self.builder = builder
+        self.args = args
+        self.kwargs = kwargs
+
+    def render(self) -> str:
+        args = [render_trace(arg) for arg in self.args]
+        kwargs = {key: render_trace(value) for key, value in self.kwargs.items()}
+        return self.builder(*args, **kwargs)
+
+    def __str__(self) -> str:
+        return self.render()
+
+    def __repr__(self) -> str:
+        return f"Provenance({getattr(self.builder, '__name__', self.builder)})"
+
+
+def render_trace(value):
+    """Return trace text for a Provenance record; other values are returned unchanged."""
+    if isinstance(value, Provenance):
+        return value.render()
+    return value
@@ -6,6 +6,7 @@ import sys
 # Disable Python bytecode cache files (__pycache__) for this run.
 sys.dont_write_bytecode = True
 
+import argparse
 from endemo2.endemo import Endemo
 import warnings
 import numpy as np
@@ -16,5 +17,23 @@ from numpy.polynomial.polyutils import RankWarning
 warnings.simplefilter('ignore', RankWarning)
 warnings.simplefilter('ignore', UserWarning)
 
-model = Endemo()
-model.execute_with_preprocessing()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ENDEMO model.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Worker processes for the region-sharded UE/FE/subregional stages, the per-region timeseries "
+            "calculation and the output workbook writers (default: 1, sequential)."
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+# Worker processes re-import this module on spawn-based platforms; only the main process runs the model.
+if __name__ == "__main__":
+    args = parse_args()
+    model = Endemo(workers=args.workers)
+    model.execute_with_preprocessing()